@@ -1 +1,7 @@
 # Old Is Gold Backend
+
+import os
+import sys
+
+# The exercise catalogue, streak rules and DynamoDB access are shared with the Lambda handlers
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda-package"))
@@ -1,11 +1,26 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional
-from datetime import datetime
+from datetime import date, datetime
 import uuid
 
-app = FastAPI(title="Old Is Gold API", version="1.0.0")
+import exercises
+import stats
+from app.storage import create_storage
+
+# ============== STORAGE ==============
+
+# Backend from STORAGE_BACKEND (memory, sqlite or dynamodb), see app/storage
+storage = create_storage()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await storage.close()
+
+app = FastAPI(title="Old Is Gold API", version="1.0.0", lifespan=lifespan)
 
 # CORS for React frontend
 app.add_middleware(
@@ -41,127 +56,111 @@ class ProgressEntry(BaseModel):
     workout_completed: bool
     duration_minutes: int
     notes: Optional[str] = ""
-
-# ============== IN-MEMORY STORE (Replace with DynamoDB) ==============
-
-users_db: dict[str, User] = {}
-plans_db: dict[str, WorkoutPlan] = {}
-progress_db: dict[str, list[dict]] = {}
-
-# ============== WORKOUT TEMPLATES ==============
-
-EXERCISE_LIBRARY = {
-    "low": [
-        {"name": "Seated Arm Raises", "reps": "10", "duration": "2 min", "instructions": "Sit straight, raise arms slowly overhead"},
-        {"name": "Ankle Circles", "reps": "10 each", "duration": "2 min", "instructions": "Rotate ankles clockwise then counter"},
-        {"name": "Seated Marching", "reps": "20", "duration": "3 min", "instructions": "Lift knees alternately while seated"},
-        {"name": "Neck Stretches", "reps": "5 each side", "duration": "2 min", "instructions": "Gently tilt head side to side"},
-        {"name": "Wrist Rotations", "reps": "10 each", "duration": "1 min", "instructions": "Rotate wrists in circles"},
-    ],
-    "medium": [
-        {"name": "Standing Leg Raises", "reps": "10 each", "duration": "3 min", "instructions": "Hold chair, lift leg to side"},
-        {"name": "Wall Push-ups", "reps": "10", "duration": "3 min", "instructions": "Push-ups against wall at arm's length"},
-        {"name": "Heel-to-Toe Walk", "reps": "20 steps", "duration": "3 min", "instructions": "Walk in straight line, heel touching toe"},
-        {"name": "Seated Twists", "reps": "10 each side", "duration": "2 min", "instructions": "Rotate torso left and right"},
-        {"name": "Calf Raises", "reps": "15", "duration": "2 min", "instructions": "Rise onto toes, hold chair for balance"},
-    ],
-    "high": [
-        {"name": "Squats with Chair", "reps": "12", "duration": "3 min", "instructions": "Lower to chair, stand back up"},
-        {"name": "Standing Marches", "reps": "30", "duration": "3 min", "instructions": "March in place with high knees"},
-        {"name": "Side Steps", "reps": "20", "duration": "3 min", "instructions": "Step side to side with slight squat"},
-        {"name": "Arm Circles", "reps": "15 each direction", "duration": "2 min", "instructions": "Large circles forward then backward"},
-        {"name": "Standing Balance", "reps": "30 sec each leg", "duration": "2 min", "instructions": "Stand on one leg near wall"},
-    ]
-}
+    date: Optional[str] = None  # YYYY-MM-DD, for logging a past workout
 
 # ============== ENDPOINTS ==============
 
 @app.get("/")
-def health_check():
+async def health_check():
     return {"status": "healthy", "service": "Old Is Gold API"}
 
 # --- USERS ---
 
 @app.post("/users", response_model=User)
-def create_user(user: UserCreate):
+async def create_user(user: UserCreate):
     user_id = str(uuid.uuid4())[:8]
     new_user = User(
         user_id=user_id,
         created_at=datetime.now().isoformat(),
         **user.model_dump()
     )
-    users_db[user_id] = new_user
+    await storage.put_user(new_user.model_dump())
     
     # Auto-generate first workout plan
-    generate_plan_for_user(user_id, user.mobility_level)
+    await generate_plan_for_user(new_user)
     
     return new_user
 
 @app.get("/users/{user_id}", response_model=User)
-def get_user(user_id: str):
-    if user_id not in users_db:
+async def get_user(user_id: str):
+    user = await storage.get_user(user_id)
+    if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return users_db[user_id]
+    return user
 
 # --- WORKOUT PLANS ---
 
-def generate_plan_for_user(user_id: str, mobility_level: str) -> WorkoutPlan:
-    exercises = EXERCISE_LIBRARY.get(mobility_level, EXERCISE_LIBRARY["low"])
+PLAN_SIZE = 5
+
+async def generate_plan_for_user(user: User) -> WorkoutPlan:
+    selected, duration_minutes = exercises.recommend(
+        user.mobility_level, user.goals, user.health_conditions, size=PLAN_SIZE
+    )
     plan = WorkoutPlan(
         plan_id=str(uuid.uuid4())[:8],
-        user_id=user_id,
-        exercises=exercises,
-        duration_minutes=sum(int(e["duration"].split()[0]) for e in exercises),
-        difficulty=mobility_level
+        user_id=user.user_id,
+        exercises=selected,
+        duration_minutes=duration_minutes,
+        difficulty=user.mobility_level
     )
-    plans_db[user_id] = plan
+    await storage.put_plan(plan.model_dump())
     return plan
 
 @app.get("/plans/{user_id}", response_model=WorkoutPlan)
-def get_todays_plan(user_id: str):
-    if user_id not in plans_db:
+async def get_todays_plan(user_id: str):
+    plan = await storage.get_plan(user_id)
+    if not plan:
         raise HTTPException(status_code=404, detail="No plan found. Create user first.")
-    return plans_db[user_id]
+    return plan
 
 @app.post("/plans/{user_id}/regenerate", response_model=WorkoutPlan)
-def regenerate_plan(user_id: str):
-    if user_id not in users_db:
+async def regenerate_plan(user_id: str):
+    user = await storage.get_user(user_id)
+    if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    user = users_db[user_id]
-    return generate_plan_for_user(user_id, user.mobility_level)
+    return await generate_plan_for_user(User(**user))
 
 # --- PROGRESS ---
 
 @app.post("/progress")
-def log_progress(entry: ProgressEntry):
-    if entry.user_id not in progress_db:
-        progress_db[entry.user_id] = []
+async def log_progress(entry: ProgressEntry):
+    if entry.date:
+        try:
+            date.fromisoformat(entry.date)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="date must be YYYY-MM-DD")
     
     progress_entry = {
-        "date": datetime.now().isoformat(),
+        "entry_id": str(uuid.uuid4())[:8],
+        "date": entry.date or datetime.now().isoformat(),
         "completed": entry.workout_completed,
         "duration": entry.duration_minutes,
         "notes": entry.notes
     }
-    progress_db[entry.user_id].append(progress_entry)
+    await storage.add_progress(entry.user_id, progress_entry)
     
     return {"message": "Progress logged", "entry": progress_entry}
 
+@app.delete("/progress/{user_id}/{entry_id}")
+async def delete_progress(user_id: str, entry_id: str):
+    if not await storage.delete_progress(user_id, entry_id):
+        raise HTTPException(status_code=404, detail="Entry not found")
+    return {"message": "Progress deleted"}
+
 @app.get("/progress/{user_id}")
-def get_progress(user_id: str):
-    if user_id not in progress_db:
-        return {"user_id": user_id, "entries": [], "stats": {"total_workouts": 0, "streak": 0}}
-    
-    entries = progress_db[user_id]
-    completed = [e for e in entries if e["completed"]]
+async def get_progress(user_id: str):
+    entries = await storage.recent_progress(user_id, 10)  # Last 10
+    user_stats = await storage.get_stats(user_id)
+    if not user_stats:
+        return {"user_id": user_id, "entries": entries, "stats": {"total_workouts": 0, "total_minutes": 0, "streak": 0}}
     
     return {
         "user_id": user_id,
-        "entries": entries[-10:],  # Last 10
+        "entries": entries,
         "stats": {
-            "total_workouts": len(completed),
-            "total_minutes": sum(e["duration"] for e in completed),
-            "streak": len(completed)  # Simplified streak calc
+            "total_workouts": user_stats["total_workouts"],
+            "total_minutes": user_stats["total_minutes"],
+            "streak": stats.current_streak(user_stats["streak_start"], user_stats["streak_end"], date.today())
         }
     }
 
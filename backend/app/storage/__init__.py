@@ -0,0 +1,30 @@
+"""Storage backends for the FastAPI app, chosen with STORAGE_BACKEND:
+
+- memory    process-local dicts (default; one worker, lost on restart)
+- sqlite    one SQLite file at SQLITE_PATH, shared by all workers on the host
+- dynamodb  the Lambda handlers' DynamoDB tables
+"""
+
+import os
+
+from .base import Storage
+
+
+def create_storage(backend: str = None) -> Storage:
+    backend = (backend or os.environ.get("STORAGE_BACKEND", "memory")).lower()
+    if backend == "memory":
+        from .memory import MemoryStorage
+        return MemoryStorage()
+    if backend == "sqlite":
+        from .sqlite import SQLiteStorage
+        return SQLiteStorage(
+            os.environ.get("SQLITE_PATH", "oldisgold.db"),
+            pool_size=int(os.environ.get("STORAGE_POOL_SIZE", "4")),
+        )
+    if backend == "dynamodb":
+        from .dynamodb import DynamoDBStorage
+        return DynamoDBStorage()
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}, expected memory, sqlite or dynamodb")
+
+
+__all__ = ["Storage", "create_storage"]
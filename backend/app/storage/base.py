@@ -0,0 +1,48 @@
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Optional
+
+
+def entry_day(entry: dict) -> date:
+    """Calendar day a progress entry counts towards (its date is an ISO date or timestamp)"""
+    return date.fromisoformat(entry["date"][:10])
+
+
+class Storage(ABC):
+    """Async repository behind the FastAPI app.
+
+    Users and plans are plain dicts keyed by user_id. Progress entries are dicts with
+    entry_id, date, completed, duration and notes. Adding or deleting a completed
+    entry also updates the user's stats (total_workouts, total_minutes and the
+    streak_start..streak_end run, see lambda-package/stats.py) atomically with it.
+    """
+
+    @abstractmethod
+    async def get_user(self, user_id: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def put_user(self, user: dict) -> None: ...
+
+    @abstractmethod
+    async def get_plan(self, user_id: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def put_plan(self, plan: dict) -> None: ...
+
+    @abstractmethod
+    async def add_progress(self, user_id: str, entry: dict) -> None: ...
+
+    @abstractmethod
+    async def delete_progress(self, user_id: str, entry_id: str) -> Optional[dict]:
+        """Remove an entry, returning it, or None if it doesn't exist"""
+
+    @abstractmethod
+    async def recent_progress(self, user_id: str, limit: int) -> list[dict]:
+        """The user's last `limit` entries, oldest first"""
+
+    @abstractmethod
+    async def get_stats(self, user_id: str) -> Optional[dict]:
+        """{total_workouts, total_minutes, streak_start, streak_end} with dates, or None"""
+
+    async def close(self) -> None:
+        pass
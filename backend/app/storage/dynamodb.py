@@ -0,0 +1,121 @@
+import asyncio
+from typing import Optional
+
+import db
+import rollups
+import stats
+
+from .base import Storage, entry_day
+
+# Same GSI the Lambda handlers read history from
+RECORD_INDEX = "user_id-record_key-index"
+
+
+def to_item(user_id: str, entry: dict) -> dict:
+    """App progress entry -> oldisgold-progress workout record, as the Lambda writes them"""
+    day = entry_day(entry).isoformat()
+    return {
+        "user_id": user_id,
+        "progress_id": entry["entry_id"],
+        "record_type": "workout",
+        "record_key": f"workout#{day}",
+        "date": day,
+        "created_at": entry["date"],
+        "workout_completed": entry["completed"],
+        "duration_minutes": entry["duration"],
+        "notes": entry.get("notes") or "",
+    }
+
+
+def from_item(item: dict) -> dict:
+    return {
+        "entry_id": item["progress_id"],
+        "date": item.get("created_at") or item["date"],
+        "completed": bool(item.get("workout_completed", True)),
+        "duration": int(item.get("duration_minutes", item.get("duration", 0))),
+        "notes": item.get("notes", ""),
+    }
+
+
+class DynamoDBStorage(Storage):
+    """The Lambda handlers' DynamoDB tables, shared by any number of workers and hosts.
+
+    Goes through lambda-package/db.py, whose single boto3 client is thread-safe and
+    keeps a pool of HTTPS connections (DYNAMODB_MAX_POOL_CONNECTIONS). Calls block, so
+    each runs on a worker thread. Completed workouts update oldisgold-daily-summary
+    and oldisgold-user-stats exactly like the Lambda's POST /progress does.
+    """
+
+    def __init__(self):
+        self.users = db.table("oldisgold-users")
+        self.plans = db.table("oldisgold-plans")
+        self.progress = db.table("oldisgold-progress")
+        self.summary = db.table(rollups.SUMMARY_TABLE)
+        self.stats = db.table(stats.STATS_TABLE)
+
+    def _apply(self, user_id: str, item: dict, sign: int) -> None:
+        rollups.apply_rollup_after_write(self.summary, self.stats, user_id, item["date"], rollups.record_deltas(item), sign)
+
+    def _add_progress(self, user_id: str, entry: dict) -> None:
+        item = to_item(user_id, entry)
+        self.progress.put_item(Item=item)
+        if entry["completed"]:
+            self._apply(user_id, item, 1)
+
+    def _delete_progress(self, user_id: str, entry_id: str) -> Optional[dict]:
+        result = self.progress.delete_item(Key={"user_id": user_id, "progress_id": entry_id}, ReturnValues="ALL_OLD")
+        item = result.get("Attributes")
+        if not item:
+            return None
+        entry = from_item(item)
+        if entry["completed"] and item.get("date"):
+            self._apply(user_id, item, -1)
+        return entry
+
+    def _recent_progress(self, user_id: str, limit: int) -> list[dict]:
+        from boto3.dynamodb.conditions import Key
+
+        result = self.progress.query(
+            IndexName=RECORD_INDEX,
+            KeyConditionExpression=Key("user_id").eq(user_id) & Key("record_key").begins_with("workout#"),
+            ScanIndexForward=False,
+            Limit=limit,
+        )
+        return [from_item(item) for item in reversed(result.get("Items", []))]
+
+    def _get_stats(self, user_id: str) -> Optional[dict]:
+        item = self.stats.get_item(Key={"user_id": user_id}).get("Item")
+        if not item:
+            return None
+        return {
+            "total_workouts": int(item.get("workouts", 0)),
+            "total_minutes": int(item.get("minutes", 0)),
+            "streak_start": stats.to_date(item.get("streak_start")),
+            "streak_end": stats.to_date(item.get("streak_end")),
+        }
+
+    async def get_user(self, user_id: str) -> Optional[dict]:
+        result = await asyncio.to_thread(self.users.get_item, Key={"user_id": user_id})
+        return result.get("Item")
+
+    async def put_user(self, user: dict) -> None:
+        await asyncio.to_thread(self.users.put_item, Item=user)
+
+    async def get_plan(self, user_id: str) -> Optional[dict]:
+        result = await asyncio.to_thread(self.plans.get_item, Key={"user_id": user_id})
+        return result.get("Item")
+
+    async def put_plan(self, plan: dict) -> None:
+        await asyncio.to_thread(self.plans.put_item, Item=plan)
+
+    async def add_progress(self, user_id: str, entry: dict) -> None:
+        await asyncio.to_thread(self._add_progress, user_id, entry)
+
+    async def delete_progress(self, user_id: str, entry_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._delete_progress, user_id, entry_id)
+
+    async def recent_progress(self, user_id: str, limit: int) -> list[dict]:
+        return await asyncio.to_thread(self._recent_progress, user_id, limit)
+
+    async def get_stats(self, user_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._get_stats, user_id)
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import date
+from typing import Optional
+
+import stats
+
+from .base import Storage, entry_day
+
+
+class MemoryStorage(Storage):
+    """Process-local dicts. Fast and dependency-free, but lost on restart and not
+    shared between uvicorn workers, so only for development with a single worker"""
+
+    def __init__(self):
+        self.users: dict[str, dict] = {}
+        self.plans: dict[str, dict] = {}
+        self.progress: dict[str, list[dict]] = {}
+        self.stats: dict[str, dict] = {}
+        # Completed workouts per user per day, for streak bookkeeping
+        self.workout_days: dict[str, dict[date, int]] = {}
+        self._lock = asyncio.Lock()
+
+    async def get_user(self, user_id: str) -> Optional[dict]:
+        return self.users.get(user_id)
+
+    async def put_user(self, user: dict) -> None:
+        self.users[user["user_id"]] = user
+
+    async def get_plan(self, user_id: str) -> Optional[dict]:
+        return self.plans.get(user_id)
+
+    async def put_plan(self, plan: dict) -> None:
+        self.plans[plan["user_id"]] = plan
+
+    async def add_progress(self, user_id: str, entry: dict) -> None:
+        async with self._lock:
+            self.progress.setdefault(user_id, []).append(entry)
+            if entry["completed"]:
+                self._record_workout_day(user_id, entry_day(entry), entry["duration"], 1)
+
+    async def delete_progress(self, user_id: str, entry_id: str) -> Optional[dict]:
+        async with self._lock:
+            entries = self.progress.get(user_id, [])
+            for i, entry in enumerate(entries):
+                if entry["entry_id"] == entry_id:
+                    del entries[i]
+                    if entry["completed"]:
+                        self._record_workout_day(user_id, entry_day(entry), entry["duration"], -1)
+                    return entry
+            return None
+
+    async def recent_progress(self, user_id: str, limit: int) -> list[dict]:
+        return self.progress.get(user_id, [])[-limit:]
+
+    async def get_stats(self, user_id: str) -> Optional[dict]:
+        return self.stats.get(user_id)
+
+    def _record_workout_day(self, user_id: str, day: date, minutes: int, sign: int):
+        days = self.workout_days.setdefault(user_id, {})
+        user_stats = self.stats.setdefault(user_id, {"total_workouts": 0, "total_minutes": 0, "streak_start": None, "streak_end": None})
+        before = days.get(day, 0)
+        if before + sign > 0:
+            days[day] = before + sign
+        else:
+            days.pop(day, None)
+        user_stats["total_workouts"] += sign
+        user_stats["total_minutes"] += sign * minutes
+
+        def run_start(d):
+            if d not in days:
+                return None
+            while d - stats.ONE_DAY in days:
+                d -= stats.ONE_DAY
+            return d
+
+        def last_active_before(d):
+            # Only reached when the latest workout day is deleted outright
+            return max((k for k in days if k < d), default=None)
+
+        user_stats["streak_start"], user_stats["streak_end"] = stats.streak_after(
+            user_stats["streak_start"], user_stats["streak_end"], day, before, before + sign,
+            run_start, last_active_before
+        )
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date
+from typing import Optional
+
+import stats
+
+from .base import Storage, entry_day
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (user_id TEXT PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS plans (user_id TEXT PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS progress (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    entry_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS progress_user_entry ON progress (user_id, entry_id);
+CREATE TABLE IF NOT EXISTS workout_days (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    workouts INTEGER NOT NULL,
+    PRIMARY KEY (user_id, day)
+);
+CREATE TABLE IF NOT EXISTS stats (
+    user_id TEXT PRIMARY KEY,
+    total_workouts INTEGER NOT NULL DEFAULT 0,
+    total_minutes INTEGER NOT NULL DEFAULT 0,
+    streak_start TEXT,
+    streak_end TEXT
+);
+"""
+
+
+class ConnectionPool:
+    """Up to `size` sqlite3 connections shared by the worker threads of one process.
+
+    Connections run in autocommit mode; writes take BEGIN IMMEDIATE, so concurrent
+    writers (threads here, or other uvicorn worker processes on the same file) are
+    serialized by SQLite itself and wait up to `timeout` seconds for the lock.
+    """
+
+    def __init__(self, path: str, size: int = 4, timeout: float = 30.0):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # WAL lets readers carry on while another connection writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class SQLiteStorage(Storage):
+    """A single SQLite file, for local development, tests and single-host deployments.
+
+    sqlite3 calls block, so every operation runs on a worker thread with
+    asyncio.to_thread and the event loop keeps serving other requests.
+    """
+
+    def __init__(self, path: str, pool_size: int = 4):
+        # Every connection to ":memory:" would be a separate empty database
+        self.pool = ConnectionPool(path, size=1 if path == ":memory:" else pool_size)
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    # --- sync implementations, run off the event loop ---
+
+    def _get(self, table: str, user_id: str) -> Optional[dict]:
+        with self.pool.connection() as conn:
+            row = conn.execute(f"SELECT data FROM {table} WHERE user_id = ?", (user_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def _put(self, table: str, item: dict) -> None:
+        with self.pool.connection() as conn:
+            conn.execute(
+                f"INSERT INTO {table} (user_id, data) VALUES (?, ?) "
+                "ON CONFLICT (user_id) DO UPDATE SET data = excluded.data",
+                (item["user_id"], json.dumps(item)),
+            )
+
+    def _add_progress(self, user_id: str, entry: dict) -> None:
+        with self.pool.transaction() as conn:
+            conn.execute(
+                "INSERT INTO progress (user_id, entry_id, data) VALUES (?, ?, ?)",
+                (user_id, entry["entry_id"], json.dumps(entry)),
+            )
+            if entry["completed"]:
+                self._record_workout_day(conn, user_id, entry_day(entry), entry["duration"], 1)
+
+    def _delete_progress(self, user_id: str, entry_id: str) -> Optional[dict]:
+        with self.pool.transaction() as conn:
+            row = conn.execute(
+                "SELECT seq, data FROM progress WHERE user_id = ? AND entry_id = ?", (user_id, entry_id)
+            ).fetchone()
+            if not row:
+                return None
+            conn.execute("DELETE FROM progress WHERE seq = ?", (row["seq"],))
+            entry = json.loads(row["data"])
+            if entry["completed"]:
+                self._record_workout_day(conn, user_id, entry_day(entry), entry["duration"], -1)
+            return entry
+
+    def _recent_progress(self, user_id: str, limit: int) -> list[dict]:
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT data FROM progress WHERE user_id = ? ORDER BY seq DESC LIMIT ?", (user_id, limit)
+            ).fetchall()
+        return [json.loads(row["data"]) for row in reversed(rows)]
+
+    def _get_stats(self, user_id: str) -> Optional[dict]:
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT total_workouts, total_minutes, streak_start, streak_end FROM stats WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "total_workouts": row["total_workouts"],
+            "total_minutes": row["total_minutes"],
+            "streak_start": stats.to_date(row["streak_start"]),
+            "streak_end": stats.to_date(row["streak_end"]),
+        }
+
+    def _record_workout_day(self, conn: sqlite3.Connection, user_id: str, day: date, minutes: int, sign: int):
+        """Runs inside the caller's write transaction"""
+        row = conn.execute("SELECT workouts FROM workout_days WHERE user_id = ? AND day = ?", (user_id, day.isoformat())).fetchone()
+        before = row["workouts"] if row else 0
+        after = before + sign
+        if after > 0:
+            conn.execute(
+                "INSERT INTO workout_days (user_id, day, workouts) VALUES (?, ?, ?) "
+                "ON CONFLICT (user_id, day) DO UPDATE SET workouts = excluded.workouts",
+                (user_id, day.isoformat(), after),
+            )
+        else:
+            conn.execute("DELETE FROM workout_days WHERE user_id = ? AND day = ?", (user_id, day.isoformat()))
+
+        def days_desc(until, inclusive):
+            op = "<=" if inclusive else "<"
+            cursor = conn.execute(
+                f"SELECT day, workouts FROM workout_days WHERE user_id = ? AND day {op} ? ORDER BY day DESC",
+                (user_id, until.isoformat()),
+            )
+            return ((date.fromisoformat(r["day"]), r["workouts"]) for r in cursor)
+
+        current = conn.execute("SELECT streak_start, streak_end FROM stats WHERE user_id = ?", (user_id,)).fetchone()
+        start, end = stats.streak_after(
+            stats.to_date(current["streak_start"]) if current else None,
+            stats.to_date(current["streak_end"]) if current else None,
+            day, before, after,
+            lambda d: stats.first_of_run(days_desc(d, True), d),
+            lambda d: stats.first_active(days_desc(d, False)),
+        )
+        conn.execute(
+            "INSERT INTO stats (user_id, total_workouts, total_minutes, streak_start, streak_end) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET "
+            "total_workouts = total_workouts + excluded.total_workouts, "
+            "total_minutes = total_minutes + excluded.total_minutes, "
+            "streak_start = excluded.streak_start, streak_end = excluded.streak_end",
+            (user_id, sign, sign * minutes, start and start.isoformat(), end and end.isoformat()),
+        )
+
+    # --- async interface ---
+
+    async def get_user(self, user_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._get, "users", user_id)
+
+    async def put_user(self, user: dict) -> None:
+        await asyncio.to_thread(self._put, "users", user)
+
+    async def get_plan(self, user_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._get, "plans", user_id)
+
+    async def put_plan(self, plan: dict) -> None:
+        await asyncio.to_thread(self._put, "plans", plan)
+
+    async def add_progress(self, user_id: str, entry: dict) -> None:
+        await asyncio.to_thread(self._add_progress, user_id, entry)
+
+    async def delete_progress(self, user_id: str, entry_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._delete_progress, user_id, entry_id)
+
+    async def recent_progress(self, user_id: str, limit: int) -> list[dict]:
+        return await asyncio.to_thread(self._recent_progress, user_id, limit)
+
+    async def get_stats(self, user_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._get_stats, user_id)
+
+    async def close(self) -> None:
+        self.pool.close()
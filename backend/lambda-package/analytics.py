@@ -0,0 +1,140 @@
+"""Trends for GET /analytics, computed with NumPy over a user's daily rollups.
+
+The rollup items (rollups.py, one per active day) are loaded once into columnar
+arrays spanning every calendar day from the user's first record to today, so days
+without records are zeros. Everything else is whole-array arithmetic on those
+columns: rolling sums come from one cumulative sum, and weeks from a Monday-aligned
+reshape. A multi-year history is a few thousand elements per column.
+
+For each window (7 and 30 days, fewer at the start of a history):
+
+- calories, protein, carbs and fat per logged day (days with at least one meal)
+- workout minutes and calories burned per calendar day
+- workout adherence: share of days with a workout; logging adherence: with a meal
+- macro ratio: share of macro calories from protein, carbs and fat (4/4/9 kcal per g)
+
+Weeks run Monday to Sunday, the last one being the current week to date, and each
+carries its change from the week before. Values that can't be computed (no meals in
+the window) are null.
+
+NumPy is not in the Lambda runtime: deploy it as a layer (e.g. the AWS SDK for pandas
+layer) or in the zip. The handler imports this module on the first /analytics request,
+so no other route pays for loading NumPy.
+"""
+
+import numpy as np
+
+import rollups
+
+WINDOWS = (7, 30)
+SERIES_DAYS = 90
+WEEKS = 12
+KCAL_PER_GRAM = {'protein': 4, 'carbs': 4, 'fat': 9}
+MEAL_FIELDS = ('calories', 'protein', 'carbs', 'fat')
+
+
+def to_columns(days, today):
+    """(dates, {field: float array}) with one element per calendar day, first record to today"""
+    dates = np.array([day['date'] for day in days], dtype='datetime64[D]')
+    start = dates.min()
+    end = max(dates.max(), np.datetime64(today.isoformat(), 'D'))
+    positions = (dates - start).astype(np.int64)
+    length = int((end - start).astype(np.int64)) + 1
+    columns = {}
+    for field in rollups.ROLLUP_FIELDS:
+        column = np.zeros(length)
+        column[positions] = np.fromiter((float(day.get(field) or 0) for day in days), dtype=float, count=len(days))
+        columns[field] = column
+    return np.arange(start, end + 1), columns
+
+
+def rolling_sum(values, window):
+    """Sum of the last `window` days at every day, over fewer days at the start"""
+    totals = np.concatenate(([0.0], np.cumsum(values)))
+    ends = np.arange(1, len(values) + 1)
+    return totals[ends] - totals[np.maximum(ends - window, 0)]
+
+
+def divide(numerator, denominator):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1), np.nan)
+
+
+def window_metrics(columns, window):
+    """{metric: array over every day} for one rolling window"""
+    span = np.minimum(np.arange(1, len(columns['meals']) + 1), window)
+    meal_days = rolling_sum(columns['meals'] > 0, window)
+    workout_days = rolling_sum(columns['workouts'] > 0, window)
+    metrics = {
+        f'{field}_per_logged_day': divide(rolling_sum(columns[field], window), meal_days)
+        for field in MEAL_FIELDS
+    }
+    metrics['minutes_per_day'] = rolling_sum(columns['minutes'], window) / span
+    metrics['calories_burned_per_day'] = rolling_sum(columns['calories_burned'], window) / span
+    metrics['workout_adherence'] = workout_days / span
+    metrics['logging_adherence'] = meal_days / span
+    macro_kcal = {field: rolling_sum(columns[field], window) * kcal for field, kcal in KCAL_PER_GRAM.items()}
+    total_kcal = sum(macro_kcal.values())
+    for field, kcal in macro_kcal.items():
+        metrics[f'{field}_ratio'] = divide(kcal, total_kcal)
+    return metrics
+
+
+def weekly(dates, columns):
+    """(week starts, {metric: array per week}), Monday-aligned"""
+    # 1970-01-01 was a Thursday
+    lead = int((dates[0].astype(np.int64) + 3) % 7)
+    weeks = -(-(lead + len(dates)) // 7)
+
+    def by_week(values):
+        padded = np.zeros(weeks * 7)
+        padded[lead:lead + len(values)] = values
+        return padded.reshape(weeks, 7).sum(axis=1)
+
+    totals = {field: by_week(columns[field]) for field in ('workouts', 'minutes', 'calories_burned', 'meals', 'calories')}
+    meal_days = by_week(columns['meals'] > 0)
+    metrics = {
+        'workouts': totals['workouts'],
+        'minutes': totals['minutes'],
+        'calories_burned': totals['calories_burned'],
+        'workout_days': by_week(columns['workouts'] > 0),
+        'meals': totals['meals'],
+        'calories_per_logged_day': divide(totals['calories'], meal_days),
+    }
+    for name in list(metrics):
+        metrics[f'{name}_delta'] = np.diff(metrics[name], prepend=np.nan)
+    return dates[0] - lead + np.arange(weeks) * 7, metrics
+
+
+def to_list(values):
+    """JSON-ready numbers rounded to 3 places, whole ones as ints and NaN as None"""
+    return [
+        None if value != value else int(value) if value.is_integer() else value
+        for value in np.round(values, 3).tolist()
+    ]
+
+
+def compute(days, today):
+    """The /analytics body (without user_id) for a user's rollup items"""
+    days = [day for day in days if day.get('date')]
+    if not days:
+        return {'as_of': today.isoformat(), 'first_date': None, 'current': {}, 'series': {}, 'weeks': {}}
+    dates, columns = to_columns(days, today)
+    # Trends end today, or on a later date a client in another time zone already logged for
+    last = len(dates) - 1
+    shown = slice(max(0, len(dates) - SERIES_DAYS), None)
+
+    current = {}
+    series = {'dates': [str(d) for d in dates[shown]]}
+    for window in WINDOWS:
+        metrics = window_metrics(columns, window)
+        current[f'{window}d'] = {name: to_list(values[last:])[0] for name, values in metrics.items()}
+        for name, values in metrics.items():
+            series[f'{name}_{window}d'] = to_list(values[shown])
+
+    week_starts, week_metrics = weekly(dates, columns)
+    recent = slice(max(0, len(week_starts) - WEEKS), None)
+    weeks = {'week_start': [str(d) for d in week_starts[recent]]}
+    weeks.update({name: to_list(values[recent]) for name, values in week_metrics.items()})
+
+    return {'as_of': str(dates[last]), 'first_date': str(dates[0]), 'current': current, 'series': series, 'weeks': weeks}
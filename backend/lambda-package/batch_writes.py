@@ -0,0 +1,62 @@
+"""BatchWriteItem helper for the /nutrition/batch and /progress/batch endpoints.
+
+Items are written 25 at a time (the BatchWriteItem limit). Anything DynamoDB hands
+back as UnprocessedItems, usually because of throttling, is retried with capped
+exponential backoff and full jitter before being reported as failed. A chunk whose
+call raises (db.Unavailable once botocore's own retries are spent, say) is reported
+failed too, and later chunks still go ahead, so the caller always learns exactly which
+items were written. With a deadline, chunks and retry rounds that would start after it
+are skipped and their items reported failed.
+"""
+
+import random
+import time
+
+BATCH_SIZE = 25
+MAX_ATTEMPTS = 6
+BASE_DELAY_SECONDS = 0.05
+MAX_DELAY_SECONDS = 1.0
+
+
+def backoff_delay(attempt):
+    return random.uniform(0, min(MAX_DELAY_SECONDS, BASE_DELAY_SECONDS * 2 ** attempt))
+
+
+def batch_put(dynamodb, table_name, items, key_fields, sleep=time.sleep, deadline=None, clock=time.monotonic):
+    """Put items in 25-item chunks, returns the set of key tuples that never got written.
+
+    dynamodb is anything with a resource-style batch_write_item, normally the db module.
+    deadline is a clock() value after which no more calls are started.
+    """
+    failed = set()
+
+    def give_up(requests):
+        for request in requests:
+            item = request['PutRequest']['Item']
+            failed.add(tuple(item[k] for k in key_fields))
+
+    for start in range(0, len(items), BATCH_SIZE):
+        pending = [{'PutRequest': {'Item': item}} for item in items[start:start + BATCH_SIZE]]
+        attempt = 0
+        while pending:
+            if deadline is not None and clock() >= deadline:
+                give_up(pending)
+                break
+            try:
+                result = dynamodb.batch_write_item(RequestItems={table_name: pending})
+            except Exception:
+                give_up(pending)
+                break
+            pending = result.get('UnprocessedItems', {}).get(table_name, [])
+            if not pending:
+                break
+            attempt += 1
+            if attempt >= MAX_ATTEMPTS:
+                give_up(pending)
+                break
+            delay = backoff_delay(attempt)
+            if deadline is not None and clock() + delay >= deadline:
+                give_up(pending)
+                break
+            sleep(delay)
+    return failed
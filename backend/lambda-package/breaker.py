@@ -0,0 +1,68 @@
+"""Per-container circuit breaker for DynamoDB calls.
+
+botocore already retries throttles and 5xx with jittered backoff (see db.py). A call
+that still fails after those retries means DynamoDB is overloaded or unreachable for
+more than a blip, and sending every request of the next few seconds after it only
+adds to the throttling and ties up the container until API Gateway times out.
+
+- BREAKER_FAILURE_THRESHOLD consecutive failed calls (default 5) open the breaker
+- while open, calls fail straight away without touching DynamoDB
+- after BREAKER_COOLDOWN_SECONDS (default 10) one trial call goes through: success
+  closes the breaker, another failure opens it for a further cooldown
+
+Handlers answer a failed or refused call with 503 and Retry-After. Only throttling,
+5xx and connection errors count as failures; a ConditionalCheckFailedException or
+ValidationException is DynamoDB working normally.
+"""
+
+import math
+import os
+import threading
+import time
+
+DEFAULT_FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', '5'))
+DEFAULT_COOLDOWN_SECONDS = float(os.environ.get('BREAKER_COOLDOWN_SECONDS', '10'))
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, cooldown_seconds=DEFAULT_COOLDOWN_SECONDS, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """None if a call may go ahead, otherwise the seconds until the next trial call"""
+        if self.failure_threshold <= 0:
+            return None
+        with self._lock:
+            if self._opened_at is None:
+                return None
+            remaining = self._opened_at + self.cooldown_seconds - self._clock()
+            if remaining > 0 or self._trial_running:
+                return max(1, math.ceil(remaining))
+            self._trial_running = True
+            return None
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+                self._trial_running = False
+
+    def retry_after(self):
+        """Whole seconds a client should wait before retrying, at least 1"""
+        with self._lock:
+            if self._opened_at is None:
+                return 1
+            return max(1, math.ceil(self._opened_at + self.cooldown_seconds - self._clock()))
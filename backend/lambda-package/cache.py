@@ -0,0 +1,81 @@
+"""Per-container read cache and ETag helpers for rarely changing items.
+
+Plans, profiles and users are read on every page view but only change when the user
+saves them. Handlers keep a small LRU of encoded response bodies keyed by user_id:
+
+- entries expire after CACHE_TTL_SECONDS (default 60), which bounds how stale a
+  container can be after a write handled by a different container
+- writes handled by this container invalidate the entry straight away
+- at most CACHE_MAX_ENTRIES (default 512) entries per cache, least recently used
+  evicted first
+
+Bodies are cached already encoded, so a hit skips DynamoDB and serialization, and the
+ETag is a hash of exactly the bytes the client received.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL_SECONDS = float(os.environ.get('CACHE_TTL_SECONDS', '60'))
+DEFAULT_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '512'))
+
+
+class TTLCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Cached value, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def make_etag(body):
+    """Strong ETag for an encoded response body"""
+    return '"' + hashlib.blake2b(body.encode('utf-8'), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """True when an If-None-Match header value already covers this ETag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        # Weak comparison, as RFC 9110 requires for If-None-Match
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+    return False
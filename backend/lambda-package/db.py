@@ -0,0 +1,252 @@
+"""Lazily created DynamoDB access for the Lambda handlers.
+
+boto3.resource('dynamodb') loads and builds the whole resource model at import time,
+which every cold start paid for, including OPTIONS and /health requests that never
+touch a table. Instead, handler modules create cheap Table objects here, and the
+single low-level client behind them is built on first use and cached for the life
+of the container.
+
+Every call is timed and asks for its consumed capacity, which metrics.py adds up
+per invocation.
+
+The client's settings are chosen for a Lambda behind API Gateway's 29 s timeout, and
+each can be overridden with an environment variable:
+
+- DYNAMODB_RETRY_MODE          botocore retry mode (default adaptive: jittered
+                               exponential backoff, plus client-side rate limiting
+                               once DynamoDB starts throttling)
+- DYNAMODB_MAX_ATTEMPTS        attempts per call, including the first (default 4)
+- DYNAMODB_CONNECT_TIMEOUT     seconds (default 1)
+- DYNAMODB_READ_TIMEOUT        seconds (default 3)
+- DYNAMODB_MAX_POOL_CONNECTIONS  (default 10)
+
+A call that still fails with throttling, a 5xx or a connection error raises
+Unavailable, and counts towards the container's circuit breaker (breaker.py); while
+the breaker is open calls raise Unavailable without going to DynamoDB. Handlers turn
+it into 503 with Retry-After.
+
+Table keeps the boto3 resource calling convention (plain Python values in and out,
+boto3.dynamodb.conditions objects for key/filter/condition expressions), so handler
+code reads exactly as it did with the resource API.
+"""
+
+import os
+import threading
+import time
+
+import breaker
+import log
+import metrics
+
+# boto3 itself is imported on first use too: OPTIONS and /health never need it
+_client = None
+_client_lock = threading.Lock()
+_serializer = None
+_deserializer = None
+
+# Error codes botocore has already retried; anything else is DynamoDB answering normally
+UNAVAILABLE_CODES = frozenset((
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+    'InternalServerError',
+    'ServiceUnavailable',
+))
+
+circuit = breaker.CircuitBreaker()
+
+EXPRESSION_PARAMS = (
+    ('KeyConditionExpression', True),
+    ('FilterExpression', False),
+    ('ConditionExpression', False),
+)
+
+
+def get_client():
+    global _client
+    if _client is None:
+        # The default boto3 session isn't thread-safe and /dashboard's first reads
+        # can race here
+        with _client_lock:
+            if _client is None:
+                import boto3
+                from botocore.config import Config
+                _client = boto3.client(
+                    'dynamodb',
+                    region_name=os.environ.get('AWS_REGION'),
+                    # e.g. http://localhost:8001 for the dynamodb-local service in docker-compose.yml
+                    endpoint_url=os.environ.get('DYNAMODB_ENDPOINT_URL') or None,
+                    config=Config(
+                        retries={
+                            'mode': os.environ.get('DYNAMODB_RETRY_MODE', 'adaptive'),
+                            'total_max_attempts': int(os.environ.get('DYNAMODB_MAX_ATTEMPTS', '4')),
+                        },
+                        # Fail over to a retry on a fresh connection rather than wait out
+                        # a stalled one; a 1 MB Query page still fits in the read timeout
+                        connect_timeout=float(os.environ.get('DYNAMODB_CONNECT_TIMEOUT', '1')),
+                        read_timeout=float(os.environ.get('DYNAMODB_READ_TIMEOUT', '3')),
+                        # One Lambda invocation needs a few connections; the FastAPI app's
+                        # worker threads can share more
+                        max_pool_connections=int(os.environ.get('DYNAMODB_MAX_POOL_CONNECTIONS', '10')),
+                        tcp_keepalive=True,
+                    ),
+                )
+    return _client
+
+
+class Unavailable(Exception):
+    """DynamoDB is throttling or unreachable, retry_after is in whole seconds"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_unavailable(error):
+    from botocore.exceptions import ClientError, ConnectionError, HTTPClientError
+
+    if isinstance(error, ClientError):
+        return (error.response.get('Error', {}).get('Code') in UNAVAILABLE_CODES
+                or error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0) >= 500)
+    return isinstance(error, (ConnectionError, HTTPClientError))
+
+
+def invoke(operation, params):
+    """Call the client through the circuit breaker, timed and counted by metrics.py"""
+    wait = circuit.allow()
+    if wait is not None:
+        raise Unavailable('DynamoDB is unavailable, circuit open', wait)
+    if metrics.enabled:
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+    started = time.perf_counter()
+    result = None
+    try:
+        result = getattr(get_client(), operation)(**params)
+    except Exception as e:
+        if not is_unavailable(e):
+            circuit.record_success()
+            raise
+        circuit.record_failure()
+        reason = (getattr(e, 'response', None) or {}).get('Error', {}).get('Code') or type(e).__name__
+        raise Unavailable(f'DynamoDB is unavailable ({reason})', circuit.retry_after()) from e
+    finally:
+        metrics.record_call(operation, (time.perf_counter() - started) * 1000, result and result.get('ConsumedCapacity'))
+    circuit.record_success()
+    return result
+
+
+def serialize(values):
+    global _serializer
+    if _serializer is None:
+        from boto3.dynamodb.types import TypeSerializer
+        _serializer = TypeSerializer()
+    return {k: _serializer.serialize(v) for k, v in values.items()}
+
+
+def deserialize(values):
+    global _deserializer
+    if _deserializer is None:
+        from boto3.dynamodb.types import TypeDeserializer
+        _deserializer = TypeDeserializer()
+    return {k: _deserializer.deserialize(v) for k, v in values.items()}
+
+
+def build_params(table_name, kwargs):
+    """Resource-style keyword arguments -> low-level client parameters"""
+    from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+
+    params = dict(kwargs)
+    if table_name:
+        params['TableName'] = table_name
+    builder = ConditionExpressionBuilder()
+    for name, is_key_condition in EXPRESSION_PARAMS:
+        condition = params.get(name)
+        if isinstance(condition, ConditionBase):
+            built = builder.build_expression(condition, is_key_condition=is_key_condition)
+            params[name] = built.condition_expression
+            params['ExpressionAttributeNames'] = {**params.get('ExpressionAttributeNames', {}), **built.attribute_name_placeholders}
+            params['ExpressionAttributeValues'] = {**params.get('ExpressionAttributeValues', {}), **built.attribute_value_placeholders}
+    for name in ('Key', 'Item', 'ExclusiveStartKey', 'ExpressionAttributeValues'):
+        if name in params:
+            params[name] = serialize(params[name])
+    return params
+
+
+def parse_result(result):
+    for name in ('Item', 'Attributes', 'LastEvaluatedKey'):
+        if name in result:
+            result[name] = deserialize(result[name])
+    if 'Items' in result:
+        result['Items'] = [deserialize(item) for item in result['Items']]
+    return result
+
+
+class Table:
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def _call(self, operation, kwargs):
+        return parse_result(invoke(operation, build_params(self.name, kwargs)))
+
+    def get_item(self, **kwargs):
+        return self._call('get_item', kwargs)
+
+    def put_item(self, **kwargs):
+        return self._call('put_item', kwargs)
+
+    def update_item(self, **kwargs):
+        return self._call('update_item', kwargs)
+
+    def delete_item(self, **kwargs):
+        return self._call('delete_item', kwargs)
+
+    def query(self, **kwargs):
+        return self._call('query', kwargs)
+
+    def scan(self, **kwargs):
+        return self._call('scan', kwargs)
+
+
+_tables = {}
+
+
+def table(name):
+    if name not in _tables:
+        _tables[name] = Table(name)
+    return _tables[name]
+
+
+def _convert_requests(request_items, convert):
+    converted = {}
+    for table_name, requests in request_items.items():
+        converted[table_name] = []
+        for request in requests:
+            if 'PutRequest' in request:
+                converted[table_name].append({'PutRequest': {'Item': convert(request['PutRequest']['Item'])}})
+            else:
+                converted[table_name].append({'DeleteRequest': {'Key': convert(request['DeleteRequest']['Key'])}})
+    return converted
+
+
+def batch_write_item(RequestItems, **kwargs):
+    result = invoke('batch_write_item', {'RequestItems': _convert_requests(RequestItems, serialize), **kwargs})
+    result['UnprocessedItems'] = _convert_requests(result.get('UnprocessedItems', {}), deserialize)
+    return result
+
+
+def warm(table_name):
+    """Build the client and open its HTTPS connection ahead of real traffic.
+
+    Used for provisioned concurrency and scheduled warm-up pings: a GetItem on a key
+    that never exists is the cheapest call that exercises auth and the connection pool.
+    Best-effort: a throttle or network error is logged and returns False, so it can't
+    fail container init or a warm-up invocation. Real requests will simply connect.
+    """
+    try:
+        table(table_name).get_item(Key={'user_id': '__warmup__'}, ProjectionExpression='user_id')
+        return True
+    except Exception as e:
+        log.warning('warm-up failed', table=table_name, error=str(e), error_type=type(e).__name__)
+        return False
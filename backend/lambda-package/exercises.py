@@ -0,0 +1,180 @@
+"""Exercise catalogue and plan recommendation.
+
+The catalogue is built once per process and indexed with integer bitsets (bit i is
+CATALOGUE[i]):
+
+- by level: exercises at or below each fitness level
+- by goal: exercises that train each goal
+- by condition: exercises to avoid with each health condition
+
+A plan request is then a few ANDs to find the safe candidates, plus a popcount per
+candidate to rank it by how many of the user's goals it trains. Plans are memoized on
+(level, goals, conditions), so repeat requests for a common profile are dictionary
+lookups. Both Lambda handlers and the FastAPI app use this module.
+"""
+
+from functools import lru_cache
+
+LEVELS = ('beginner', 'intermediate', 'advanced')
+
+# The FastAPI app describes users by mobility rather than fitness level
+LEVEL_ALIASES = {'low': 'beginner', 'medium': 'intermediate', 'high': 'advanced'}
+
+# Goal ids from the ProfileSetup page, plus the app's older names for some of them
+GOALS = ('weight_loss', 'strength', 'flexibility', 'balance', 'endurance', 'pain_relief', 'mobility', 'energy')
+GOAL_ALIASES = {'cardio': 'endurance'}
+
+CONDITIONS = ('diabetes', 'hypertension', 'cholesterol', 'arthritis', 'heart_disease', 'osteoporosis', 'back_pain', 'obesity')
+
+DEFAULT_PLAN_SIZE = 4
+
+
+def exercise(name, level, reps, duration, instructions, goals=(), avoid=()):
+    return {
+        'name': name,
+        'level': level,
+        'reps': reps,
+        'duration': duration,
+        'instructions': instructions,
+        'goals': goals,
+        'avoid': avoid,
+    }
+
+
+CATALOGUE = (
+    # Beginner - seated or supported
+    exercise('Seated Arm Raises', 'beginner', '10 each arm', '2 min', 'Raise arms slowly overhead',
+             ('flexibility', 'mobility', 'strength')),
+    exercise('Ankle Circles', 'beginner', '10 each foot', '2 min', 'Rotate ankles in circles',
+             ('mobility', 'pain_relief', 'balance')),
+    exercise('Seated Marching', 'beginner', '20 steps', '3 min', 'Lift knees while seated',
+             ('endurance', 'energy', 'weight_loss')),
+    exercise('Neck Stretches', 'beginner', '5 each side', '2 min', 'Gentle neck rotations',
+             ('flexibility', 'pain_relief')),
+    exercise('Wrist Rotations', 'beginner', '10 each', '1 min', 'Rotate wrists in circles',
+             ('mobility', 'pain_relief')),
+    exercise('Seated Twists', 'beginner', '10 each side', '2 min', 'Rotate torso left and right',
+             ('flexibility', 'mobility'), ('back_pain', 'osteoporosis')),
+    exercise('Shoulder Rolls', 'beginner', '10 each direction', '1 min', 'Roll shoulders slowly forward then back',
+             ('mobility', 'pain_relief', 'energy')),
+    exercise('Seated Leg Extensions', 'beginner', '10 each leg', '2 min', 'Straighten one knee, hold, lower slowly',
+             ('strength', 'mobility')),
+    exercise('Deep Breathing', 'beginner', '10 breaths', '2 min', 'Breathe in through the nose, out slowly through the mouth',
+             ('energy', 'pain_relief')),
+    exercise('Toe Taps', 'beginner', '20 each foot', '2 min', 'Tap toes while keeping heels down',
+             ('endurance', 'mobility', 'weight_loss')),
+    exercise('Seated Side Bends', 'beginner', '8 each side', '2 min', 'Reach one arm overhead and lean gently',
+             ('flexibility',), ('back_pain', 'osteoporosis')),
+    exercise('Hand Squeezes', 'beginner', '15 each hand', '1 min', 'Squeeze a soft ball, release slowly',
+             ('strength', 'pain_relief')),
+
+    # Intermediate - standing with support
+    exercise('Standing Leg Raises', 'intermediate', '10 each', '3 min', 'Hold chair, lift leg to side',
+             ('balance', 'strength', 'mobility')),
+    exercise('Wall Push-ups', 'intermediate', '10', '3 min', "Push-ups against wall at arm's length",
+             ('strength',), ('arthritis',)),
+    exercise('Heel-to-Toe Walk', 'intermediate', '20 steps', '3 min', 'Walk in straight line',
+             ('balance', 'mobility')),
+    exercise('Calf Raises', 'intermediate', '15', '2 min', 'Rise on toes, hold chair',
+             ('strength', 'balance', 'endurance')),
+    exercise('Sit-to-Stand', 'intermediate', '8', '3 min', 'Stand up from a chair without using hands, sit slowly',
+             ('strength', 'weight_loss', 'mobility'), ('arthritis',)),
+    exercise('Standing Hamstring Curls', 'intermediate', '10 each leg', '3 min', 'Hold chair, bend knee to lift heel behind',
+             ('strength', 'balance')),
+    exercise('Marching in Place', 'intermediate', '40 steps', '3 min', 'March with a steady rhythm, hold chair if needed',
+             ('endurance', 'energy', 'weight_loss'), ('heart_disease',)),
+    exercise('Chest Opener Stretch', 'intermediate', '5 holds', '2 min', 'Clasp hands behind back and lift chest',
+             ('flexibility', 'pain_relief')),
+    exercise('Side Leg Swings', 'intermediate', '10 each leg', '2 min', 'Hold chair, swing leg gently side to side',
+             ('mobility', 'balance')),
+    exercise('Overhead Reach', 'intermediate', '10', '2 min', 'Reach both arms overhead, stretch tall',
+             ('flexibility', 'energy')),
+
+    # Advanced - unsupported
+    exercise('Squats with Chair', 'advanced', '10', '3 min', 'Squat to chair height',
+             ('strength', 'weight_loss'), ('arthritis', 'back_pain')),
+    exercise('Standing Marches', 'advanced', '30', '3 min', 'March in place with arm swing',
+             ('endurance', 'energy', 'weight_loss'), ('heart_disease', 'hypertension')),
+    exercise('Side Steps', 'advanced', '10 each side', '3 min', 'Step side to side',
+             ('balance', 'endurance', 'weight_loss')),
+    exercise('Standing Balance', 'advanced', '30 sec each leg', '2 min', 'Stand on one leg',
+             ('balance',), ('osteoporosis',)),
+    exercise('Arm Circles', 'advanced', '15 each direction', '2 min', 'Large circles forward then backward',
+             ('mobility', 'strength', 'energy')),
+    exercise('Step-ups', 'advanced', '10 each leg', '3 min', 'Step onto a low stair and back down, hold the rail',
+             ('strength', 'endurance', 'weight_loss'), ('arthritis', 'heart_disease', 'hypertension')),
+    exercise('Brisk Walk', 'advanced', '5 min', '5 min', 'Walk briskly, arms swinging',
+             ('endurance', 'energy', 'weight_loss'), ('heart_disease',)),
+    exercise('Tandem Stance', 'advanced', '30 sec x 2', '2 min', 'Stand with one foot directly in front of the other',
+             ('balance',), ('osteoporosis',)),
+)
+
+
+def bitset(indexes):
+    bits = 0
+    for i in indexes:
+        bits |= 1 << i
+    return bits
+
+
+def iter_bits(bits):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+# Built once per process
+_goal_masks = [bitset(GOALS.index(g) for g in e['goals']) for e in CATALOGUE]
+_level_ranks = [LEVELS.index(e['level']) for e in CATALOGUE]
+_public = [{k: e[k] for k in ('name', 'reps', 'duration', 'instructions')} for e in CATALOGUE]
+_minutes = [int(e['duration'].split()[0]) for e in CATALOGUE]
+
+BY_LEVEL = {level: bitset(i for i, r in enumerate(_level_ranks) if r <= rank) for rank, level in enumerate(LEVELS)}
+BY_GOAL = {goal: bitset(i for i, e in enumerate(CATALOGUE) if goal in e['goals']) for goal in GOALS}
+BY_CONDITION = {condition: bitset(i for i, e in enumerate(CATALOGUE) if condition in e['avoid']) for condition in CONDITIONS}
+
+
+def normalize_level(level):
+    level = LEVEL_ALIASES.get(level, level)
+    return level if level in LEVELS else LEVELS[0]
+
+
+def normalize(values, known, aliases=None):
+    """Known ids only, deduplicated and sorted, so equal profiles share a cache entry"""
+    aliases = aliases or {}
+    return tuple(sorted({aliases.get(v, v) for v in values or () if aliases.get(v, v) in known}))
+
+
+@lru_cache(maxsize=1024)
+def _recommend(level, goals, conditions, size):
+    rank = LEVELS.index(level)
+    candidates = BY_LEVEL[level]
+    for condition in conditions:
+        candidates &= ~BY_CONDITION[condition]
+    goal_mask = bitset(GOALS.index(g) for g in goals)
+
+    # Exercises training more of the user's goals first, then ones pitched at the
+    # user's own level, then catalogue order
+    def score(i):
+        return (-bin(_goal_masks[i] & goal_mask).count('1'), _level_ranks[i] != rank, i)
+
+    # Cover every goal once before doubling up on any, then fill by score
+    chosen = []
+    taken = 0
+    for goal in goals:
+        left = candidates & BY_GOAL[goal] & ~taken
+        if left and len(chosen) < size:
+            best = min(iter_bits(left), key=score)
+            chosen.append(best)
+            taken |= 1 << best
+    chosen.extend(sorted(iter_bits(candidates & ~taken), key=score)[:size - len(chosen)])
+
+    # Easier exercises first so the plan warms up
+    return tuple(sorted(chosen, key=lambda i: (_level_ranks[i], i)))
+
+
+def recommend(level, goals=(), conditions=(), size=DEFAULT_PLAN_SIZE):
+    """Exercises for a plan as [{name, reps, duration, instructions}], plus total minutes"""
+    chosen = _recommend(normalize_level(level), normalize(goals, GOALS, GOAL_ALIASES), normalize(conditions, CONDITIONS), size)
+    return [dict(_public[i]) for i in chosen], sum(_minutes[i] for i in chosen)
@@ -0,0 +1,111 @@
+"""Row-by-row encoding for GET /export: NDJSON or CSV, optionally gzip-compressed.
+
+A synchronous Lambda response is capped at 6 MB and API Gateway gives up after 29 s,
+so an export is written in chunks: rows are encoded one at a time into a buffer that
+stops short of MAX_BYTES (or the time budget), and the handler hands back a cursor for
+the next chunk. Only the current DynamoDB page and the encoded chunk are ever held.
+
+- EXPORT_MAX_BYTES             chunk size for plain output (default 5,000,000)
+- EXPORT_MAX_GZIP_BYTES        chunk size for gzip output, before base64 (default 4,000,000)
+- EXPORT_TIME_BUDGET_SECONDS   stop reading DynamoDB after this long (default 20)
+"""
+
+import csv
+import io
+import os
+import time
+import zlib
+
+import serialization
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+MAX_BYTES = int(os.environ.get('EXPORT_MAX_BYTES', '5000000'))
+# gzip bodies go out base64-encoded, which adds a third
+MAX_GZIP_BYTES = int(os.environ.get('EXPORT_MAX_GZIP_BYTES', '4000000'))
+TIME_BUDGET_SECONDS = float(os.environ.get('EXPORT_TIME_BUDGET_SECONDS', '20'))
+# Input deflate may still be holding back when a row is checked against the budget
+GZIP_SLACK = 128 * 1024
+
+CSV_COLUMNS = (
+    'record_type', 'date', 'progress_id', 'meal_type', 'food_name', 'calories', 'protein', 'carbs', 'fat',
+    'exercises_completed', 'total_exercises', 'duration_minutes', 'calories_burned', 'created_at'
+)
+# Index bookkeeping, not part of the user's data
+HIDDEN_FIELDS = ('record_key',)
+
+
+def csv_cell(value):
+    if value is None:
+        return ''
+    text = str(value)
+    # Spreadsheets run cells starting with these as formulas
+    if text[:1] in ('=', '+', '-', '@') and not text.lstrip('-').replace('.', '', 1).isdigit():
+        return "'" + text
+    return text
+
+
+class ChunkWriter:
+    """Encodes records into one export chunk of at most max_bytes"""
+
+    def __init__(self, fmt, gzip=False, header=True):
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        self.fmt = fmt
+        self.gzip = gzip
+        self.max_bytes = MAX_GZIP_BYTES if gzip else MAX_BYTES
+        self.rows = 0
+        self._chunks = []
+        self.size = 0
+        # wbits=31 writes a gzip header and trailer around the deflate stream
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+        if fmt == 'csv' and header:
+            self._write(self._csv_line(CSV_COLUMNS))
+
+    def _csv_line(self, values):
+        line = io.StringIO()
+        csv.writer(line, lineterminator='\n').writerow(values)
+        return line.getvalue().encode()
+
+    def encode(self, item):
+        if self.fmt == 'csv':
+            return self._csv_line(csv_cell(item.get(column)) for column in CSV_COLUMNS)
+        return serialization.dumps({k: v for k, v in item.items() if k not in HIDDEN_FIELDS}).encode() + b'\n'
+
+    def _write(self, data):
+        if self._compressor:
+            data = self._compressor.compress(data)
+        self._chunks.append(data)
+        self.size += len(data)
+
+    def add(self, item):
+        """Append one record, returns False (writing nothing) once it would overflow the chunk.
+        The first record always goes in, so every chunk makes progress"""
+        row = self.encode(item)
+        pending = len(row) + (GZIP_SLACK if self._compressor else 0)
+        if self.rows and self.size + pending > self.max_bytes:
+            return False
+        self._write(row)
+        self.rows += 1
+        return True
+
+    def finish(self):
+        if self._compressor:
+            self._chunks.append(self._compressor.flush())
+        return b''.join(self._chunks)
+
+
+def write_chunk(writer, items, deadline):
+    """Feed items to writer until they run out or a budget does.
+    Returns the last record written when it stopped early, otherwise None"""
+    last = None
+    for item in items:
+        if last is not None and time.monotonic() > deadline:
+            return last
+        if not writer.add(item):
+            return last
+        last = item
+    return None
@@ -0,0 +1,223 @@
+"""Food autocomplete over the packed food index (foods.idx, built by scripts/pack_foods.py).
+
+The index is memory-mapped on the first search and read in place: a lookup touches a
+few pages of the file instead of turning the whole dataset into Python objects at
+cold start. It holds
+
+- one fixed-size record per food (macros, unit, offsets of its name and search key)
+- the best foods for every word prefix of up to PREFIX_LENGTH letters, ready to return
+- every word of every search key, sorted, for longer prefixes ("chick" -> "chicken")
+- trigram postings (pg_trgm style, hashed to uint32) for typo matches ("chiken")
+
+Foods whose name starts with the query rank first, then shorter names. Trigram matches
+fill the rest of the results only when there are too few prefix matches. Layout
+(little-endian, every section 4-byte aligned):
+
+    header   HEADER struct, see below
+    meta     JSON: units, source, food count, padded with spaces
+    records  RECORD struct per food, shortest search key first (ties by key), so
+             a lower id is a shorter name
+    words    WORD struct per (word, food) pair, sorted by word, then foods starting
+             with it, then id
+    prefixes SLOT struct per distinct word prefix, sorted by prefix code
+    grams    SLOT struct per distinct trigram hash, sorted by hash
+    postings uint32 food ids: a best-first run per prefix, a sorted run per gram
+    strings  UTF-8 names and search keys
+"""
+
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import unicodedata
+import zlib
+from bisect import bisect_left
+from collections import Counter
+
+MAGIC = b'OIGF'
+VERSION = 1
+# magic, version, record/word/prefix/gram counts, then offsets of meta (+ length),
+# records, words, prefixes, grams, postings and strings
+HEADER = struct.Struct('<4sHxxIIIIIIIIIIII')
+# name offset, key offset, name length, key length, unit, gram count, then per-unit
+# calories, protein, carbs, fat and the default amount
+RECORD = struct.Struct('<IIHHBxHfffff')
+# key offset of the word, its length, its position in the key, food id
+WORD = struct.Struct('<IHBxI')
+# prefix code or trigram hash, first posting, posting count
+SLOT = struct.Struct('<III')
+
+INDEX_PATH = os.environ.get('FOODS_INDEX_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'foods.idx')
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 25
+# Word prefixes up to this long answer from their precomputed MAX_LIMIT best foods
+PREFIX_LENGTH = 4
+# Upper bounds on the foods looked at per query, keep a broad query as cheap as a narrow one
+MAX_CANDIDATES = 100
+MAX_GRAM_POSTINGS = 256
+MAX_TYPO_CANDIDATES = 50
+# Dice similarity of trigram sets a food needs to count as a typo match
+MIN_SIMILARITY = 0.3
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def normalize(text):
+    """Lowercase ASCII words separated by single spaces: 'Crème Brûlée!' -> 'creme brulee'"""
+    folded = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode().lower()
+    return _NON_WORD.sub(' ', folded).strip()
+
+
+def trigrams(key):
+    """Hashed trigrams of a normalized key, each word padded as '  word '"""
+    grams = set()
+    for word in key.split():
+        padded = f'  {word} '
+        grams.update(zlib.crc32(padded[i:i + 3].encode()) for i in range(len(padded) - 2))
+    return grams
+
+
+def prefix_code(prefix):
+    """uint32 for a prefix of 1 to PREFIX_LENGTH letters, ordered like the prefixes"""
+    return int.from_bytes(prefix.encode().ljust(PREFIX_LENGTH, b'\0'), 'big')
+
+
+class FoodIndex:
+    """Read-only view of one foods.idx file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.count, self._word_count, prefix_count, gram_count, meta_offset, meta_length,
+         self._records, self._words, self._prefixes, self._grams, postings, self._strings) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a version {VERSION} food index')
+        self.meta = json.loads(self._map[meta_offset:meta_offset + meta_length])
+        self._units = self.meta['units']
+        # Strided views straight into the map: bisectable without copying anything out
+        view = memoryview(self._map)
+        self._prefix_codes = view[self._prefixes:self._prefixes + prefix_count * SLOT.size].cast('I')[0::3]
+        self._gram_hashes = view[self._grams:self._grams + gram_count * SLOT.size].cast('I')[0::3]
+        self._gram_counts = view[self._records:self._records + self.count * RECORD.size].cast('H')[7::RECORD.size // 2]
+        self._postings = view[postings:self._strings].cast('I')
+
+    def _text(self, offset, length):
+        start = self._strings + offset
+        return self._map[start:start + length].decode()
+
+    def _word(self, i):
+        key_offset, length, position, food_id = WORD.unpack_from(self._map, self._words + i * WORD.size)
+        start = self._strings + key_offset
+        return self._map[start:start + length], position, food_id
+
+    def _key_words(self, food_id):
+        key_offset, key_length = RECORD.unpack_from(self._map, self._records + food_id * RECORD.size)[1:4:2]
+        start = self._strings + key_offset
+        return self._map[start:start + key_length].split()
+
+    def _slot(self, codes, table, code):
+        """(first, count) of the postings run for code, or None"""
+        i = bisect_left(codes, code)
+        if i < len(codes) and codes[i] == code:
+            return SLOT.unpack_from(self._map, table + i * SLOT.size)[1:]
+        return None
+
+    def record(self, food_id):
+        name_offset, _, name_length, _, unit, _, calories, protein, carbs, fat, amount = RECORD.unpack_from(
+            self._map, self._records + food_id * RECORD.size)
+        return {
+            'name': self._text(name_offset, name_length),
+            'calories': round(calories, 1),
+            'protein': round(protein, 1),
+            'carbs': round(carbs, 1),
+            'fat': round(fat, 1),
+            'unit': self._units[unit],
+            'default_amount': round(amount, 2),
+        }
+
+    def _prefix_matches(self, prefix, best_only=True):
+        """Best-first ids of foods with a word starting with prefix, at most MAX_CANDIDATES.
+        Short prefixes give just their MAX_LIMIT precomputed best unless best_only is False"""
+        if best_only and len(prefix) <= PREFIX_LENGTH:
+            slot = self._slot(self._prefix_codes, self._prefixes, prefix_code(prefix))
+            return self._postings[slot[0]:slot[0] + slot[1]].tolist() if slot else []
+        encoded = prefix.encode()
+        lo, hi = 0, self._word_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._word(mid)[0] < encoded:
+                lo = mid + 1
+            else:
+                hi = mid
+        ranks = {}
+        while lo < self._word_count and len(ranks) < MAX_CANDIDATES:
+            word, position, food_id = self._word(lo)
+            if not word.startswith(encoded):
+                break
+            rank = (position != 0, food_id)
+            if rank < ranks.get(food_id, (True, food_id + 1)):
+                ranks[food_id] = rank
+            lo += 1
+        return sorted(ranks, key=ranks.get)
+
+    def _similar(self, key):
+        """(similarity, food id) for foods sharing enough trigrams with key"""
+        query = trigrams(key)
+        hits = Counter()
+        for gram in query:
+            slot = self._slot(self._gram_hashes, self._grams, gram)
+            if slot:
+                hits.update(self._postings[slot[0]:slot[0] + min(slot[1], MAX_GRAM_POSTINGS)])
+        matches = []
+        for food_id, shared in hits.most_common(MAX_TYPO_CANDIDATES):
+            # Dice coefficient over the two trigram sets
+            similarity = 2 * shared / (len(query) + self._gram_counts[food_id])
+            if similarity >= MIN_SIMILARITY:
+                matches.append((similarity, food_id))
+        return matches
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        key = normalize(query)
+        if not key:
+            return []
+        words = key.split()
+        # Every word of the query must start a word of the food: "br ri" -> "brown rice".
+        # Candidates come from the longest (most selective) word, the others are checked
+        longest = max(words, key=len)
+        ranked = self._prefix_matches(longest, best_only=len(words) == 1)
+        if len(words) > 1:
+            first = words[0].encode()
+            others = [word.encode() for word in words if word is not longest]
+            checked = []
+            for food_id in ranked:
+                food_words = self._key_words(food_id)
+                if all(any(w.startswith(word) for w in food_words) for word in others):
+                    checked.append((not food_words[0].startswith(first), food_id))
+            ranked = [food_id for _, food_id in sorted(checked)]
+        ranked = ranked[:limit]
+        if len(ranked) < limit:
+            seen = set(ranked)
+            similar = sorted((-similarity, food_id) for similarity, food_id in self._similar(key) if food_id not in seen)
+            ranked += [food_id for _, food_id in similar[:limit - len(ranked)]]
+        return [self.record(food_id) for food_id in ranked]
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """The shared FoodIndex, mapped on first use. Raises FileNotFoundError if foods.idx wasn't packed"""
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = FoodIndex(INDEX_PATH)
+    return _index
+
+
+def search(query, limit=DEFAULT_LIMIT):
+    return get_index().search(query, limit)
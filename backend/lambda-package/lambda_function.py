@@ -1,226 +1,679 @@
+import base64
 import json
-import boto3
-from decimal import Decimal
-from datetime import datetime
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import uuid
 
-dynamodb = boto3.resource('dynamodb')
-users_table = dynamodb.Table('oldisgold-users')
-plans_table = dynamodb.Table('oldisgold-plans')
-progress_table = dynamodb.Table('oldisgold-progress')
+import batch_writes
+import cache
+import db
+import exercises
+import export
+import foods
+import log
+import metrics
+import projection
+import rollups
+import serialization
+import stats
+from router import MethodNotAllowed, NotFound, Router, normalize_event
 
-def decimal_to_num(obj):
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    elif isinstance(obj, dict):
-        return {k: decimal_to_num(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [decimal_to_num(i) for i in obj]
-    return obj
+# Table handles are free to create; the DynamoDB client behind them is built on first use
+users_table = db.table('oldisgold-users')
+plans_table = db.table('oldisgold-plans')
+progress_table = db.table('oldisgold-progress')
+profiles_table = db.table('oldisgold-profiles')
+summary_table = db.table(rollups.SUMMARY_TABLE)
+stats_table = db.table(stats.STATS_TABLE)
+
+# GSI on oldisgold-progress: user_id (HASH) + record_key (RANGE), where
+# record_key is "<record_type>#<YYYY-MM-DD>". Lets us read one user's meals or
+# workouts for a date range without scanning the whole table.
+# Existing items are backfilled with scripts/backfill_record_keys.py
+RECORD_INDEX = 'user_id-record_key-index'
+DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+# GET /summary defaults to this many days ending today when no range is given
+DEFAULT_SUMMARY_DAYS = 30
+
+# GET /dashboard runs its profile, plan and history reads side by side; the pool lives
+# for the container's lifetime so warm invocations don't pay thread start-up
+dashboard_pool = ThreadPoolExecutor(max_workers=4)
+
+# Upper bound for /nutrition/batch and /progress/batch. Under throttling 12 chunks of
+# backoff (plus botocore's retries) can outlast API Gateway's 29 s, so batch_put also
+# stops starting chunks after BATCH_WRITE_BUDGET_SECONDS; whatever it didn't reach is
+# reported failed for the client to resend, and the rollup updates get the rest
+MAX_BATCH_RECORDS = 300
+BATCH_WRITE_BUDGET_SECONDS = 15
+
+# History endpoints return newest-first pages of ?limit= items (default below),
+# plus an opaque next_cursor to pass back as ?cursor= for the following page
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 500
+
+# Encoded GET /plans bodies by user_id, see cache.py. POST /users replaces the plan
+# and drops the entry
+plan_cache = cache.TTLCache()
+
+# Encoded GET /analytics bodies by user_id, each stored with the version it was computed
+# for (the user's last_write_at and the day), so it is reused until either changes
+analytics_cache = cache.TTLCache(ttl_seconds=float(os.environ.get('ANALYTICS_CACHE_TTL_SECONDS', '3600')))
+
+router = Router()
+
+HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,If-None-Match',
+    'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+    'Access-Control-Expose-Headers': 'ETag,X-Next-Cursor,Content-Disposition,Retry-After'
+}
 
 def response(status_code, body):
+    if isinstance(body, dict):
+        if 'count' in body:
+            log.annotate(item_count=body['count'])
+        if status_code >= 500:
+            log.annotate(error=body.get('error'))
     return {
         'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type',
-            'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
-        },
-        'body': json.dumps(decimal_to_num(body))
+        'headers': dict(HEADERS),
+        'body': serialization.dumps(body)
+    }
+
+def error_response(error):
+    """503 with Retry-After while DynamoDB is throttling or unreachable (see db.py),
+    500 for anything else"""
+    if isinstance(error, db.Unavailable):
+        unavailable = response(503, {'error': str(error)})
+        unavailable['headers']['Retry-After'] = str(error.retry_after)
+        return unavailable
+    return response(500, {'error': str(error)})
+
+def etag_response(request, body):
+    """200 with an ETag for an already encoded body, or a body-less 304 when the
+    client's If-None-Match shows it already has this version"""
+    etag = cache.make_etag(body)
+    headers = {**HEADERS, 'ETag': etag, 'Cache-Control': 'no-cache'}
+    if cache.etag_matches(request.headers.get('if-none-match'), etag):
+        return {'statusCode': 304, 'headers': headers, 'body': ''}
+    return {'statusCode': 200, 'headers': headers, 'body': body}
+
+def make_record_key(record_type, date_str):
+    return f"{record_type}#{date_str}"
+
+def get_date_range(params):
+    """Read optional ?from=YYYY-MM-DD&to=YYYY-MM-DD, raises ValueError if malformed"""
+    date_from = params.get('from')
+    date_to = params.get('to')
+    for value in (date_from, date_to):
+        if value is not None and not DATE_RE.match(value):
+            raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD")
+    if date_from and date_to and date_from > date_to:
+        raise ValueError("'from' must not be after 'to'")
+    return date_from, date_to
+
+def get_today(params):
+    today = params.get('today')
+    if not today:
+        return datetime.utcnow().date()
+    if not DATE_RE.match(today):
+        raise ValueError("'today' must be YYYY-MM-DD")
+    return datetime.strptime(today, '%Y-%m-%d').date()
+
+def encode_cursor(last_key):
+    if not last_key:
+        return None
+    raw = json.dumps(last_key, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Turn a next_cursor back into an ExclusiveStartKey, raises ValueError if it was tampered with"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        last_key = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(last_key, dict) or not all(isinstance(v, str) for v in last_key.values()):
+        raise ValueError('Invalid cursor')
+    return last_key
+
+def get_page_params(params):
+    """Read optional ?limit=&cursor=, raises ValueError if malformed"""
+    limit = params.get('limit')
+    if limit is None:
+        limit = DEFAULT_PAGE_LIMIT
+    else:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError('limit must be a number')
+        if not 1 <= limit <= MAX_PAGE_LIMIT:
+            raise ValueError(f'limit must be between 1 and {MAX_PAGE_LIMIT}')
+    return limit, decode_cursor(params.get('cursor'))
+
+def query_records(user_id, record_type, date_from=None, date_to=None, limit=None, cursor=None, fields=None):
+    """Newest-first records of one type for one user, optionally limited to a date range
+    and to the attributes in `fields`.
+
+    Returns (items, next_cursor). With no limit every page is read and next_cursor is None.
+    """
+    from boto3.dynamodb.conditions import Key
+
+    if cursor and cursor.get('user_id') != str(user_id):
+        raise ValueError('Invalid cursor')
+    key_condition = Key('user_id').eq(str(user_id)) & Key('record_key').between(
+        make_record_key(record_type, date_from or ''),
+        make_record_key(record_type, date_to or '9999-12-31')
+    )
+    query_kwargs = {'IndexName': RECORD_INDEX, 'KeyConditionExpression': key_condition, 'ScanIndexForward': False}
+    projection.apply(query_kwargs, fields)
+    if cursor:
+        query_kwargs['ExclusiveStartKey'] = cursor
+    items = []
+    while True:
+        if limit:
+            query_kwargs['Limit'] = limit - len(items)
+        result = progress_table.query(**query_kwargs)
+        items.extend(result.get('Items', []))
+        last_key = result.get('LastEvaluatedKey')
+        if not last_key or (limit and len(items) >= limit):
+            return items, encode_cursor(last_key)
+        query_kwargs['ExclusiveStartKey'] = last_key
+
+def iter_history(user_id, cursor=None):
+    """Every record of one user, meals then workouts, oldest first, one page in memory at a time"""
+    from boto3.dynamodb.conditions import Key
+
+    query_kwargs = {'IndexName': RECORD_INDEX, 'KeyConditionExpression': Key('user_id').eq(str(user_id))}
+    if cursor:
+        query_kwargs['ExclusiveStartKey'] = cursor
+    while True:
+        result = progress_table.query(**query_kwargs)
+        yield from result.get('Items', [])
+        if 'LastEvaluatedKey' not in result:
+            return
+        query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+def query_summaries(user_id, date_from, date_to):
+    """Daily rollup items for one user, oldest first"""
+    from boto3.dynamodb.conditions import Key
+
+    query_kwargs = {
+        'KeyConditionExpression': Key('user_id').eq(str(user_id)) & Key('date').between(date_from, date_to)
+    }
+    days = []
+    while True:
+        result = summary_table.query(**query_kwargs)
+        days.extend(result.get('Items', []))
+        if 'LastEvaluatedKey' not in result:
+            return days
+        query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+def delete_record(user_id, progress_id):
+    """Delete one meal/workout and take it back out of its day's rollup, returns False if missing"""
+    result = progress_table.delete_item(
+        Key={'user_id': user_id, 'progress_id': progress_id},
+        ReturnValues='ALL_OLD'
+    )
+    old_item = result.get('Attributes')
+    if not old_item:
+        return False
+    if old_item.get('date'):
+        rollups.apply_rollup_after_write(summary_table, stats_table, user_id, old_item['date'], rollups.record_deltas(old_item), sign=-1)
+    return True
+
+def get_record_date(body):
+    """The client's date (its local day), or today in UTC without one. Raises ValueError
+    if malformed, before anything is written"""
+    client_date = body.get('date')
+    if client_date is None or client_date == '':
+        return datetime.utcnow().strftime('%Y-%m-%d')
+    return rollups.check_date(client_date)
+
+def build_meal_item(body):
+    date_str = get_record_date(body)
+    return {
+        'progress_id': str(uuid.uuid4()),
+        'user_id': str(body.get('user_id', '')),
+        'date': date_str,
+        'record_type': 'meal',
+        'record_key': make_record_key('meal', date_str),
+        'meal_type': str(body.get('meal_type', 'snack')),
+        'food_name': str(body.get('food_name', '')),
+        'calories': int(body.get('calories', 0)),
+        'protein': int(body.get('protein', 0)),
+        'carbs': int(body.get('carbs', 0)),
+        'fat': int(body.get('fat', 0)),
+        'created_at': datetime.utcnow().isoformat()
+    }
+
+def build_workout_item(body):
+    date_str = get_record_date(body)
+    return {
+        'progress_id': str(uuid.uuid4()),
+        'user_id': str(body.get('user_id', '')),
+        'date': date_str,
+        'record_type': 'workout',
+        'record_key': make_record_key('workout', date_str),
+        'workout_completed': True,
+        'exercises_completed': int(body.get('exercises_completed', 0)),
+        'total_exercises': int(body.get('total_exercises', 0)),
+        'duration_minutes': int(body.get('duration_minutes', 0)),
+        'calories_burned': int(body.get('calories_burned', 0)),
+        'created_at': datetime.utcnow().isoformat()
+    }
+
+def save_batch(request, build_item):
+    """Write many meals or workouts in one invocation and report a result per record"""
+    try:
+        body = request.json()
+    except ValueError:
+        return response(400, {'error': 'Invalid JSON body'})
+    records = body.get('records') if isinstance(body, dict) else None
+    if not isinstance(records, list) or not records:
+        return response(400, {'error': 'records must be a non-empty list'})
+    if len(records) > MAX_BATCH_RECORDS:
+        return response(400, {'error': f'At most {MAX_BATCH_RECORDS} records per batch'})
+
+    results = []
+    items = []
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            results.append({'index': index, 'status': 'invalid', 'error': 'record must be an object'})
+            continue
+        # Top-level user_id applies to every record that doesn't carry its own
+        record = {'user_id': body.get('user_id'), **record}
+        if not record.get('user_id'):
+            results.append({'index': index, 'status': 'invalid', 'error': 'user_id required'})
+            continue
+        try:
+            item = build_item(record)
+        except (TypeError, ValueError) as e:
+            results.append({'index': index, 'status': 'invalid', 'error': str(e)})
+            continue
+        items.append(item)
+        results.append({'index': index, 'status': 'saved', 'id': item['progress_id'], 'date': item['date']})
+
+    # Never raises: a chunk that fails is reported per record below, so a client retrying
+    # the failed ones doesn't write the saved ones again
+    deadline = time.monotonic() + BATCH_WRITE_BUDGET_SECONDS
+    failed = batch_writes.batch_put(db, progress_table.name, items, ('user_id', 'progress_id'), deadline=deadline)
+
+    # One ADD per (user, day) instead of one per record
+    day_deltas = {}
+    for item in items:
+        if (item['user_id'], item['progress_id']) in failed:
+            continue
+        totals = day_deltas.setdefault((item['user_id'], item['date']), {})
+        for field, amount in rollups.record_deltas(item).items():
+            totals[field] = totals.get(field, 0) + amount
+    for (user_id, date_str), deltas in day_deltas.items():
+        # The records are saved and must stay reported as saved
+        rollups.apply_rollup_after_write(summary_table, stats_table, user_id, date_str, deltas)
+
+    failed_ids = {progress_id for _, progress_id in failed}
+    for result in results:
+        if result.get('id') in failed_ids:
+            result['status'] = 'failed'
+            result['error'] = 'Not written (throttled or out of time), retry later'
+    saved = sum(1 for r in results if r['status'] == 'saved')
+    status_code = 201 if saved == len(results) else 207
+    return response(status_code, {'results': results, 'saved': saved, 'failed': len(results) - saved})
+
+def get_item_or_none(table, user_id):
+    return table.get_item(Key={'user_id': user_id}).get('Item')
+
+def load_dashboard(user_id, date_from=None, date_to=None, limit=DEFAULT_PAGE_LIMIT, today=None):
+    """Everything the Progress page needs, fetched concurrently in one invocation"""
+    profile = dashboard_pool.submit(get_item_or_none, profiles_table, user_id)
+    plan = dashboard_pool.submit(get_item_or_none, plans_table, user_id)
+    user_stats = dashboard_pool.submit(get_item_or_none, stats_table, user_id)
+    workouts = dashboard_pool.submit(query_records, user_id, 'workout', date_from, date_to, limit, None, projection.WORKOUT_FIELDS)
+    meals = dashboard_pool.submit(query_records, user_id, 'meal', date_from, date_to, limit, None, projection.MEAL_FIELDS)
+    workout_items, workouts_cursor = workouts.result()
+    meal_items, meals_cursor = meals.result()
+    return {
+        'user_id': user_id,
+        'profile': profile.result(),
+        'plan': plan.result(),
+        'stats': stats.describe(user_stats.result(), today or datetime.utcnow().date()),
+        'workouts': workout_items,
+        'meals': meal_items,
+        'next_cursors': {'workouts': workouts_cursor, 'meals': meals_cursor}
     }
 
 def generate_plan(user_data):
     fitness_level = user_data.get('fitness_level', 'beginner')
-    exercises = {
-        'beginner': [
-            {'name': 'Seated Arm Raises', 'reps': '10 each arm', 'duration': '2 min', 'instructions': 'Raise arms slowly overhead'},
-            {'name': 'Ankle Circles', 'reps': '10 each foot', 'duration': '2 min', 'instructions': 'Rotate ankles in circles'},
-            {'name': 'Seated Marching', 'reps': '20 steps', 'duration': '3 min', 'instructions': 'Lift knees while seated'},
-            {'name': 'Neck Stretches', 'reps': '5 each side', 'duration': '2 min', 'instructions': 'Gentle neck rotations'},
-        ],
-        'intermediate': [
-            {'name': 'Standing Leg Raises', 'reps': '10 each', 'duration': '3 min', 'instructions': 'Hold chair, lift leg to side'},
-            {'name': 'Wall Push-ups', 'reps': '10', 'duration': '3 min', 'instructions': 'Push-ups against wall'},
-            {'name': 'Heel-to-Toe Walk', 'reps': '20 steps', 'duration': '3 min', 'instructions': 'Walk in straight line'},
-            {'name': 'Calf Raises', 'reps': '15', 'duration': '2 min', 'instructions': 'Rise on toes, hold chair'},
-        ],
-        'advanced': [
-            {'name': 'Squats with Chair', 'reps': '10', 'duration': '3 min', 'instructions': 'Squat to chair height'},
-            {'name': 'Standing Marches', 'reps': '30', 'duration': '3 min', 'instructions': 'March in place with arm swing'},
-            {'name': 'Side Steps', 'reps': '10 each side', 'duration': '3 min', 'instructions': 'Step side to side'},
-            {'name': 'Standing Balance', 'reps': '30 sec each leg', 'duration': '2 min', 'instructions': 'Stand on one leg'},
-        ]
-    }
-    selected = exercises.get(fitness_level, exercises['beginner'])
-    total_duration = sum(int(e['duration'].split()[0]) for e in selected)
+    selected, total_duration = exercises.recommend(fitness_level, user_data.get('goals'), user_data.get('health_conditions'))
     return {'exercises': selected, 'duration_minutes': total_duration, 'difficulty': fitness_level, 'created_at': datetime.now().isoformat()}
 
-def lambda_handler(event, context):
-    # Handle both API Gateway v1 and v2 formats
-    method = event.get('httpMethod') or event.get('requestContext', {}).get('http', {}).get('method', '')
-    path = event.get('path') or event.get('rawPath') or event.get('requestContext', {}).get('http', {}).get('path', '')
-    
-    # Remove /prod prefix if present
-    if path.startswith('/prod'):
-        path = path[5:]
-    
-    print(f"DEBUG - Method: {method}, Path: {path}")
-    print(f"DEBUG - Full event: {json.dumps(event)[:500]}")
-    
-    if method == 'OPTIONS':
-        return response(200, {'message': 'OK'})
-    
-    if '/health' in path:
-        return response(200, {'status': 'healthy'})
-    
-    # ===== NUTRITION ENDPOINTS =====
-    
-    # POST /nutrition
-    if method == 'POST' and '/nutrition' in path:
-        try:
-            body = json.loads(event.get('body', '{}'))
-            meal_id = str(uuid.uuid4())
-            
-            # Use client-provided date if available, otherwise fallback to UTC
-            client_date = body.get('date')
-            if client_date and len(client_date) == 10:  # Validate YYYY-MM-DD format
-                date_str = client_date
-            else:
-                date_str = datetime.utcnow().strftime('%Y-%m-%d')
-            
-            meal_data = {
-                'progress_id': meal_id,
-                'user_id': str(body.get('user_id', '')),
-                'date': date_str,
-                'record_type': 'meal',
-                'meal_type': str(body.get('meal_type', 'snack')),
-                'food_name': str(body.get('food_name', '')),
-                'calories': int(body.get('calories', 0)),
-                'protein': int(body.get('protein', 0)),
-                'carbs': int(body.get('carbs', 0)),
-                'fat': int(body.get('fat', 0)),
-                'created_at': datetime.utcnow().isoformat()
-            }
-            progress_table.put_item(Item=meal_data)
-            return response(201, {'message': 'Meal saved', 'meal_id': meal_id, 'date': date_str})
-        except Exception as e:
-            return response(500, {'error': str(e)})
-    
-    # GET /nutrition/{user_id}
-    if method == 'GET' and '/nutrition/' in path:
-        user_id = path.split('/')[-1]
-        try:
-            result = progress_table.scan()
-            all_items = result.get('Items', [])
-            print(f"DEBUG GET NUTRITION - user_id from path: {user_id}")
-            print(f"DEBUG GET NUTRITION - total items in table: {len(all_items)}")
-            print(f"DEBUG GET NUTRITION - all items: {all_items[:3]}")  # First 3 items for debug
-            
-            meals = []
-            for item in all_items:
-                item_user_id = str(item.get('user_id', ''))
-                item_record_type = item.get('record_type')
-                if item_user_id == str(user_id) and item_record_type == 'meal':
-                    meals.append(item)
-                    print(f"DEBUG - Found meal: {item.get('food_name')}")
-            
-            print(f"DEBUG GET NUTRITION - found {len(meals)} meals for user")
-            return response(200, {'meals': meals, 'count': len(meals)})
-        except Exception as e:
-            print(f"DEBUG GET NUTRITION - ERROR: {str(e)}")
-            return response(500, {'error': str(e)})
-    
-    # DELETE /nutrition/{user_id}/{meal_id}
-    if method == 'DELETE' and '/nutrition/' in path:
-        parts = path.split('/')
-        user_id = parts[-2]
-        meal_id = parts[-1]
-        try:
-            progress_table.delete_item(Key={'user_id': user_id, 'progress_id': meal_id})
-            return response(200, {'message': 'Meal deleted'})
-        except Exception as e:
-            return response(500, {'error': str(e)})
-    # ===== PROGRESS ENDPOINTS =====
-    
-    # POST /progress
-    if method == 'POST' and '/progress' in path:
-        try:
-            body = json.loads(event.get('body', '{}'))
-            progress_id = str(uuid.uuid4())
-            
-            # Use client-provided date if available, otherwise fallback to UTC
-            client_date = body.get('date')
-            if client_date and len(client_date) == 10:  # Validate YYYY-MM-DD format
-                date_str = client_date
-            else:
-                date_str = datetime.utcnow().strftime('%Y-%m-%d')
-            
-            progress_data = {
-                'progress_id': progress_id,
-                'user_id': str(body.get('user_id', '')),
-                'date': date_str,
-                'record_type': 'workout',
-                'workout_completed': True,
-                'exercises_completed': int(body.get('exercises_completed', 0)),
-                'total_exercises': int(body.get('total_exercises', 0)),
-                'duration_minutes': int(body.get('duration_minutes', 0)),
-                'calories_burned': int(body.get('calories_burned', 0)),
-                'created_at': datetime.utcnow().isoformat()
-            }
-            progress_table.put_item(Item=progress_data)
-            return response(201, {'message': 'Progress saved', 'progress_id': progress_id, 'date': date_str})
-        except Exception as e:
-            return response(500, {'error': str(e)})
-    
-    # GET /progress/{user_id}
-    if method == 'GET' and '/progress/' in path:
-        user_id = path.split('/')[-1]
+# ===== HEALTH =====
+
+@router.route('GET', '/health')
+def health(request):
+    return response(200, {'status': 'healthy'})
+
+# ===== NUTRITION ENDPOINTS =====
+
+# POST /nutrition/batch - {"records": [...]} of up to MAX_BATCH_RECORDS meals
+@router.route('POST', '/nutrition/batch')
+def save_meal_batch(request):
+    return save_batch(request, build_meal_item)
+
+@router.route('POST', '/nutrition')
+def save_meal(request):
+    try:
+        meal_data = build_meal_item(request.json())
+        progress_table.put_item(Item=meal_data)
+        rollups.apply_rollup_after_write(summary_table, stats_table, meal_data['user_id'], meal_data['date'], rollups.record_deltas(meal_data))
+        return response(201, {'message': 'Meal saved', 'meal_id': meal_data['progress_id'], 'date': meal_data['date']})
+    except ValueError as e:
+        return response(400, {'error': str(e)})
+    except Exception as e:
+        return error_response(e)
+
+# GET /nutrition/{user_id}?from=&to=&limit=&cursor=&fields= - fields defaults to projection.MEAL_FIELDS, fields=all for whole items
+@router.route('GET', '/nutrition/{user_id}')
+def get_meals(request, user_id):
+    try:
+        date_from, date_to = get_date_range(request.query)
+        limit, cursor = get_page_params(request.query)
+        fields = projection.parse_fields(request.query.get('fields'), projection.MEAL_FIELDS)
+        meals, next_cursor = query_records(user_id, 'meal', date_from, date_to, limit, cursor, fields)
+        return response(200, {'meals': meals, 'count': len(meals), 'next_cursor': next_cursor})
+    except ValueError as e:
+        return response(400, {'error': str(e)})
+    except Exception as e:
+        return error_response(e)
+
+@router.route('DELETE', '/nutrition/{user_id}/{meal_id}')
+def delete_meal(request, user_id, meal_id):
+    try:
+        if not delete_record(user_id, meal_id):
+            return response(404, {'error': 'Meal not found'})
+        return response(200, {'message': 'Meal deleted'})
+    except Exception as e:
+        return error_response(e)
+
+# ===== FOOD SEARCH =====
+
+# GET /foods/search?q=&limit= - autocomplete from the packed food index, see foods.py.
+# The index only changes with a deploy, so clients and CDNs may cache answers
+@router.route('GET', '/foods/search')
+def search_foods(request):
+    try:
+        query = request.query.get('q', '').strip()
+        if not query or len(query) > 100:
+            raise ValueError('q must be 1 to 100 characters')
         try:
-            result = progress_table.scan()
-            all_items = result.get('Items', [])
-            workouts = [item for item in all_items if str(item.get('user_id', '')) == str(user_id) and item.get('record_type') == 'workout']
-            return response(200, {'progress': workouts, 'count': len(workouts)})
-        except Exception as e:
-            return response(500, {'error': str(e)})
-    
-    # ===== PLANS ENDPOINTS =====
-    
-    if method == 'GET' and '/plans/' in path:
-        user_id = path.split('/')[-1]
+            limit = int(request.query.get('limit', foods.DEFAULT_LIMIT))
+        except ValueError:
+            raise ValueError('limit must be a number')
+        if not 1 <= limit <= foods.MAX_LIMIT:
+            raise ValueError(f'limit must be between 1 and {foods.MAX_LIMIT}')
+        results = foods.search(query, limit)
+        result = response(200, {'query': query, 'foods': results, 'count': len(results)})
+        result['headers']['Cache-Control'] = 'public, max-age=3600'
+        return result
+    except FileNotFoundError:
+        return response(503, {'error': 'Food search is not available'})
+    except ValueError as e:
+        return response(400, {'error': str(e)})
+    except Exception as e:
+        return error_response(e)
+
+# ===== PROGRESS ENDPOINTS =====
+
+# POST /progress/batch - {"records": [...]} of up to MAX_BATCH_RECORDS workouts
+@router.route('POST', '/progress/batch')
+def save_workout_batch(request):
+    return save_batch(request, build_workout_item)
+
+@router.route('POST', '/progress')
+def save_workout(request):
+    try:
+        progress_data = build_workout_item(request.json())
+        progress_table.put_item(Item=progress_data)
+        rollups.apply_rollup_after_write(
+            summary_table, stats_table, progress_data['user_id'], progress_data['date'], rollups.record_deltas(progress_data)
+        )
+        return response(201, {'message': 'Progress saved', 'progress_id': progress_data['progress_id'], 'date': progress_data['date']})
+    except ValueError as e:
+        return response(400, {'error': str(e)})
+    except Exception as e:
+        return error_response(e)
+
+# GET /progress/{user_id}?from=&to=&limit=&cursor=&fields= - fields defaults to projection.WORKOUT_FIELDS, fields=all for whole items
+@router.route('GET', '/progress/{user_id}')
+def get_workouts(request, user_id):
+    try:
+        date_from, date_to = get_date_range(request.query)
+        limit, cursor = get_page_params(request.query)
+        fields = projection.parse_fields(request.query.get('fields'), projection.WORKOUT_FIELDS)
+        workouts, next_cursor = query_records(user_id, 'workout', date_from, date_to, limit, cursor, fields)
+        return response(200, {'progress': workouts, 'count': len(workouts), 'next_cursor': next_cursor})
+    except ValueError as e:
+        return response(400, {'error': str(e)})
+    except Exception as e:
+        return error_response(e)
+
+@router.route('DELETE', '/progress/{user_id}/{progress_id}')
+def delete_workout(request, user_id, progress_id):
+    try:
+        if not delete_record(user_id, progress_id):
+            return response(404, {'error': 'Workout not found'})
+        return response(200, {'message': 'Workout deleted'})
+    except Exception as e:
+        return error_response(e)
+
+# ===== EXPORT =====
+
+# GET /export/{user_id}?format=ndjson|csv&compress=gzip&cursor= - the user's whole history
+# as a download, meals then workouts, oldest first. Large histories come in chunks that
+# fit Lambda's response limits: when X-Next-Cursor is set, request it as ?cursor= and
+# append the result (CSV chunks after the first carry no header row)
+@router.route('GET', '/export/{user_id}')
+def export_history(request, user_id):
+    try:
+        fmt = request.query.get('format', 'ndjson')
+        compress = request.query.get('compress')
+        if compress not in (None, 'gzip'):
+            raise ValueError("compress must be 'gzip'")
+        cursor = decode_cursor(request.query.get('cursor'))
+        if cursor and cursor.get('user_id') != user_id:
+            raise ValueError('Invalid cursor')
+        writer = export.ChunkWriter(fmt, gzip=compress == 'gzip', header=cursor is None)
+        deadline = time.monotonic() + export.TIME_BUDGET_SECONDS
+        last = export.write_chunk(writer, iter_history(user_id, cursor), deadline)
+        body = writer.finish()
+        log.annotate(item_count=writer.rows)
+
+        filename = f"oldisgold-{re.sub(r'[^A-Za-z0-9_-]', '_', user_id)}-{datetime.utcnow():%Y-%m-%d}.{fmt}"
+        headers = {**HEADERS, 'Content-Type': export.FORMATS[fmt], 'X-Export-Rows': str(writer.rows)}
+        if last:
+            headers['X-Next-Cursor'] = encode_cursor({k: last[k] for k in ('user_id', 'progress_id', 'record_key')})
+        if compress:
+            headers['Content-Type'] = 'application/gzip'
+            headers['Content-Disposition'] = f'attachment; filename="{filename}.gz"'
+            return {'statusCode': 200, 'headers': headers, 'body': base64.b64encode(body).decode(), 'isBase64Encoded': True}
+        headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return {'statusCode': 200, 'headers': headers, 'body': body.decode()}
+    except ValueError as e:
+        return response(400, {'error': str(e)})
+    except Exception as e:
+        return error_response(e)
+
+# ===== SUMMARY ENDPOINTS =====
+
+# GET /summary/{user_id}?from=&to= - reads daily rollups only, never raw records
+@router.route('GET', '/summary/{user_id}')
+def get_summary(request, user_id):
+    try:
+        date_from, date_to = get_date_range(request.query)
+        date_to = date_to or datetime.utcnow().strftime('%Y-%m-%d')
+        if not date_from:
+            start = datetime.strptime(date_to, '%Y-%m-%d') - timedelta(days=DEFAULT_SUMMARY_DAYS - 1)
+            date_from = start.strftime('%Y-%m-%d')
+        if date_from > date_to:
+            raise ValueError("'from' must not be after 'to'")
+        days = query_summaries(user_id, date_from, date_to)
+        return response(200, {
+            'from': date_from,
+            'to': date_to,
+            'days': days,
+            'totals': rollups.summarize(days),
+            'count': len(days)
+        })
+    except ValueError as e:
+        return response(400, {'error': str(e)})
+    except Exception as e:
+        return error_response(e)
+
+# GET /stats/{user_id}?today= - lifetime totals and the current streak from one item.
+# Pass the client's local date as today so the streak doesn't reset at UTC midnight
+@router.route('GET', '/stats/{user_id}')
+def get_stats(request, user_id):
+    try:
+        today = get_today(request.query)
+        return response(200, {'user_id': user_id, **stats.describe(get_item_or_none(stats_table, user_id), today)})
+    except ValueError as e:
+        return response(400, {'error': str(e)})
+    except Exception as e:
+        return error_response(e)
+
+# GET /analytics/{user_id}?today= - rolling averages, macro ratios, adherence and weekly
+# deltas over the user's whole rollup history, see analytics.py. A repeat view reads only
+# the stats item's last_write_at and answers from the cache (or a 304)
+@router.route('GET', '/analytics/{user_id}')
+def get_analytics(request, user_id):
+    try:
+        today = get_today(request.query)
+        stats_item = stats_table.get_item(Key={'user_id': user_id}, ProjectionExpression='last_write_at').get('Item') or {}
+        version = (stats_item.get('last_write_at'), today)
+        cached = analytics_cache.get(user_id)
+        if cached and cached[0] == version:
+            return etag_response(request, cached[1])
         try:
+            import analytics
+        except ImportError:
+            return response(503, {'error': 'Analytics unavailable, NumPy is not deployed'})
+        days = query_summaries(user_id, '0000-01-01', '9999-12-31')
+        body = serialization.dumps({'user_id': user_id, **analytics.compute(days, today)})
+        # Users with nothing written since last_write_at was introduced have no version to check against
+        if version[0]:
+            analytics_cache.set(user_id, (version, body))
+        return etag_response(request, body)
+    except ValueError as e:
+        return response(400, {'error': str(e)})
+    except Exception as e:
+        return error_response(e)
+
+# GET /dashboard/{user_id}?from=&to=&limit=&today= - profile, plan, workouts and meals in one round trip.
+# Workouts and meals carry the compact default fields, like the first page of /progress and /nutrition.
+# Older history pages come from those endpoints with the returned next_cursors
+@router.route('GET', '/dashboard/{user_id}')
+def get_dashboard(request, user_id):
+    try:
+        date_from, date_to = get_date_range(request.query)
+        limit, _ = get_page_params(request.query)
+        return response(200, load_dashboard(user_id, date_from, date_to, limit, get_today(request.query)))
+    except ValueError as e:
+        return response(400, {'error': str(e)})
+    except Exception as e:
+        return error_response(e)
+
+# ===== PLANS ENDPOINTS =====
+
+@router.route('GET', '/plans/{user_id}')
+def get_plan(request, user_id):
+    try:
+        body = plan_cache.get(user_id)
+        if body is None:
             result = plans_table.get_item(Key={'user_id': user_id})
             if 'Item' in result:
-                return response(200, result['Item'])
-            user_result = users_table.get_item(Key={'user_id': user_id})
-            if 'Item' in user_result:
+                plan = result['Item']
+            else:
+                user_result = users_table.get_item(Key={'user_id': user_id})
+                if 'Item' not in user_result:
+                    return response(404, {'error': 'User not found'})
                 plan = generate_plan(user_result['Item'])
                 plan['user_id'] = user_id
                 plans_table.put_item(Item=plan)
-                return response(200, plan)
-            return response(404, {'error': 'User not found'})
-        except Exception as e:
-            return response(500, {'error': str(e)})
-    
-    # ===== USERS ENDPOINTS =====
+            body = serialization.dumps(plan)
+            plan_cache.set(user_id, body)
+        return etag_response(request, body)
+    except Exception as e:
+        return error_response(e)
+
+# ===== USERS ENDPOINTS =====
+
+@router.route('POST', '/users')
+def create_user(request):
+    try:
+        body = request.json()
+        user_id = body.get('user_id') or str(uuid.uuid4())[:8]
+        user_data = {
+            'user_id': user_id,
+            'name': body.get('name', 'Friend'),
+            'age': body.get('age', 65),
+            'fitness_level': body.get('fitness_level', 'beginner'),
+            'goals': body.get('goals', []),
+            'health_conditions': body.get('health_conditions', []),
+            'created_at': datetime.now().isoformat()
+        }
+        users_table.put_item(Item=user_data)
+        plan = generate_plan(user_data)
+        plan['user_id'] = user_id
+        plans_table.put_item(Item=plan)
+        plan_cache.invalidate(user_id)
+        return response(201, {'user_id': user_id, 'message': 'User created'})
+    except Exception as e:
+        return error_response(e)
+
+def is_warmup(event):
+    # Scheduled pings (EventBridge or serverless-plugin-warmup) and manual {"warmup": true}
+    return bool(event.get('warmup')) or event.get('source') in ('aws.events', 'serverless-plugin-warmup')
+
+# Provisioned concurrency runs module init ahead of traffic, so open the connection now
+# (best-effort, a failure is only logged, see db.warm)
+if os.environ.get('AWS_LAMBDA_INITIALIZATION_TYPE') == 'provisioned-concurrency':
+    db.warm(users_table.name)
+
+def dispatch(request):
+    """Returns (route template or None, API Gateway response)"""
+    if request.method == 'OPTIONS':
+        return None, response(200, {'message': 'OK'})
+    try:
+        handler, params, route = router.resolve(request.method, request.path)
+    except NotFound:
+        return None, response(404, {'error': 'Not found', 'path': request.path, 'method': request.method})
+    except MethodNotAllowed as e:
+        not_allowed = response(405, {'error': 'Method not allowed', 'path': request.path, 'method': request.method})
+        not_allowed['headers']['Allow'] = ', '.join(e.allowed)
+        return None, not_allowed
+    return route, handler(request, **params)
+
+def lambda_handler(event, context):
+    if is_warmup(event):
+        return {'warmed': db.warm(users_table.name)}
     
-    if method == 'POST' and '/users' in path:
-        try:
-            body = json.loads(event.get('body', '{}'))
-            user_id = body.get('user_id') or str(uuid.uuid4())[:8]
-            user_data = {
-                'user_id': user_id,
-                'name': body.get('name', 'Friend'),
-                'age': body.get('age', 65),
-                'fitness_level': body.get('fitness_level', 'beginner'),
-                'created_at': datetime.now().isoformat()
-            }
-            users_table.put_item(Item=user_data)
-            plan = generate_plan(user_data)
-            plan['user_id'] = user_id
-            plans_table.put_item(Item=plan)
-            return response(201, {'user_id': user_id, 'message': 'User created'})
-        except Exception as e:
-            return response(500, {'error': str(e)})
+    started = time.perf_counter()
+    log.start_request()
+    metrics.start()
+    request = normalize_event(event)
+    log.debug(lambda: f"{request.method} {request.path} event={json.dumps(event)[:500]}")
     
-    return response(404, {'error': 'Not found', 'path': path, 'method': method, 'debug': 'Check CloudWatch logs'})
+    route, result = dispatch(request)
+    duration_ms = (time.perf_counter() - started) * 1000
+    request_id = getattr(context, 'aws_request_id', None)
+    log.access(request.method, route or request.path, result['statusCode'], duration_ms, request_id=request_id)
+    # Unmatched paths share one route so scanners can't create new metric series
+    metrics.flush(request.method, route or 'unmatched', result['statusCode'], duration_ms, request_id=request_id)
+    return result
@@ -0,0 +1,81 @@
+"""Structured JSON logging for the Lambda handlers.
+
+Every request ends with one access line (route, status, duration, item count)
+instead of ad-hoc prints, and nothing is formatted unless it will be written:
+
+- LOG_LEVEL        DEBUG / INFO / WARNING / ERROR (default INFO)
+- LOG_SAMPLE_RATE  fraction of successful requests that get an access line
+                   (default 1.0). Errors (status >= 500) are never sampled out.
+
+Expensive debug detail should be guarded with `if log.debug_enabled:` or passed
+as a callable, which is only invoked when DEBUG is on.
+"""
+
+import json
+import os
+import random
+import sys
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+level = LEVELS.get(os.environ.get('LOG_LEVEL', 'INFO').upper(), LEVELS['INFO'])
+debug_enabled = level <= LEVELS['DEBUG']
+try:
+    sample_rate = min(1.0, max(0.0, float(os.environ.get('LOG_SAMPLE_RATE', '1'))))
+except ValueError:
+    sample_rate = 1.0
+
+# Extra fields for the current request's access line, see annotate()
+_request_fields = {}
+
+
+def _write(level_name, message, fields):
+    record = {'level': level_name, 'message': message, **fields}
+    sys.stdout.write(json.dumps(record, default=str, separators=(',', ':')) + '\n')
+
+
+def debug(message, **fields):
+    if debug_enabled:
+        _write('DEBUG', message() if callable(message) else message, fields)
+
+
+def info(message, **fields):
+    if level <= LEVELS['INFO']:
+        _write('INFO', message, fields)
+
+
+def warning(message, **fields):
+    if level <= LEVELS['WARNING']:
+        _write('WARNING', message, fields)
+
+
+def error(message, **fields):
+    _write('ERROR', message, fields)
+
+
+def start_request():
+    _request_fields.clear()
+
+
+def annotate(**fields):
+    """Attach fields (item_count, error, ...) to the current request's access line"""
+    _request_fields.update(fields)
+
+
+def access(method, route, status, duration_ms, **fields):
+    if status < 500 and sample_rate < 1.0 and random.random() >= sample_rate:
+        return
+    if status >= 500:
+        level_name = 'ERROR'
+    elif level > LEVELS['INFO']:
+        return
+    else:
+        level_name = 'INFO'
+    _write(level_name, 'request', {
+        'method': method,
+        'route': route,
+        'status': status,
+        'duration_ms': round(duration_ms, 2),
+        **_request_fields,
+        **fields,
+    })
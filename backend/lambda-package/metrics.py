@@ -0,0 +1,95 @@
+"""Per-invocation route and DynamoDB metrics, written as CloudWatch Embedded Metric Format.
+
+db.py reports every table call here (operation, latency, consumed capacity); the
+handlers call start() when an invocation begins and flush() when it ends, which writes
+one EMF JSON line to stdout. CloudWatch turns that line into metrics with no API calls,
+so the cost is a few additions per DynamoDB call and one json.dumps per invocation.
+
+Metrics, with a Route dimension ("GET /dashboard/{user_id}"):
+Duration, Errors (1 for 5xx), DynamoDBCalls, DynamoDBLatency, ConsumedRCU, ConsumedWCU.
+
+- METRICS_ENABLED    set to 0 to stop requesting capacity and writing metrics
+- METRICS_NAMESPACE  CloudWatch namespace (default OldIsGold/API)
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+enabled = os.environ.get('METRICS_ENABLED', '1') != '0'
+namespace = os.environ.get('METRICS_NAMESPACE', 'OldIsGold/API')
+
+READ_OPERATIONS = {'get_item', 'query', 'scan', 'batch_get_item'}
+
+METRICS = (
+    ('Duration', 'Milliseconds'),
+    ('Errors', 'Count'),
+    ('DynamoDBCalls', 'Count'),
+    ('DynamoDBLatency', 'Milliseconds'),
+    ('ConsumedRCU', 'Count'),
+    ('ConsumedWCU', 'Count'),
+)
+
+# /dashboard makes table calls from its thread pool
+_lock = threading.Lock()
+_calls = 0
+_latency_ms = 0.0
+_rcu = 0.0
+_wcu = 0.0
+
+
+def start():
+    global _calls, _latency_ms, _rcu, _wcu
+    with _lock:
+        _calls, _latency_ms, _rcu, _wcu = 0, 0.0, 0.0, 0.0
+
+
+def capacity_units(consumed):
+    """CapacityUnits from a ConsumedCapacity value (a dict, or a list for batch calls)"""
+    if not consumed:
+        return 0.0
+    if isinstance(consumed, dict):
+        return consumed.get('CapacityUnits', 0.0)
+    return sum(c.get('CapacityUnits', 0.0) for c in consumed)
+
+
+def record_call(operation, latency_ms, consumed=None):
+    global _calls, _latency_ms, _rcu, _wcu
+    units = capacity_units(consumed)
+    with _lock:
+        _calls += 1
+        _latency_ms += latency_ms
+        if operation in READ_OPERATIONS:
+            _rcu += units
+        else:
+            _wcu += units
+
+
+def snapshot():
+    with _lock:
+        return {'DynamoDBCalls': _calls, 'DynamoDBLatency': round(_latency_ms, 3), 'ConsumedRCU': _rcu, 'ConsumedWCU': _wcu}
+
+
+def flush(method, route, status, duration_ms, **properties):
+    """Write this invocation's metrics as one EMF line"""
+    if not enabled:
+        return
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': namespace,
+                'Dimensions': [['Route']],
+                'Metrics': [{'Name': name, 'Unit': unit} for name, unit in METRICS],
+            }],
+        },
+        'Route': f'{method} {route}',
+        'Status': status,
+        'Duration': round(duration_ms, 3),
+        'Errors': 1 if status >= 500 else 0,
+        **snapshot(),
+        **properties,
+    }
+    sys.stdout.write(json.dumps(record, default=str, separators=(',', ':')) + '\n')
@@ -0,0 +1,55 @@
+"""?fields= handling: read only the attributes a client asked for.
+
+A comma-separated list of top-level attribute names becomes a DynamoDB
+ProjectionExpression. Every name is aliased (#f0, #f1, ...) so reserved words such as
+date, name or type need no special casing. ?fields=all returns whole items.
+
+DynamoDB charges a read for the full item size whatever is projected, so this shrinks
+the response and the transfer from DynamoDB, not the consumed RCU.
+"""
+
+import re
+
+ALL = 'all'
+MAX_FIELDS = 20
+FIELD_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]{0,63}$')
+
+# Compact defaults for the history lists, covering what the Nutrition and Progress
+# pages render. progress_id stays in so clients can delete what they list
+MEAL_FIELDS = ('progress_id', 'date', 'meal_type', 'food_name', 'food', 'calories', 'protein', 'carbs', 'fat')
+WORKOUT_FIELDS = (
+    'progress_id', 'date', 'workout_completed', 'exercises', 'exercises_completed', 'total_exercises',
+    'duration_minutes', 'duration', 'calories_burned'
+)
+
+
+def parse_fields(value, default=None):
+    """Read ?fields=, returns a tuple of names, or None for whole items. Raises ValueError if malformed"""
+    if value is None:
+        return default
+    if value.strip() == ALL:
+        return None
+    fields = []
+    for name in value.split(','):
+        name = name.strip()
+        if not FIELD_RE.match(name):
+            raise ValueError(f"Invalid field '{name}'")
+        if name not in fields:
+            fields.append(name)
+    if len(fields) > MAX_FIELDS:
+        raise ValueError(f'At most {MAX_FIELDS} fields')
+    return tuple(fields)
+
+
+def expression(fields):
+    """(ProjectionExpression, ExpressionAttributeNames) for a tuple of names"""
+    names = {f'#f{i}': field for i, field in enumerate(fields)}
+    return ', '.join(names), names
+
+
+def apply(kwargs, fields):
+    """Add the projection for `fields` to get_item/query kwargs, in place. None leaves them untouched"""
+    if fields:
+        kwargs['ProjectionExpression'], names = expression(fields)
+        kwargs['ExpressionAttributeNames'] = {**kwargs.get('ExpressionAttributeNames', {}), **names}
+    return kwargs
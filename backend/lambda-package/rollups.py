@@ -0,0 +1,133 @@
+"""Per-user, per-day totals kept in oldisgold-daily-summary.
+
+Every meal/workout write adds its numbers to the (user_id, date) rollup item with an
+atomic UpdateItem ADD, and every delete subtracts them again, so dashboards read one
+small item per day instead of every raw record. scripts/rebuild_rollups.py recomputes
+the items from raw records if they ever drift.
+
+apply_rollup is the one write path: both Lambda handlers and the FastAPI app's
+DynamoDB storage call it for every record they write, replace or delete.
+"""
+
+import re
+from datetime import datetime
+
+import log
+import stats
+
+SUMMARY_TABLE = 'oldisgold-daily-summary'
+
+DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+ROLLUP_FIELDS = ('calories', 'protein', 'carbs', 'fat', 'meals', 'workouts', 'minutes', 'calories_burned')
+
+
+def check_date(value):
+    """value if it is a real YYYY-MM-DD day, otherwise ValueError. Stats and /analytics
+    parse every rollup date, so a record must never be written with anything else"""
+    if isinstance(value, str) and DATE_RE.match(value):
+        try:
+            datetime.strptime(value, '%Y-%m-%d')
+            return value
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+def _num(value):
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def record_deltas(item):
+    """Counter increments contributed by one raw progress record"""
+    record_type = item.get('record_type') or item.get('type')
+    if record_type == 'meal':
+        return {
+            'calories': _num(item.get('calories')),
+            'protein': _num(item.get('protein')),
+            'carbs': _num(item.get('carbs')),
+            'fat': _num(item.get('fat')),
+            'meals': 1,
+        }
+    # The FastAPI app stores skipped workouts too (workout_completed false); they count
+    # for nothing. Items without the flag are completed
+    if item.get('workout_completed') is False:
+        return {}
+    # Older workout items used `duration` instead of `duration_minutes`
+    return {
+        'workouts': 1,
+        'minutes': _num(item.get('duration_minutes', item.get('duration'))),
+        'calories_burned': _num(item.get('calories_burned')),
+    }
+
+
+def apply_deltas(table, user_id, date_str, deltas, sign=1):
+    """Atomically ADD (sign=1) or subtract (sign=-1) deltas on one day's rollup.
+    Returns the updated counters"""
+    names = {}
+    values = {}
+    clauses = []
+    for i, (field, amount) in enumerate(sorted(deltas.items())):
+        names[f'#f{i}'] = field
+        values[f':v{i}'] = sign * amount
+        clauses.append(f'#f{i} :v{i}')
+    if not clauses:
+        return {}
+    result = table.update_item(
+        Key={'user_id': str(user_id), 'date': date_str},
+        UpdateExpression='ADD ' + ', '.join(clauses),
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values,
+        ReturnValues='UPDATED_NEW',
+    )
+    return result.get('Attributes', {})
+
+
+def apply_rollup(summary_table, stats_table, user_id, date_str, deltas, sign=1):
+    """Add a write to (or take a delete out of) its day's rollup and, for workouts,
+    the user's lifetime stats and streak. Either way the stats item's last_write_at
+    moves on, after the rollup, which is what GET /analytics caches against"""
+    counters = apply_deltas(summary_table, user_id, date_str, deltas, sign)
+    written_at = datetime.utcnow().isoformat()
+    if deltas.get('workouts'):
+        signed = {field: sign * amount for field, amount in deltas.items()}
+        stats.record_change(stats_table, summary_table, user_id, date_str, signed, counters.get('workouts', 0), written_at)
+    else:
+        stats.mark_written(stats_table, user_id, written_at)
+
+
+def apply_rollup_after_write(summary_table, stats_table, user_id, date_str, deltas, sign=1):
+    """apply_rollup for a record that is already written or deleted: a failure is logged
+    instead of raised, so the request still reports the write that happened and a client
+    retry can't store the record twice. scripts/rebuild_rollups.py repairs the day"""
+    try:
+        apply_rollup(summary_table, stats_table, user_id, date_str, deltas, sign)
+        return True
+    except Exception as e:
+        log.warning('rollup update failed', user_id=user_id, date=date_str, error=str(e))
+        return False
+
+
+def aggregate(items):
+    """Fold raw records into {(user_id, date): totals}, used to rebuild rollups"""
+    days = {}
+    for item in items:
+        if not item.get('date'):
+            continue
+        key = (str(item.get('user_id', '')), item['date'])
+        totals = days.setdefault(key, dict.fromkeys(ROLLUP_FIELDS, 0))
+        for field, amount in record_deltas(item).items():
+            totals[field] += amount
+    return days
+
+
+def summarize(rollups):
+    """Range totals over a list of rollup items"""
+    totals = dict.fromkeys(ROLLUP_FIELDS, 0)
+    for day in rollups:
+        for field in ROLLUP_FIELDS:
+            totals[field] += _num(day.get(field))
+    return totals
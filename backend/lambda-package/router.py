@@ -0,0 +1,136 @@
+"""Request normalisation and route table shared by both Lambda handlers.
+
+Handlers register (method, path template) pairs such as ('GET', '/nutrition/{user_id}').
+Templates are compiled once at import time into:
+
+- a dict of fully static paths, looked up directly, and
+- buckets of parameterised templates keyed by (segment count, first segment), so a
+  request only ever compares itself against the handful of templates that could match.
+
+Static paths win over templates for every method, so '/nutrition/batch' never reaches
+'/nutrition/{user_id}', not even as a GET.
+"""
+
+import base64
+import json
+from urllib.parse import unquote
+
+
+class NotFound(Exception):
+    pass
+
+
+class MethodNotAllowed(Exception):
+    def __init__(self, allowed):
+        super().__init__(', '.join(allowed))
+        self.allowed = allowed
+
+
+class Request:
+    """API Gateway v1 (REST) and v2 (HTTP API) events reduced to the parts handlers use"""
+
+    __slots__ = ('method', 'path', 'query', 'headers', 'body', 'event')
+
+    def __init__(self, method, path, query, headers, body, event):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+        self.event = event
+
+    def json(self):
+        """Parsed JSON body, {} when empty. Raises ValueError on malformed JSON"""
+        return json.loads(self.body) if self.body else {}
+
+
+def normalize_event(event, stage_prefixes=('/prod',)):
+    http = (event.get('requestContext') or {}).get('http') or {}
+    method = (event.get('httpMethod') or http.get('method') or '').upper()
+    path = event.get('path') or event.get('rawPath') or http.get('path') or '/'
+
+    # HTTP APIs with a named stage, and REST custom domains mapped without a base
+    # path, leave the stage in front of the route
+    stage = (event.get('requestContext') or {}).get('stage')
+    prefixes = stage_prefixes + ((f'/{stage}',) if stage and stage != '$default' else ())
+    for prefix in prefixes:
+        if path == prefix or path.startswith(prefix + '/'):
+            path = path[len(prefix):] or '/'
+            break
+
+    body = event.get('body')
+    if body and event.get('isBase64Encoded'):
+        body = base64.b64decode(body).decode('utf-8')
+
+    headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    query = event.get('queryStringParameters') or {}
+    return Request(method, path, query, headers, body, event)
+
+
+def split_path(path):
+    return [segment for segment in path.split('/') if segment]
+
+
+class Router:
+    def __init__(self):
+        self._static = {}   # '/a/b' -> {method: (handler, template)}
+        self._dynamic = {}  # (segment count, first segment) -> [(segments, {method: (handler, template)})]
+
+    def route(self, method, template):
+        def register(handler):
+            self.add(method, template, handler)
+            return handler
+        return register
+
+    def add(self, method, template, handler):
+        segments = split_path(template)
+        target = (handler, template)
+        if not any(s.startswith('{') for s in segments):
+            self._static.setdefault('/' + '/'.join(segments), {})[method] = target
+            return
+        if segments[0].startswith('{'):
+            raise ValueError(f'Route {template} must start with a literal segment')
+        bucket = self._dynamic.setdefault((len(segments), segments[0]), [])
+        for existing, methods in bucket:
+            if existing == segments:
+                methods[method] = target
+                return
+        bucket.append((segments, {method: target}))
+
+    def resolve(self, method, path):
+        """Return (handler, path params, route template), or raise NotFound / MethodNotAllowed"""
+        segments = split_path(path)
+
+        # A static path owns every method: GET /nutrition/batch is a 405 for POST-only
+        # /nutrition/batch, not a lookup of user 'batch'
+        methods = self._static.get('/' + '/'.join(segments))
+        if methods:
+            if method in methods:
+                handler, template = methods[method]
+                return handler, {}, template
+            raise MethodNotAllowed(sorted(methods))
+
+        allowed = set()
+        if segments:
+            for pattern, methods in self._dynamic.get((len(segments), segments[0]), ()):
+                params = match(pattern, segments)
+                if params is None:
+                    continue
+                if method in methods:
+                    handler, template = methods[method]
+                    return handler, params, template
+                allowed.update(methods)
+
+        if allowed:
+            raise MethodNotAllowed(sorted(allowed))
+        raise NotFound(path)
+
+
+def match(template, segments):
+    params = {}
+    for expected, actual in zip(template, segments):
+        if expected.startswith('{'):
+            params[expected[1:-1]] = unquote(actual)
+        elif expected != actual:
+            return None
+    return params
@@ -0,0 +1,34 @@
+"""Single-pass JSON encoding for API responses.
+
+DynamoDB hands numbers back as Decimal, which the json module can't encode. Rather
+than copying the whole response into plain ints/floats first and then encoding the
+copy, Decimals are converted by the encoder's default hook as it meets them, so a
+large history is walked once and never duplicated.
+
+If orjson is installed (add it to the Lambda package), it is used automatically; it
+calls the same hook for Decimal. Output is then compact (no spaces after separators).
+"""
+
+import json
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def convert_decimal(obj):
+    if isinstance(obj, Decimal):
+        as_int = int(obj)
+        return as_int if as_int == obj else float(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+_encoder = json.JSONEncoder(default=convert_decimal)
+
+
+def dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, default=convert_decimal).decode()
+    return _encoder.encode(obj)
@@ -0,0 +1,259 @@
+"""Lifetime workout totals and the current streak, one item per user in oldisgold-user-stats.
+
+Reads are a single GetItem. Writes keep the item up to date in O(1):
+
+- totals (workouts, minutes, calories_burned, active_days) are atomic ADDs
+- the streak is stored as the run of consecutive workout days ending at the latest
+  workout day (streak_start..streak_end). It only changes when a day gains its first
+  workout or loses its last one, which the daily rollup's returned count tells us.
+  The current streak is computed at read time from that run and today's date
+
+A back-dated workout that joins the run onto an earlier one, or a delete that empties
+the only day of the run, walks back through that earlier run's rollup days to find
+its start. This is rare and bounded by the earlier run's length. Nothing ever walks
+raw records.
+
+The streak rules are plain functions over dates so the FastAPI app's storage backends
+share them.
+"""
+
+from datetime import date, timedelta
+
+STATS_TABLE = 'oldisgold-user-stats'
+
+TOTAL_FIELDS = ('workouts', 'minutes', 'calories_burned', 'active_days')
+
+# Concurrent writes for the same user race on the streak fields; the loser re-reads
+MAX_ATTEMPTS = 3
+
+ONE_DAY = timedelta(days=1)
+
+
+def to_date(value):
+    return date.fromisoformat(value) if value else None
+
+
+# ===== Streak rules =====
+
+def day_activated(start, end, day, run_start):
+    """New (start, end) after `day` gets its first workout.
+
+    run_start(d) returns the first day of the consecutive workout run ending at d,
+    or None when d had no workouts.
+    """
+    if end is None:
+        # No stats yet (or an empty history): the day may still extend older records
+        return run_start(day - ONE_DAY) or day, day
+    if day > end + ONE_DAY:
+        return day, day
+    if day == end + ONE_DAY:
+        return start, day
+    if day == start - ONE_DAY:
+        return run_start(day - ONE_DAY) or day, end
+    # Earlier than the current run with a gap in between
+    return start, end
+
+
+def day_deactivated(start, end, day, run_start, last_active_before):
+    """New (start, end) after `day` loses its last workout.
+
+    last_active_before(d) returns the latest workout day before d, or None.
+    """
+    if end is None or day < start or day > end:
+        return start, end
+    if day == end:
+        if day > start:
+            return start, day - ONE_DAY
+        last = last_active_before(day)
+        return (run_start(last), last) if last else (None, None)
+    return day + ONE_DAY, end
+
+
+def streak_after(start, end, day, before, after, run_start, last_active_before):
+    """New (start, end) after `day`'s workout count goes from `before` to `after`"""
+    if before <= 0 < after:
+        return day_activated(start, end, day, run_start)
+    if after <= 0 < before:
+        return day_deactivated(start, end, day, run_start, last_active_before)
+    return start, end
+
+
+def first_of_run(days_desc, day):
+    """First day of the consecutive workout run ending at `day`, or None if `day` had no
+    workouts. days_desc yields (date, workouts) newest first, starting at `day`"""
+    earliest = None
+    expected = day
+    for current, workouts in days_desc:
+        if current != expected or workouts <= 0:
+            break
+        earliest = current
+        expected = current - ONE_DAY
+    return earliest
+
+
+def first_active(days_desc):
+    """Newest day with workouts from (date, workouts) pairs, newest first"""
+    for current, workouts in days_desc:
+        if workouts > 0:
+            return current
+    return None
+
+
+def current_streak(start, end, today):
+    """Consecutive workout days up to today; a run ending yesterday still counts"""
+    if end is None or end < today - ONE_DAY:
+        return 0
+    return (end - start).days + 1
+
+
+def describe(item, today):
+    """API view of a stats item"""
+    item = item or {}
+    start, end = to_date(item.get('streak_start')), to_date(item.get('streak_end'))
+    return {
+        'total_workouts': int(item.get('workouts', 0)),
+        'total_minutes': int(item.get('minutes', 0)),
+        'total_calories_burned': int(item.get('calories_burned', 0)),
+        'active_days': int(item.get('active_days', 0)),
+        'streak': current_streak(start, end, today),
+        'last_workout_date': item.get('streak_end'),
+    }
+
+
+def from_rollups(days):
+    """Stats item fields for one user from all of their rollup items, used by rebuilds"""
+    totals = dict.fromkeys(TOTAL_FIELDS, 0)
+    start = end = None
+    for day in sorted(days, key=lambda d: d['date']):
+        if int(day.get('workouts', 0)) <= 0:
+            continue
+        for field in ('workouts', 'minutes', 'calories_burned'):
+            totals[field] += int(day.get(field, 0))
+        totals['active_days'] += 1
+        current = to_date(day['date'])
+        if end is None or current > end + ONE_DAY:
+            start = current
+        end = current
+    if end:
+        totals['streak_start'], totals['streak_end'] = start.isoformat(), end.isoformat()
+    return totals
+
+
+# ===== DynamoDB =====
+
+def _days_descending(summary_table, user_id, until, inclusive):
+    """(date, workouts) from a user's rollups, newest first, ending at `until`"""
+    from boto3.dynamodb.conditions import Key
+
+    bound = Key('date').lte(until.isoformat()) if inclusive else Key('date').lt(until.isoformat())
+    query_kwargs = {
+        'KeyConditionExpression': Key('user_id').eq(str(user_id)) & bound,
+        'ScanIndexForward': False,
+        'ProjectionExpression': '#d, workouts',
+        'ExpressionAttributeNames': {'#d': 'date'},
+    }
+    while True:
+        result = summary_table.query(**query_kwargs)
+        for item in result.get('Items', []):
+            yield to_date(item['date']), int(item.get('workouts', 0))
+        if 'LastEvaluatedKey' not in result:
+            return
+        query_kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+
+def run_start(summary_table, user_id, day):
+    return first_of_run(_days_descending(summary_table, user_id, day, inclusive=True), day)
+
+
+def last_active_before(summary_table, user_id, day):
+    return first_active(_days_descending(summary_table, user_id, day, inclusive=False))
+
+
+def mark_written(stats_table, user_id, written_at):
+    """Record when the user's history last changed, for results cached against it
+    (GET /analytics). record_change does this itself for workouts"""
+    stats_table.update_item(
+        Key={'user_id': str(user_id)},
+        UpdateExpression='SET #lw = :lw',
+        ExpressionAttributeNames={'#lw': 'last_write_at'},
+        ExpressionAttributeValues={':lw': written_at},
+    )
+
+
+def record_change(stats_table, summary_table, user_id, date_str, deltas, day_workouts, written_at=None):
+    """Fold one signed rollup change into the user's stats.
+
+    day_workouts is the day's workout count after the change, as returned by
+    rollups.apply_deltas. written_at, if given, is stored as last_write_at in the
+    same update, see mark_written.
+    """
+    change = deltas.get('workouts', 0)
+    if not change:
+        return
+    activated = change > 0 and day_workouts == change
+    deactivated = change < 0 and day_workouts <= 0
+    totals = {
+        'workouts': change,
+        'minutes': deltas.get('minutes', 0),
+        'calories_burned': deltas.get('calories_burned', 0),
+        'active_days': 1 if activated else -1 if deactivated else 0,
+    }
+    names = {}
+    values = {}
+    clauses = []
+    for i, (field, amount) in enumerate(sorted(totals.items())):
+        if amount:
+            names[f'#t{i}'] = field
+            values[f':t{i}'] = amount
+            clauses.append(f'#t{i} :t{i}')
+    key = {'user_id': str(user_id)}
+    written_clause = ''
+    if written_at:
+        names['#lw'] = 'last_write_at'
+        values[':lw'] = written_at
+        written_clause = 'SET #lw = :lw '
+
+    if not activated and not deactivated:
+        stats_table.update_item(
+            Key=key,
+            UpdateExpression=written_clause + 'ADD ' + ', '.join(clauses),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+        return
+
+    from boto3.dynamodb.conditions import Attr
+    from botocore.exceptions import ClientError
+
+    day = to_date(date_str)
+    for attempt in range(MAX_ATTEMPTS):
+        item = stats_table.get_item(Key=key, ConsistentRead=True).get('Item') or {}
+        start, end = to_date(item.get('streak_start')), to_date(item.get('streak_end'))
+        new_start, new_end = streak_after(
+            start, end, day, day_workouts - change, day_workouts,
+            lambda d: run_start(summary_table, user_id, d),
+            lambda d: last_active_before(summary_table, user_id, d),
+        )
+
+        # Only commit if nobody moved the streak since we read it
+        condition = Attr('streak_end').not_exists()
+        if end:
+            condition = Attr('streak_start').eq(item['streak_start']) & Attr('streak_end').eq(item['streak_end'])
+        streak_values = dict(values)
+        if new_end:
+            streak_values.update({':ss': new_start.isoformat(), ':se': new_end.isoformat()})
+            streak_clause = 'SET #ss = :ss, #se = :se' + (', #lw = :lw' if written_at else '')
+        else:
+            streak_clause = written_clause + 'REMOVE #ss, #se'
+        try:
+            stats_table.update_item(
+                Key=key,
+                UpdateExpression=streak_clause + ' ADD ' + ', '.join(clauses),
+                ConditionExpression=condition,
+                ExpressionAttributeNames={**names, '#ss': 'streak_start', '#se': 'streak_end'},
+                ExpressionAttributeValues=streak_values,
+            )
+            return
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException' or attempt == MAX_ATTEMPTS - 1:
+                raise
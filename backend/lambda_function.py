@@ -1,147 +1,282 @@
 # Main Lambda handler for Old Is Gold API
 # Handles profiles, nutrition, progress, and workout plans
 
+import base64
 import json
-import boto3
-from decimal import Decimal
+import os
+import sys
+import time
 from datetime import datetime
 
-dynamodb = boto3.resource('dynamodb')
-users_table = dynamodb.Table('oldisgold-users')
-plans_table = dynamodb.Table('oldisgold-plans')
-progress_table = dynamodb.Table('oldisgold-progress')
-profiles_table = dynamodb.Table('oldisgold-profiles')
+# Routing, event normalisation, DynamoDB access, JSON encoding, logging and metrics are shared with lambda-package/lambda_function.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lambda-package'))
+import cache
+import db
+import log
+import metrics
+import projection
+import rollups
+import serialization
+import stats
+from router import MethodNotAllowed, NotFound, Router, normalize_event
 
-def decimal_default(obj):
-    """DynamoDB returns Decimals, need to convert for JSON"""
-    if isinstance(obj, Decimal):
-        return float(obj) if obj % 1 else int(obj)
-    raise TypeError
+users_table = db.table('oldisgold-users')
+plans_table = db.table('oldisgold-plans')
+progress_table = db.table('oldisgold-progress')
+profiles_table = db.table('oldisgold-profiles')
+summary_table = db.table(rollups.SUMMARY_TABLE)
+stats_table = db.table(stats.STATS_TABLE)
+
+# Same GSI as lambda-package: user_id + record_key ("<type>#<YYYY-MM-DD>")
+RECORD_INDEX = 'user_id-record_key-index'
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 500
+
+HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization,If-None-Match',
+    'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+    'Access-Control-Expose-Headers': 'X-Next-Cursor,ETag,Retry-After'
+}
+
+# Encoded GET bodies by user_id for items that only change when the user saves them,
+# see lambda-package/cache.py. The matching POST in this container drops the entry
+profile_cache = cache.TTLCache()
+user_cache = cache.TTLCache()
+plan_cache = cache.TTLCache()
+
+router = Router()
+
+def respond(status_code, body, extra_headers=None):
+    if isinstance(body, list):
+        log.annotate(item_count=len(body))
+    headers = {**HEADERS, **extra_headers} if extra_headers else HEADERS
+    return {'statusCode': status_code, 'headers': headers, 'body': serialization.dumps(body)}
+
+def cached_get(request, table, item_cache, user_id, not_found):
+    """GET one item by user_id through item_cache, answering with an ETag (or a 304).
+    With ?fields= only those attributes are read, straight from the table"""
+    fields = projection.parse_fields(request.query.get('fields'))
+    body = None if fields else item_cache.get(user_id)
+    if body is None:
+        item = table.get_item(**projection.apply({'Key': {'user_id': user_id}}, fields)).get('Item')
+        if not item:
+            return respond(404, {'error': not_found})
+        body = serialization.dumps(item)
+        if not fields:
+            item_cache.set(user_id, body)
+    headers = {**HEADERS, 'ETag': cache.make_etag(body), 'Cache-Control': 'no-cache'}
+    if cache.etag_matches(request.headers.get('if-none-match'), headers['ETag']):
+        return {'statusCode': 304, 'headers': headers, 'body': ''}
+    return {'statusCode': 200, 'headers': headers, 'body': body}
 
 def get_today():
     return datetime.now().strftime('%Y-%m-%d')
 
-def lambda_handler(event, context):
-    headers = {
-        'Content-Type': 'application/json',
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-        'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
+def encode_cursor(last_key):
+    if not last_key:
+        return None
+    raw = json.dumps(last_key, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        last_key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(last_key, dict) or not all(isinstance(v, str) for v in last_key.values()):
+        raise ValueError('Invalid cursor')
+    return last_key
+
+def get_page_params(params):
+    try:
+        limit = int(params.get('limit', DEFAULT_PAGE_LIMIT))
+    except ValueError:
+        raise ValueError('limit must be a number')
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_LIMIT}')
+    return limit, decode_cursor(params.get('cursor'))
+
+def query_history(user_id, record_type, limit, cursor=None, fields=None):
+    """One newest-first page of a user's records of one type, optionally only `fields`,
+    returns (items, next_cursor)"""
+    from boto3.dynamodb.conditions import Key
+
+    if cursor and cursor.get('user_id') != user_id:
+        raise ValueError('Invalid cursor')
+    query_kwargs = {
+        'IndexName': RECORD_INDEX,
+        'KeyConditionExpression': Key('user_id').eq(user_id) & Key('record_key').begins_with(f"{record_type}#"),
+        'ScanIndexForward': False,
     }
+    projection.apply(query_kwargs, fields)
+    if cursor:
+        query_kwargs['ExclusiveStartKey'] = cursor
+    items = []
+    while True:
+        query_kwargs['Limit'] = limit - len(items)
+        response = progress_table.query(**query_kwargs)
+        items.extend(response.get('Items', []))
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key or len(items) >= limit:
+            return items, encode_cursor(last_key)
+        query_kwargs['ExclusiveStartKey'] = last_key
+
+# --- Profile endpoints ---
+
+@router.route('POST', '/profile')
+def save_profile(request):
+    body = request.json()
+    user_id = body.get('user_id')
+    if not user_id:
+        return respond(400, {'error': 'user_id required'})
     
+    profiles_table.put_item(Item=body)
+    users_table.put_item(Item={
+        'user_id': user_id,
+        'name': body.get('name'),
+        'age': body.get('age'),
+        'gender': body.get('gender'),
+        'weight': body.get('weight'),
+        'height': body.get('height'),
+        'bmi': body.get('bmi'),
+        'fitness_level': body.get('fitness_level'),
+        'health_conditions': body.get('health_conditions', []),
+        'goals': body.get('goals', [])
+    })
+    profile_cache.invalidate(user_id)
+    user_cache.invalidate(user_id)
+    return respond(200, {'message': 'Profile saved'})
+
+@router.route('GET', '/profile/{user_id}')
+def get_profile(request, user_id):
+    return cached_get(request, profiles_table, profile_cache, user_id, 'Profile not found')
+
+# --- User endpoints ---
+
+@router.route('POST', '/users')
+def save_user(request):
+    body = request.json()
+    users_table.put_item(Item=body)
+    user_cache.invalidate(body.get('user_id'))
+    return respond(200, {'message': 'User saved'})
+
+@router.route('GET', '/users/{user_id}')
+def get_user(request, user_id):
+    return cached_get(request, users_table, user_cache, user_id, 'User not found')
+
+# --- Plan endpoints ---
+
+@router.route('POST', '/plans')
+def save_plan(request):
+    body = request.json()
+    plans_table.put_item(Item=body)
+    plan_cache.invalidate(body.get('user_id'))
+    return respond(200, {'message': 'Plan saved'})
+
+@router.route('GET', '/plans/{user_id}')
+def get_plan(request, user_id):
+    return cached_get(request, plans_table, plan_cache, user_id, 'Plan not found')
+
+# --- Progress endpoints ---
+
+def write_record(item):
+    """Put a workout or meal and move its day's rollup and the user's stats with it, like
+    lambda-package does. A client-chosen progress_id may replace an existing record,
+    whose numbers come out first. Once the put succeeds the record counts as saved, even
+    if the rollup update fails"""
+    old_item = progress_table.put_item(Item=item, ReturnValues='ALL_OLD').get('Attributes')
+    if old_item and old_item.get('date'):
+        rollups.apply_rollup_after_write(summary_table, stats_table, old_item['user_id'], old_item['date'], rollups.record_deltas(old_item), sign=-1)
+    rollups.apply_rollup_after_write(summary_table, stats_table, item['user_id'], item['date'], rollups.record_deltas(item))
+
+@router.route('POST', '/progress')
+def save_progress(request):
+    body = request.json()
+    if 'progress_id' not in body:
+        body['progress_id'] = f"{body.get('user_id', 'unknown')}_{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+    body['date'] = rollups.check_date(body['date']) if body.get('date') else get_today()
+    body.setdefault('type', 'workout')
+    body['record_key'] = f"{body['type']}#{body['date']}"
+    write_record(body)
+    return respond(200, {'message': 'Progress saved'})
+
+# Newest-first workouts, ?limit=&cursor=&fields=, next page cursor in X-Next-Cursor
+@router.route('GET', '/progress/{user_id}')
+def get_progress(request, user_id):
+    limit, cursor = get_page_params(request.query)
+    fields = projection.parse_fields(request.query.get('fields'), projection.WORKOUT_FIELDS)
+    items, next_cursor = query_history(user_id, 'workout', limit, cursor, fields)
+    return respond(200, items, {'X-Next-Cursor': next_cursor} if next_cursor else None)
+
+@router.route('DELETE', '/progress/{user_id}/{progress_id}')
+def delete_progress(request, user_id, progress_id):
+    old_item = progress_table.delete_item(
+        Key={'user_id': user_id, 'progress_id': progress_id}, ReturnValues='ALL_OLD'
+    ).get('Attributes')
+    if old_item and old_item.get('date'):
+        rollups.apply_rollup_after_write(summary_table, stats_table, user_id, old_item['date'], rollups.record_deltas(old_item), sign=-1)
+    return respond(200, {'message': 'Deleted'})
+
+# --- Nutrition endpoints ---
+
+@router.route('POST', '/nutrition')
+def save_meal(request):
+    body = request.json()
+    body['type'] = 'meal'
+    if 'progress_id' not in body:
+        body['progress_id'] = f"meal_{body.get('user_id', 'unknown')}_{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+    body['date'] = rollups.check_date(body['date']) if body.get('date') else get_today()
+    body['record_key'] = f"meal#{body['date']}"
+    write_record(body)
+    return respond(200, {'message': 'Meal saved'})
+
+# Newest-first meals, ?limit=&cursor=&fields=, next page cursor in X-Next-Cursor
+@router.route('GET', '/nutrition/{user_id}')
+def get_meals(request, user_id):
+    limit, cursor = get_page_params(request.query)
+    fields = projection.parse_fields(request.query.get('fields'), projection.MEAL_FIELDS)
+    meals, next_cursor = query_history(user_id, 'meal', limit, cursor, fields)
+    return respond(200, meals, {'X-Next-Cursor': next_cursor} if next_cursor else None)
+
+def dispatch(request):
+    """Returns (route template or None, API Gateway response)"""
     # Handle CORS preflight
-    if event.get('httpMethod') == 'OPTIONS':
-        return {'statusCode': 200, 'headers': headers, 'body': ''}
-    
-    method = event.get('httpMethod', '')
-    path = event.get('path', '')
+    if request.method == 'OPTIONS':
+        return None, {'statusCode': 200, 'headers': HEADERS, 'body': ''}
     
+    route = None
     try:
-        # --- Profile endpoints ---
-        if path == '/profile' and method == 'POST':
-            body = json.loads(event.get('body', '{}'))
-            user_id = body.get('user_id')
-            if not user_id:
-                return {'statusCode': 400, 'headers': headers, 'body': json.dumps({'error': 'user_id required'})}
-            
-            profiles_table.put_item(Item=body)
-            users_table.put_item(Item={
-                'user_id': user_id,
-                'name': body.get('name'),
-                'age': body.get('age'),
-                'gender': body.get('gender'),
-                'weight': body.get('weight'),
-                'height': body.get('height'),
-                'bmi': body.get('bmi'),
-                'fitness_level': body.get('fitness_level'),
-                'health_conditions': body.get('health_conditions', []),
-                'goals': body.get('goals', [])
-            })
-            return {'statusCode': 200, 'headers': headers, 'body': json.dumps({'message': 'Profile saved'})}
-        
-        if path.startswith('/profile/') and method == 'GET':
-            user_id = path.split('/')[-1]
-            response = profiles_table.get_item(Key={'user_id': user_id})
-            item = response.get('Item')
-            if item:
-                return {'statusCode': 200, 'headers': headers, 'body': json.dumps(item, default=decimal_default)}
-            return {'statusCode': 404, 'headers': headers, 'body': json.dumps({'error': 'Profile not found'})}
-        
-        # --- User endpoints ---
-        if path == '/users' and method == 'POST':
-            body = json.loads(event.get('body', '{}'))
-            users_table.put_item(Item=body)
-            return {'statusCode': 200, 'headers': headers, 'body': json.dumps({'message': 'User saved'})}
-        
-        if path.startswith('/users/') and method == 'GET':
-            user_id = path.split('/')[-1]
-            response = users_table.get_item(Key={'user_id': user_id})
-            item = response.get('Item')
-            if item:
-                return {'statusCode': 200, 'headers': headers, 'body': json.dumps(item, default=decimal_default)}
-            return {'statusCode': 404, 'headers': headers, 'body': json.dumps({'error': 'User not found'})}
-        
-        # --- Plan endpoints ---
-        if path == '/plans' and method == 'POST':
-            body = json.loads(event.get('body', '{}'))
-            plans_table.put_item(Item=body)
-            return {'statusCode': 200, 'headers': headers, 'body': json.dumps({'message': 'Plan saved'})}
-        
-        if path.startswith('/plans/') and method == 'GET':
-            user_id = path.split('/')[-1]
-            response = plans_table.get_item(Key={'user_id': user_id})
-            item = response.get('Item')
-            if item:
-                return {'statusCode': 200, 'headers': headers, 'body': json.dumps(item, default=decimal_default)}
-            return {'statusCode': 404, 'headers': headers, 'body': json.dumps({'error': 'Plan not found'})}
-        
-        # --- Progress endpoints ---
-        if path == '/progress' and method == 'POST':
-            body = json.loads(event.get('body', '{}'))
-            if 'progress_id' not in body:
-                body['progress_id'] = f"{body.get('user_id', 'unknown')}_{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
-            if 'date' not in body:
-                body['date'] = get_today()
-            progress_table.put_item(Item=body)
-            return {'statusCode': 200, 'headers': headers, 'body': json.dumps({'message': 'Progress saved'})}
-        
-        if path.startswith('/progress/') and method == 'GET':
-            user_id = path.split('/')[-1]
-            response = progress_table.query(
-                KeyConditionExpression=boto3.dynamodb.conditions.Key('user_id').eq(user_id)
-            )
-            return {'statusCode': 200, 'headers': headers, 'body': json.dumps(response.get('Items', []), default=decimal_default)}
-        
-        if path.startswith('/progress/') and method == 'DELETE':
-            parts = path.split('/')
-            user_id = parts[2] if len(parts) > 2 else None
-            progress_id = parts[3] if len(parts) > 3 else None
-            if user_id and progress_id:
-                progress_table.delete_item(Key={'user_id': user_id, 'progress_id': progress_id})
-                return {'statusCode': 200, 'headers': headers, 'body': json.dumps({'message': 'Deleted'})}
-            return {'statusCode': 400, 'headers': headers, 'body': json.dumps({'error': 'Missing ids'})}
-        
-        # --- Nutrition endpoints ---
-        if path == '/nutrition' and method == 'POST':
-            body = json.loads(event.get('body', '{}'))
-            body['type'] = 'meal'
-            if 'progress_id' not in body:
-                body['progress_id'] = f"meal_{body.get('user_id', 'unknown')}_{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
-            if 'date' not in body:
-                body['date'] = get_today()
-            progress_table.put_item(Item=body)
-            return {'statusCode': 200, 'headers': headers, 'body': json.dumps({'message': 'Meal saved'})}
-        
-        if path.startswith('/nutrition/') and method == 'GET':
-            user_id = path.split('/')[-1]
-            response = progress_table.query(
-                KeyConditionExpression=boto3.dynamodb.conditions.Key('user_id').eq(user_id)
-            )
-            meals = [i for i in response.get('Items', []) if i.get('type') == 'meal']
-            return {'statusCode': 200, 'headers': headers, 'body': json.dumps(meals, default=decimal_default)}
-        
-        return {'statusCode': 404, 'headers': headers, 'body': json.dumps({'error': 'Not found'})}
-        
+        handler, params, route = router.resolve(request.method, request.path)
+        return route, handler(request, **params)
+    except NotFound:
+        return route, respond(404, {'error': 'Not found'})
+    except MethodNotAllowed as e:
+        return route, respond(405, {'error': 'Method not allowed'}, {'Allow': ', '.join(e.allowed)})
+    except ValueError as e:
+        return route, respond(400, {'error': str(e)})
+    except db.Unavailable as e:
+        # Throttled or unreachable even after retries, or the circuit breaker is open
+        log.annotate(error=str(e), error_type=type(e).__name__)
+        return route, respond(503, {'error': str(e)}, {'Retry-After': str(e.retry_after)})
     except Exception as e:
-        print(f"Error: {e}")
-        return {'statusCode': 500, 'headers': headers, 'body': json.dumps({'error': str(e)})}
+        log.annotate(error=str(e), error_type=type(e).__name__)
+        return route, respond(500, {'error': str(e)})
+
+def lambda_handler(event, context):
+    if event.get('warmup') or event.get('source') in ('aws.events', 'serverless-plugin-warmup'):
+        return {'warmed': db.warm(users_table.name)}
+    
+    started = time.perf_counter()
+    log.start_request()
+    metrics.start()
+    request = normalize_event(event)
+    route, result = dispatch(request)
+    duration_ms = (time.perf_counter() - started) * 1000
+    request_id = getattr(context, 'aws_request_id', None)
+    log.access(request.method, route or request.path, result['statusCode'], duration_ms, request_id=request_id)
+    metrics.flush(request.method, route or 'unmatched', result['statusCode'], duration_ms, request_id=request_id)
+    return result
@@ -0,0 +1,125 @@
+"""Backfill record_key on oldisgold-progress so the per-user index can serve reads.
+
+Usage:
+    python scripts/backfill_record_keys.py --create-index   # once, adds the GSI
+    python scripts/backfill_record_keys.py --dry-run        # show what would change
+    python scripts/backfill_record_keys.py                  # write record_key
+
+Items written before the index existed have no record_key, so they are invisible
+to GET /nutrition and GET /progress until this has been run. The script is safe to
+re-run: items that already have a record_key are skipped.
+"""
+
+import argparse
+
+import boto3
+
+TABLE_NAME = 'oldisgold-progress'
+INDEX_NAME = 'user_id-record_key-index'
+
+
+def infer_record_type(item):
+    # Old handler stored `type`, newer items store `record_type`, and the very
+    # first meal ids were prefixed with "meal_"
+    record_type = item.get('record_type') or item.get('type')
+    if record_type:
+        return str(record_type)
+    if str(item.get('progress_id', '')).startswith('meal_'):
+        return 'meal'
+    return 'workout'
+
+
+def infer_date(item):
+    date_str = item.get('date') or str(item.get('created_at', ''))[:10]
+    return date_str or None
+
+
+def create_index(client, table_name):
+    description = client.describe_table(TableName=table_name)['Table']
+    existing = [i['IndexName'] for i in description.get('GlobalSecondaryIndexes', [])]
+    if INDEX_NAME in existing:
+        print(f"{INDEX_NAME} already exists on {table_name}")
+        return
+
+    index = {
+        'IndexName': INDEX_NAME,
+        'KeySchema': [
+            {'AttributeName': 'user_id', 'KeyType': 'HASH'},
+            {'AttributeName': 'record_key', 'KeyType': 'RANGE'},
+        ],
+        'Projection': {'ProjectionType': 'ALL'},
+    }
+    # Provisioned tables need explicit throughput on the index too
+    throughput = description.get('ProvisionedThroughput', {})
+    if throughput.get('ReadCapacityUnits'):
+        index['ProvisionedThroughput'] = {
+            'ReadCapacityUnits': throughput['ReadCapacityUnits'],
+            'WriteCapacityUnits': throughput['WriteCapacityUnits'],
+        }
+
+    client.update_table(
+        TableName=table_name,
+        AttributeDefinitions=[
+            {'AttributeName': 'user_id', 'AttributeType': 'S'},
+            {'AttributeName': 'record_key', 'AttributeType': 'S'},
+        ],
+        GlobalSecondaryIndexUpdates=[{'Create': index}],
+    )
+    print(f"Creating {INDEX_NAME} on {table_name}, this can take a few minutes")
+
+
+def backfill(table, dry_run=False):
+    scanned = updated = skipped = 0
+    scan_kwargs = {}
+    while True:
+        page = table.scan(**scan_kwargs)
+        for item in page.get('Items', []):
+            scanned += 1
+            if item.get('record_key'):
+                continue
+            date_str = infer_date(item)
+            if not date_str:
+                skipped += 1
+                print(f"Skipping {item.get('progress_id')}: no date or created_at")
+                continue
+
+            record_type = infer_record_type(item)
+            record_key = f"{record_type}#{date_str}"
+            if dry_run:
+                print(f"Would set {item['user_id']}/{item['progress_id']} -> {record_key}")
+            else:
+                table.update_item(
+                    Key={'user_id': item['user_id'], 'progress_id': item['progress_id']},
+                    UpdateExpression='SET record_key = :rk, record_type = :rt, #d = :d',
+                    ExpressionAttributeNames={'#d': 'date'},
+                    ExpressionAttributeValues={':rk': record_key, ':rt': record_type, ':d': date_str},
+                )
+            updated += 1
+
+        if 'LastEvaluatedKey' not in page:
+            break
+        scan_kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+    verb = 'would update' if dry_run else 'updated'
+    print(f"Scanned {scanned} items, {verb} {updated}, skipped {skipped}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--table', default=TABLE_NAME)
+    parser.add_argument('--region', default=None)
+    parser.add_argument('--endpoint-url', default=None, help='e.g. http://localhost:8001 for dynamodb-local')
+    parser.add_argument('--create-index', action='store_true', help=f'add {INDEX_NAME} and exit')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    session = boto3.session.Session(region_name=args.region)
+    if args.create_index:
+        create_index(session.client('dynamodb', endpoint_url=args.endpoint_url), args.table)
+        return
+    table = session.resource('dynamodb', endpoint_url=args.endpoint_url).Table(args.table)
+    backfill(table, dry_run=args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,464 @@
+"""Load test for the API handlers: latency, throughput and DynamoDB capacity per route.
+
+Seeds synthetic users with months of meals and workouts, then replays a weighted mix
+of page-view traffic through each target in-process:
+
+- lambda-package: lambda-package/lambda_function.lambda_handler
+- lambda-legacy:  backend/lambda_function.lambda_handler
+- fastapi-app:    app.main with STORAGE_BACKEND=dynamodb (needs httpx), driven with
+                  --concurrency requests in flight
+
+DynamoDB is either moto's in-process mock (the default, `pip install moto`) or a real
+endpoint such as the dynamodb-local service in docker-compose.yml. moto answers queries
+by scanning in Python, so its absolute latencies are pessimistic; compare runs against
+the same backend. Tables are created if they don't exist. Every DynamoDB call is made with ReturnConsumedCapacity=TOTAL and
+its units are charged to the route that made it.
+
+Reports p50/p95/p99 latency, throughput and read/write capacity per request for each
+route. --output writes a JSON baseline; --baseline compares against one and exits 1
+on a p95 or capacity regression.
+
+Usage:
+    python scripts/bench_load.py
+    python scripts/bench_load.py --users 50 --days 120 --requests 2000 --output load.json
+    python scripts/bench_load.py --endpoint-url http://localhost:8001 --baseline load.json
+"""
+
+import argparse
+import asyncio
+import contextvars
+import importlib.util
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDA_DIR = os.path.join(BACKEND_DIR, 'lambda-package')
+
+TARGETS = ('lambda-package', 'lambda-legacy', 'fastapi-app')
+
+# (name, partition key, sort key, [(index name, partition key, sort key)])
+TABLES = (
+    ('oldisgold-users', 'user_id', None, []),
+    ('oldisgold-profiles', 'user_id', None, []),
+    ('oldisgold-plans', 'user_id', None, []),
+    ('oldisgold-progress', 'user_id', 'progress_id', [('user_id-record_key-index', 'user_id', 'record_key')]),
+    ('oldisgold-daily-summary', 'user_id', 'date', []),
+    ('oldisgold-user-stats', 'user_id', None, []),
+)
+
+READ_OPERATIONS = {'GetItem', 'Query', 'Scan', 'BatchGetItem'}
+WRITE_OPERATIONS = {'PutItem', 'UpdateItem', 'DeleteItem', 'BatchWriteItem'}
+
+MEALS = [
+    ('breakfast', 'Oatmeal (1 cup)', 150, 5, 27, 3),
+    ('breakfast', 'Scrambled Eggs (2)', 180, 12, 2, 14),
+    ('lunch', 'Grilled Chicken (100 g)', 165, 31, 0, 4),
+    ('lunch', 'Lentil Soup (1 bowl)', 230, 18, 40, 1),
+    ('dinner', 'Baked Salmon (100 g)', 208, 20, 0, 13),
+    ('dinner', 'Brown Rice (1 cup)', 216, 5, 45, 2),
+    ('snack', 'Banana (1 medium)', 105, 1, 27, 0),
+    ('snack', 'Greek Yogurt (150 g)', 130, 15, 6, 4),
+]
+GOALS = ['strength', 'balance', 'flexibility', 'endurance', 'mobility', 'energy']
+CONDITIONS = ['arthritis', 'hypertension', 'diabetes', 'back_pain']
+LEVELS = ['beginner', 'intermediate', 'advanced']
+
+
+# ===== DynamoDB =====
+
+class CapacityMeter:
+    """Asks every DynamoDB call for its consumed capacity and adds it up.
+
+    Totals cover everything since creation. Work done while track() is active is also
+    charged to that tracker, including calls made from asyncio.to_thread workers.
+    """
+
+    def __init__(self, client):
+        self.read = 0.0
+        self.write = 0.0
+        self._current = contextvars.ContextVar('capacity', default=None)
+        client.meta.events.register('provide-client-params.dynamodb.*', self._ask)
+        client.meta.events.register('after-call.dynamodb.*', self._record)
+
+    def _ask(self, params, model, **kwargs):
+        if model.name in READ_OPERATIONS or model.name in WRITE_OPERATIONS:
+            params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+    def _record(self, parsed, model, **kwargs):
+        consumed = parsed.get('ConsumedCapacity')
+        if not consumed:
+            return
+        units = sum(c.get('CapacityUnits', 0) for c in (consumed if isinstance(consumed, list) else [consumed]))
+        kind = 0 if model.name in READ_OPERATIONS else 1
+        if kind == 0:
+            self.read += units
+        else:
+            self.write += units
+        tracker = self._current.get()
+        if tracker is not None:
+            tracker[kind] += units
+
+    def track(self):
+        tracker = [0.0, 0.0]
+        self._current.set(tracker)
+        return tracker
+
+
+def create_tables(client):
+    existing = set(client.list_tables()['TableNames'])
+    for name, hash_key, range_key, indexes in TABLES:
+        if name in existing:
+            continue
+        attributes = {hash_key, range_key} | {k for _, h, r in indexes for k in (h, r)}
+        schema = lambda h, r: [{'AttributeName': h, 'KeyType': 'HASH'}] + ([{'AttributeName': r, 'KeyType': 'RANGE'}] if r else [])
+        params = {
+            'TableName': name,
+            'KeySchema': schema(hash_key, range_key),
+            'AttributeDefinitions': [{'AttributeName': a, 'AttributeType': 'S'} for a in sorted(attributes - {None})],
+            'BillingMode': 'PAY_PER_REQUEST',
+        }
+        if indexes:
+            params['GlobalSecondaryIndexes'] = [
+                {'IndexName': index, 'KeySchema': schema(h, r), 'Projection': {'ProjectionType': 'ALL'}}
+                for index, h, r in indexes
+            ]
+        client.create_table(**params)
+        client.get_waiter('table_exists').wait(TableName=name)
+
+
+def seed(resource, lf, rollups, stats, users, days, today, rng):
+    """Users, profiles and plans plus `days` days of meals and workouts per user"""
+    user_ids = [f'bench-{i:04d}' for i in range(users)]
+    records = []
+    with resource.Table('oldisgold-users').batch_writer() as user_batch, \
+            resource.Table('oldisgold-profiles').batch_writer() as profile_batch, \
+            resource.Table('oldisgold-plans').batch_writer() as plan_batch:
+        for user_id in user_ids:
+            user = {
+                'user_id': user_id,
+                'name': f'Bench {user_id[-4:]}',
+                'age': rng.randint(55, 90),
+                'fitness_level': rng.choice(LEVELS),
+                'goals': rng.sample(GOALS, 2),
+                'health_conditions': rng.sample(CONDITIONS, rng.randint(0, 2)),
+            }
+            user_batch.put_item(Item=user)
+            profile_batch.put_item(Item={**user, 'gender': rng.choice(['female', 'male']), 'weight': rng.randint(50, 100)})
+            plan_batch.put_item(Item={**lf.generate_plan(user), 'user_id': user_id})
+
+            for offset in range(days, 0, -1):
+                day = (today - timedelta(days=offset)).isoformat()
+                for meal_type, food, calories, protein, carbs, fat in rng.sample(MEALS, 3):
+                    records.append(lf.build_meal_item({
+                        'user_id': user_id, 'date': day, 'meal_type': meal_type, 'food_name': food,
+                        'calories': calories, 'protein': protein, 'carbs': carbs, 'fat': fat,
+                    }))
+                if rng.random() < 0.6:
+                    records.append(lf.build_workout_item({
+                        'user_id': user_id, 'date': day, 'exercises_completed': 4, 'total_exercises': 4,
+                        'duration_minutes': rng.randint(8, 20), 'calories_burned': rng.randint(30, 120),
+                    }))
+
+    with resource.Table('oldisgold-progress').batch_writer() as batch:
+        for item in records:
+            batch.put_item(Item=item)
+
+    summaries = rollups.aggregate(records)
+    per_user = {}
+    with resource.Table(rollups.SUMMARY_TABLE).batch_writer() as batch:
+        for (user_id, day), totals in summaries.items():
+            batch.put_item(Item={'user_id': user_id, 'date': day, **totals})
+            per_user.setdefault(user_id, []).append({'date': day, **totals})
+    with resource.Table(stats.STATS_TABLE).batch_writer() as batch:
+        for user_id, user_days in per_user.items():
+            batch.put_item(Item={'user_id': user_id, **stats.from_rollups(user_days)})
+    return user_ids, len(records)
+
+
+# ===== Traffic =====
+
+def event(method, path, body=None, query=None):
+    return {
+        'httpMethod': method,
+        'path': path,
+        'headers': {'Content-Type': 'application/json'},
+        'queryStringParameters': query,
+        'body': json.dumps(body) if body is not None else None,
+    }
+
+
+def meal_body(rng, user_id, today):
+    meal_type, food, calories, protein, carbs, fat = rng.choice(MEALS)
+    return {'user_id': user_id, 'date': today.isoformat(), 'meal_type': meal_type, 'food_name': food,
+            'calories': calories, 'protein': protein, 'carbs': carbs, 'fat': fat}
+
+
+def workout_body(rng, user_id, today):
+    return {'user_id': user_id, 'date': today.isoformat(), 'exercises_completed': 4, 'total_exercises': 4,
+            'duration_minutes': rng.randint(8, 20), 'calories_burned': rng.randint(30, 120)}
+
+
+def lambda_package_routes(rng, today, created):
+    """(route, weight, build event for a user or None to skip)"""
+    def delete_meal(user_id):
+        if not created.get(user_id):
+            return None
+        return event('DELETE', f'/nutrition/{user_id}/{created[user_id].pop()}')
+
+    return [
+        ('GET /dashboard/{user_id}', 20, lambda u: event('GET', f'/dashboard/{u}', query={'limit': '20'})),
+        ('GET /plans/{user_id}', 10, lambda u: event('GET', f'/plans/{u}')),
+        ('GET /summary/{user_id}', 10, lambda u: event('GET', f'/summary/{u}')),
+        ('GET /stats/{user_id}', 5, lambda u: event('GET', f'/stats/{u}', query={'today': today.isoformat()})),
+        ('GET /nutrition/{user_id}', 10, lambda u: event('GET', f'/nutrition/{u}', query={'limit': '50'})),
+        ('GET /progress/{user_id}', 10, lambda u: event('GET', f'/progress/{u}', query={'limit': '50'})),
+        ('POST /nutrition', 15, lambda u: event('POST', '/nutrition', meal_body(rng, u, today))),
+        ('POST /progress', 8, lambda u: event('POST', '/progress', workout_body(rng, u, today))),
+        ('POST /nutrition/batch', 2, lambda u: event('POST', '/nutrition/batch', {
+            'user_id': u, 'records': [meal_body(rng, u, today) for _ in range(5)]})),
+        ('DELETE /nutrition/{user_id}/{meal_id}', 3, delete_meal),
+    ]
+
+
+def lambda_legacy_routes(rng, today, created):
+    return [
+        ('GET /profile/{user_id}', 15, lambda u: event('GET', f'/profile/{u}')),
+        ('GET /users/{user_id}', 10, lambda u: event('GET', f'/users/{u}')),
+        ('GET /plans/{user_id}', 15, lambda u: event('GET', f'/plans/{u}')),
+        ('GET /progress/{user_id}', 15, lambda u: event('GET', f'/progress/{u}', query={'limit': '50'})),
+        ('GET /nutrition/{user_id}', 15, lambda u: event('GET', f'/nutrition/{u}', query={'limit': '50'})),
+        ('POST /nutrition', 15, lambda u: event('POST', '/nutrition', meal_body(rng, u, today))),
+        ('POST /progress', 10, lambda u: event('POST', '/progress', {**workout_body(rng, u, today), 'type': 'workout'})),
+        ('POST /profile', 5, lambda u: event('POST', '/profile', {'user_id': u, 'name': 'Bench', 'fitness_level': 'beginner'})),
+    ]
+
+
+def fastapi_routes(rng, today, created):
+    return [
+        ('GET /plans/{user_id}', 25, lambda u: ('GET', f'/plans/{u}', None)),
+        ('GET /users/{user_id}', 15, lambda u: ('GET', f'/users/{u}', None)),
+        ('GET /progress/{user_id}', 30, lambda u: ('GET', f'/progress/{u}', None)),
+        ('POST /progress', 30, lambda u: ('POST', '/progress', {
+            'user_id': u, 'workout_completed': True, 'duration_minutes': rng.randint(8, 20), 'date': today.isoformat()})),
+    ]
+
+
+def pick(rng, routes, user_ids):
+    names = [r[0] for r in routes]
+    weights = [r[1] for r in routes]
+    builders = {r[0]: r[2] for r in routes}
+    while True:
+        route = rng.choices(names, weights)[0]
+        user_id = rng.choice(user_ids)
+        request = builders[route](user_id)
+        if request is not None:
+            return route, request
+
+
+def summarize(samples, wall_seconds):
+    """samples: [(route, ms, status, read units, write units)]"""
+    routes = {}
+    for route, ms, status, read, write in samples:
+        routes.setdefault(route, []).append((ms, status, read, write))
+    report = {'requests': len(samples), 'throughput_rps': round(len(samples) / wall_seconds, 1), 'routes': {}}
+    for route, rows in sorted(routes.items()):
+        latencies = sorted(r[0] for r in rows)
+        cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+        report['routes'][route] = {
+            'count': len(rows),
+            'errors': sum(1 for r in rows if r[1] >= 500),
+            'p50_ms': round(cuts[49], 3),
+            'p95_ms': round(cuts[94], 3),
+            'p99_ms': round(cuts[98], 3),
+            'rcu_per_request': round(sum(r[2] for r in rows) / len(rows), 3),
+            'wcu_per_request': round(sum(r[3] for r in rows) / len(rows), 3),
+        }
+    return report
+
+
+def run_lambda(handler, routes, user_ids, requests, warmup, rng, meter, created):
+    samples = []
+    started = None
+    for n in range(warmup + requests):
+        if n == warmup:
+            started = time.perf_counter()
+        route, request = pick(rng, routes, user_ids)
+        read, write = meter.read, meter.write
+        t0 = time.perf_counter()
+        result = handler(request, None)
+        elapsed = (time.perf_counter() - t0) * 1000
+        # Remember new meals so DELETE traffic has something to remove
+        if route == 'POST /nutrition' and result['statusCode'] < 300:
+            meal_id = json.loads(result['body']).get('meal_id')
+            if meal_id:
+                created.setdefault(json.loads(request['body'])['user_id'], []).append(meal_id)
+        if n >= warmup:
+            samples.append((route, elapsed, result['statusCode'], meter.read - read, meter.write - write))
+    return summarize(samples, time.perf_counter() - started)
+
+
+async def run_fastapi(app, routes, requests, warmup, concurrency, rng, meter):
+    import httpx
+
+    samples = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        # The app's users have their own shape, so create them through its API
+        user_ids = []
+        for i in range(20):
+            created = await client.post('/users', json={
+                'name': f'Bench {i}', 'age': rng.randint(55, 90), 'mobility_level': rng.choice(['low', 'medium', 'high']),
+                'goals': rng.sample(['strength', 'balance', 'flexibility', 'cardio'], 2), 'health_conditions': [],
+            })
+            user_ids.append(created.json()['user_id'])
+
+        plan = [pick(rng, routes, user_ids) for _ in range(warmup + requests)]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(index, route, request):
+            method, path, body = request
+            async with semaphore:
+                tracker = meter.track()
+                t0 = time.perf_counter()
+                result = await client.request(method, path, json=body)
+                elapsed = (time.perf_counter() - t0) * 1000
+            if index >= warmup:
+                samples.append((route, elapsed, result.status_code, tracker[0], tracker[1]))
+
+        await asyncio.gather(*(one(i, route, request) for i, (route, request) in enumerate(plan[:warmup])))
+        started = time.perf_counter()
+        await asyncio.gather(*(one(warmup + i, route, request) for i, (route, request) in enumerate(plan[warmup:])))
+        return summarize(samples, time.perf_counter() - started)
+
+
+# ===== Reporting =====
+
+def print_report(results):
+    for target, report in results.items():
+        print(f"\n{target}: {report['requests']} requests, {report['throughput_rps']} req/s")
+        print(f"  {'route':<40}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'RCU/req':>10}{'WCU/req':>10}{'5xx':>6}")
+        for route, row in report['routes'].items():
+            print(f"  {route:<40}{row['count']:>6}{row['p50_ms']:>8.2f}ms{row['p95_ms']:>8.2f}ms{row['p99_ms']:>8.2f}ms"
+                  f"{row['rcu_per_request']:>10}{row['wcu_per_request']:>10}{row['errors']:>6}")
+
+
+def compare(results, baseline, tolerance):
+    """Regressions against a previous --output file, as printable strings"""
+    regressions = []
+    for target, report in results.items():
+        for route, row in report['routes'].items():
+            before = baseline.get('results', {}).get(target, {}).get('routes', {}).get(route)
+            if not before:
+                continue
+            if row['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{target} {route}: p95 {before['p95_ms']}ms -> {row['p95_ms']}ms")
+            for unit in ('rcu_per_request', 'wcu_per_request'):
+                # Capacity is deterministic for a given seed, so any real growth counts
+                if row[unit] > before[unit] * 1.05 + 0.01:
+                    regressions.append(f"{target} {route}: {unit} {before[unit]} -> {row[unit]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--targets', nargs='+', choices=TARGETS, default=list(TARGETS))
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--days', type=int, default=60, help='days of history per user')
+    parser.add_argument('--requests', type=int, default=300, help='measured requests per target')
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=8, help='requests in flight for fastapi-app')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--endpoint-url', default=None, help='e.g. http://localhost:8001 for dynamodb-local; default is moto')
+    parser.add_argument('--region', default='us-east-1')
+    parser.add_argument('--output', default=None, help='write results as a JSON baseline')
+    parser.add_argument('--baseline', default=None, help='compare against a previous --output and exit 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p95 growth against --baseline')
+    args = parser.parse_args()
+
+    # Dummy credentials keep boto3 away from real AWS; keep access logs and metrics out of the report
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'bench')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'bench')
+    os.environ['AWS_DEFAULT_REGION'] = os.environ['AWS_REGION'] = args.region
+    os.environ['LOG_LEVEL'] = 'WARNING'
+    os.environ['METRICS_ENABLED'] = '0'
+    os.environ['STORAGE_BACKEND'] = 'dynamodb'
+    if args.endpoint_url:
+        os.environ['DYNAMODB_ENDPOINT_URL'] = args.endpoint_url
+    else:
+        try:
+            from moto import mock_aws
+        except ImportError:
+            sys.exit('moto is not installed: pip install moto, or pass --endpoint-url for dynamodb-local')
+        mock_aws().start()
+
+    import boto3
+
+    # lambda-package first: backend/ has its own lambda_function.py (loaded below as lambda-legacy)
+    sys.path.insert(0, BACKEND_DIR)
+    sys.path.insert(0, LAMBDA_DIR)
+    import db
+    import rollups
+    import stats
+    import lambda_function as lambda_package
+
+    meter = CapacityMeter(db.get_client())
+    create_tables(db.get_client())
+
+    rng = random.Random(args.seed)
+    today = date.today()
+    resource = boto3.resource('dynamodb', region_name=args.region, endpoint_url=args.endpoint_url)
+    t0 = time.perf_counter()
+    user_ids, record_count = seed(resource, lambda_package, rollups, stats, args.users, args.days, today, rng)
+    print(f"Seeded {len(user_ids)} users, {record_count} records in {time.perf_counter() - t0:.1f}s")
+
+    results = {}
+    created = {}
+    for target in args.targets:
+        rng = random.Random(args.seed)
+        if target == 'lambda-package':
+            routes = lambda_package_routes(rng, today, created)
+            results[target] = run_lambda(lambda_package.lambda_handler, routes, user_ids, args.requests, args.warmup, rng, meter, created)
+        elif target == 'lambda-legacy':
+            # Same module name as lambda-package's handler, so load it under another one
+            spec = importlib.util.spec_from_file_location('legacy_lambda_function', os.path.join(BACKEND_DIR, 'lambda_function.py'))
+            legacy = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(legacy)
+            routes = lambda_legacy_routes(rng, today, created)
+            results[target] = run_lambda(legacy.lambda_handler, routes, user_ids, args.requests, args.warmup, rng, meter, created)
+        else:
+            try:
+                import httpx  # noqa: F401
+            except ImportError:
+                print('Skipping fastapi-app: httpx is not installed')
+                continue
+            from app.main import app
+            routes = fastapi_routes(rng, today, created)
+            results[target] = asyncio.run(run_fastapi(app, routes, args.requests, args.warmup, args.concurrency, rng, meter))
+
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'python': sys.version.split()[0],
+                'dynamodb': args.endpoint_url or 'moto',
+                'config': {k: getattr(args, k) for k in ('users', 'days', 'requests', 'warmup', 'concurrency', 'seed')},
+                'results': results,
+            }, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
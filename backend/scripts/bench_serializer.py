@@ -0,0 +1,148 @@
+"""Micro-benchmark for response encoding over realistic history payloads.
+
+Builds meal/workout histories shaped like GET /nutrition and GET /progress responses
+(numbers as Decimal, as DynamoDB returns them) and times:
+
+- copy+dumps:   the old lambda-package path, decimal_to_num() deep copy then json.dumps
+- dumps+hook:   the old backend/lambda_function.py path, json.dumps(default=decimal_default)
+- serialization: lambda-package/serialization.dumps (stdlib encoder)
+- orjson:       serialization.dumps with orjson, when it is installed
+
+Usage:
+    python scripts/bench_serializer.py
+    python scripts/bench_serializer.py --sizes 1000 10000 --repeat 20 --output serializer.json
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda-package'))
+
+import serialization  # noqa: E402
+
+MEAL_TYPES = ['breakfast', 'lunch', 'dinner', 'snack']
+FOODS = ['Oatmeal (1 cup)', 'Banana (1 medium)', 'Grilled Chicken (100 g)', 'Brown Rice (1 cup)', 'Greek Yogurt (150 g)']
+
+
+def decimal_to_num(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    elif isinstance(obj, dict):
+        return {k: decimal_to_num(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [decimal_to_num(i) for i in obj]
+    return obj
+
+
+def decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj) if obj % 1 else int(obj)
+    raise TypeError
+
+
+def make_history(size, seed=7):
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    items = []
+    for i in range(size):
+        day = (start + timedelta(days=i // 4)).isoformat()
+        if rng.random() < 0.75:
+            items.append({
+                'progress_id': str(uuid.UUID(int=rng.getrandbits(128))),
+                'user_id': 'u123',
+                'date': day,
+                'record_type': 'meal',
+                'record_key': f'meal#{day}',
+                'meal_type': rng.choice(MEAL_TYPES),
+                'food_name': rng.choice(FOODS),
+                'calories': Decimal(rng.randint(50, 900)),
+                'protein': Decimal(rng.randint(0, 60)),
+                'carbs': Decimal(rng.randint(0, 120)),
+                'fat': Decimal(rng.randint(0, 40)),
+                'created_at': f'{day}T12:00:00.000000',
+            })
+        else:
+            items.append({
+                'progress_id': str(uuid.UUID(int=rng.getrandbits(128))),
+                'user_id': 'u123',
+                'date': day,
+                'record_type': 'workout',
+                'record_key': f'workout#{day}',
+                'workout_completed': True,
+                'exercises_completed': Decimal(rng.randint(1, 5)),
+                'total_exercises': Decimal(5),
+                'duration_minutes': Decimal(rng.randint(5, 45)),
+                'calories_burned': Decimal(str(round(rng.uniform(20, 300), 1))),
+                'created_at': f'{day}T08:00:00.000000',
+            })
+    return {'meals': items, 'count': len(items), 'next_cursor': None}
+
+
+def time_it(fn, payload, repeat):
+    fn(payload)  # warm up
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(payload)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=15)
+    parser.add_argument('--output', default=None, help='write results as JSON')
+    args = parser.parse_args()
+
+    orjson = serialization.orjson
+    serialization.orjson = None
+    stdlib_dumps = serialization.dumps
+
+    def orjson_dumps(payload):
+        serialization.orjson = orjson
+        try:
+            return serialization.dumps(payload)
+        finally:
+            serialization.orjson = None
+
+    candidates = {
+        'copy+dumps': lambda p: json.dumps(decimal_to_num(p)),
+        'dumps+hook': lambda p: json.dumps(p, default=decimal_default),
+        'serialization': stdlib_dumps,
+    }
+    if orjson is not None:
+        candidates['orjson'] = orjson_dumps
+
+    results = []
+    for size in args.sizes:
+        payload = make_history(size)
+        # Every candidate must produce the same document
+        expected = json.loads(candidates['copy+dumps'](payload))
+        row = {'items': size, 'bytes': len(candidates['copy+dumps'](payload))}
+        for name, fn in candidates.items():
+            assert json.loads(fn(payload)) == expected, name
+            row[f'{name}_ms'] = time_it(fn, payload, args.repeat)
+        row['speedup'] = round(row['copy+dumps_ms'] / min(row[f'{n}_ms'] for n in candidates if n != 'copy+dumps'), 2)
+        results.append(row)
+
+    names = list(candidates)
+    print(f"{'items':>8}{'bytes':>11}" + ''.join(f'{n:>15}' for n in names) + f"{'speedup':>9}")
+    for row in results:
+        print(f"{row['items']:>8}{row['bytes']:>11}" + ''.join(f"{row[n + '_ms']:>13}ms" for n in names) + f"{row['speedup']:>8}x")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'repeat': args.repeat, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Measure cold-start cost of the backend entry points and enforce a budget.
+
+Each target is imported in a fresh interpreter (so nothing is cached between runs),
+timing the import itself and then the first-request init: building the DynamoDB
+client for the Lambda handlers. No AWS calls are made.
+
+Usage:
+    python scripts/bench_startup.py                          # print a table
+    python scripts/bench_startup.py --runs 10 --output startup.json
+    python scripts/bench_startup.py --budget-ms 400          # exit 1 if any median is over
+    python scripts/bench_startup.py --top 15                 # slowest imports per target
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDA_DIR = os.path.join(BACKEND_DIR, 'lambda-package')
+
+# name -> (sys.path entry, module, init snippet run after import)
+TARGETS = {
+    'lambda-package': (LAMBDA_DIR, 'lambda_function', 'import db; db.get_client()'),
+    'lambda-legacy': (BACKEND_DIR, 'lambda_function', 'import db; db.get_client()'),
+    'fastapi-app': (BACKEND_DIR, 'app.main', None),
+}
+
+CHILD = """
+import json, sys, time
+sys.path.insert(0, {path!r})
+t0 = time.perf_counter()
+import {module}
+t1 = time.perf_counter()
+{init}
+t2 = time.perf_counter()
+print(json.dumps({{'import_ms': (t1 - t0) * 1000, 'init_ms': (t2 - t1) * 1000}}))
+"""
+
+CHILD_ENV = {
+    # Dummy region/credentials so client creation never goes looking for real ones
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_ACCESS_KEY_ID': 'bench',
+    'AWS_SECRET_ACCESS_KEY': 'bench',
+}
+
+
+def run_once(path, module, init):
+    code = CHILD.format(path=path, module=module, init=init or 'pass')
+    env = {**os.environ, **CHILD_ENV, 'PYTHONDONTWRITEBYTECODE': '1'}
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, cwd=BACKEND_DIR)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else 'child failed')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(path, module, top):
+    """Cumulative self+children time per module from -X importtime, slowest first"""
+    code = f"import sys; sys.path.insert(0, {path!r}); import {module}"
+    env = {**os.environ, **CHILD_ENV}
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, env=env, cwd=BACKEND_DIR)
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line[len('import time:'):].split('|')
+        # Skip the "self [us] | cumulative | imported package" header
+        if not line.startswith('import time:') or len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        rows.append((int(parts[1]) / 1000, parts[2].strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def measure(name, runs):
+    path, module, init = TARGETS[name]
+    samples = [run_once(path, module, init) for _ in range(runs)]
+    import_ms = [s['import_ms'] for s in samples]
+    init_ms = [s['init_ms'] for s in samples]
+    return {
+        'target': name,
+        'module': module,
+        'runs': runs,
+        'import_ms_median': round(statistics.median(import_ms), 1),
+        'import_ms_max': round(max(import_ms), 1),
+        'init_ms_median': round(statistics.median(init_ms), 1),
+        'total_ms_median': round(statistics.median(i + j for i, j in zip(import_ms, init_ms)), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', action='append', choices=sorted(TARGETS), help='repeatable; default is all')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=None, help='fail if a median import+init exceeds this')
+    parser.add_argument('--output', default=None, help='write results as JSON')
+    parser.add_argument('--top', type=int, default=0, help='also list the N slowest imports per target')
+    args = parser.parse_args()
+
+    results = []
+    for name in args.target or list(TARGETS):
+        try:
+            results.append(measure(name, args.runs))
+        except RuntimeError as e:
+            print(f"{name}: skipped ({e})")
+            continue
+        if args.top:
+            path, module, _ = TARGETS[name]
+            results[-1]['slowest_imports'] = [
+                {'module': mod, 'cumulative_ms': round(ms, 1)} for ms, mod in slowest_imports(path, module, args.top)
+            ]
+
+    print(f"{'target':<16}{'import ms':>12}{'init ms':>10}{'total ms':>10}")
+    for r in results:
+        print(f"{r['target']:<16}{r['import_ms_median']:>12}{r['init_ms_median']:>10}{r['total_ms_median']:>10}")
+        for row in r.get('slowest_imports', []):
+            print(f"    {row['cumulative_ms']:>8} ms  {row['module']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'budget_ms': args.budget_ms, 'results': results}, f, indent=2)
+
+    if args.budget_ms is not None:
+        over = [r for r in results if r['total_ms_median'] > args.budget_ms]
+        for r in over:
+            print(f"OVER BUDGET: {r['target']} {r['total_ms_median']} ms > {args.budget_ms} ms")
+        sys.exit(1 if over else 0)
+
+
+if __name__ == '__main__':
+    main()
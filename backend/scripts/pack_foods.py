@@ -0,0 +1,136 @@
+"""Pack a food-composition CSV into lambda-package/foods.idx for GET /foods/search.
+
+Usage:
+    python scripts/pack_foods.py                                  # data/foods.csv
+    python scripts/pack_foods.py --csv fdc_foods.csv --source "USDA FoodData Central"
+
+Run it before zipping lambda-package; the Lambda maps the file read-only and never
+parses the CSV. The CSV needs a header row with
+
+    name,calories,protein,carbs,fat,unit,default_amount
+
+Macros are per 100 g/ml for the g and ml units and per unit otherwise (piece, slice,
+cup), the same convention as the Nutrition page. default_amount is optional. Names that
+normalize to the same search key are packed once (first row wins). See
+lambda-package/foods.py for the file layout.
+"""
+
+import argparse
+import csv
+import heapq
+import json
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda-package'))
+
+import foods  # noqa: E402
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DEFAULT_CSV = os.path.join(BACKEND_DIR, 'data', 'foods.csv')
+MAX_NAME_LENGTH = 200
+
+
+def read_foods(path):
+    """Rows of the CSV as (key, name, macros, unit, default_amount), first row per key"""
+    rows = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            name = (row.get('name') or '').strip()[:MAX_NAME_LENGTH]
+            key = foods.normalize(name)
+            if not key or key in rows:
+                continue
+            try:
+                macros = tuple(float(row.get(field) or 0) for field in ('calories', 'protein', 'carbs', 'fat'))
+                unit = (row.get('unit') or 'g').strip()
+                amount = float(row.get('default_amount') or (100 if unit in ('g', 'ml') else 1))
+            except ValueError as e:
+                raise ValueError(f'{path}:{line}: {e}')
+            rows[key] = (key, name, macros, unit, amount)
+    # Shortest keys first, see foods.py
+    return sorted(rows.values(), key=lambda r: (len(r[0]), r[0]))
+
+
+def pack(rows, source):
+    """foods.idx contents for the rows from read_foods"""
+    strings = bytearray()
+
+    def add_string(text):
+        offset = len(strings)
+        strings.extend(text.encode())
+        return offset, len(strings) - offset
+
+    units = sorted({unit for _, _, _, unit, _ in rows})
+    records = bytearray()
+    words = []
+    prefixes = {}
+    grams = {}
+    for food_id, (key, name, macros, unit, amount) in enumerate(rows):
+        name_offset, name_length = add_string(name)
+        key_offset, key_length = add_string(key)
+        food_grams = foods.trigrams(key)
+        records += foods.RECORD.pack(
+            name_offset, key_offset, name_length, key_length, units.index(unit), len(food_grams), *macros, amount
+        )
+        # Keys are ASCII, so a word's character position is also its byte offset
+        offset = key_offset
+        for position, word in enumerate(key.split(' ')):
+            # Same order search() ranks in: foods starting with the word, then shorter names
+            rank = (position != 0, food_id)
+            words.append((word, rank, offset, min(position, 255)))
+            for length in range(1, min(len(word), foods.PREFIX_LENGTH) + 1):
+                best = prefixes.setdefault(word[:length], {})
+                best[food_id] = min(rank, best.get(food_id, rank))
+            offset += len(word) + 1
+        for gram in food_grams:
+            grams.setdefault(gram, []).append(food_id)
+
+    words.sort()
+    word_table = b''.join(foods.WORD.pack(offset, len(word), position, rank[1]) for word, rank, offset, position in words)
+    postings = []
+
+    def add_run(table, code, food_ids):
+        table += foods.SLOT.pack(code, len(postings), len(food_ids))
+        postings.extend(food_ids)
+
+    prefix_table = bytearray()
+    for prefix in sorted(prefixes, key=foods.prefix_code):
+        best = prefixes[prefix]
+        add_run(prefix_table, foods.prefix_code(prefix), heapq.nsmallest(foods.MAX_LIMIT, best, key=best.get))
+    gram_table = bytearray()
+    for gram in sorted(grams):
+        add_run(gram_table, gram, grams[gram])
+    posting_bytes = struct.pack(f'<{len(postings)}I', *postings)
+    meta = json.dumps({'units': units, 'source': source, 'count': len(rows), 'built_at': int(time.time())}).encode()
+    # Keeps every later section 4-byte aligned, see foods.py
+    meta += b' ' * (-(foods.HEADER.size + len(meta)) % 4)
+
+    offset = foods.HEADER.size
+    sections = []
+    for section in (meta, records, word_table, prefix_table, gram_table, posting_bytes, strings):
+        sections.append(offset)
+        offset += len(section)
+    header = foods.HEADER.pack(
+        foods.MAGIC, foods.VERSION, len(rows), len(words), len(prefixes), len(grams), sections[0], len(meta), *sections[1:]
+    )
+    return b''.join((header, meta, records, word_table, prefix_table, gram_table, posting_bytes, strings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=DEFAULT_CSV, help='food-composition CSV (default: data/foods.csv)')
+    parser.add_argument('--output', default=foods.INDEX_PATH, help='index file to write (default: lambda-package/foods.idx)')
+    parser.add_argument('--source', default='Old Is Gold starter list', help='dataset name recorded in the index')
+    args = parser.parse_args()
+
+    rows = read_foods(args.csv)
+    data = pack(rows, args.source)
+    with open(args.output, 'wb') as f:
+        f.write(data)
+    print(f'Packed {len(rows)} foods into {args.output} ({len(data) / 1024:.1f} KiB)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Recompute oldisgold-daily-summary (and each user's oldisgold-user-stats item) from
+the raw records in oldisgold-progress.
+
+Usage:
+    python scripts/rebuild_rollups.py --user-id abc123    # one or more users
+    python scripts/rebuild_rollups.py                     # everyone (full table scan)
+    python scripts/rebuild_rollups.py --dry-run
+
+Rollups are normally maintained by the Lambda on every write; run this after the
+initial rollout, after restoring a backup, or if a write failed between the record
+and its rollup update. Stale rollup days with no remaining records are removed.
+Lifetime totals and streaks are then recomputed from the rebuilt days.
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda-package'))
+
+import rollups  # noqa: E402
+import stats  # noqa: E402
+
+PROGRESS_TABLE = 'oldisgold-progress'
+
+
+def read_user_records(progress_table, user_id):
+    query_kwargs = {'KeyConditionExpression': Key('user_id').eq(user_id)}
+    while True:
+        page = progress_table.query(**query_kwargs)
+        yield from page.get('Items', [])
+        if 'LastEvaluatedKey' not in page:
+            return
+        query_kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+
+def read_all_records(progress_table):
+    scan_kwargs = {}
+    while True:
+        page = progress_table.scan(**scan_kwargs)
+        yield from page.get('Items', [])
+        if 'LastEvaluatedKey' not in page:
+            return
+        scan_kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+
+def existing_rollup_keys(summary_table, user_ids=None):
+    if user_ids:
+        items = []
+        for user_id in user_ids:
+            query_kwargs = {
+                'KeyConditionExpression': Key('user_id').eq(user_id),
+                'ProjectionExpression': 'user_id, #d',
+                'ExpressionAttributeNames': {'#d': 'date'},
+            }
+            while True:
+                page = summary_table.query(**query_kwargs)
+                items.extend(page.get('Items', []))
+                if 'LastEvaluatedKey' not in page:
+                    break
+                query_kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+    else:
+        items = read_all_records(summary_table)
+    return {(item['user_id'], item['date']) for item in items}
+
+
+def rebuild(progress_table, summary_table, stats_table, user_ids=None, dry_run=False):
+    if user_ids:
+        records = (item for user_id in user_ids for item in read_user_records(progress_table, user_id))
+    else:
+        records = read_all_records(progress_table)
+    days = rollups.aggregate(records)
+    stale = existing_rollup_keys(summary_table, user_ids) - set(days)
+
+    user_days = {user_id: [] for user_id in user_ids or ()}
+    for (user_id, date_str), totals in days.items():
+        user_days.setdefault(user_id, []).append({'date': date_str, **totals})
+
+    if dry_run:
+        print(f"Would write {len(days)} rollup days, delete {len(stale)} stale ones and write stats for {len(user_days)} users")
+        return
+
+    rebuilt_at = datetime.utcnow().isoformat()
+    with summary_table.batch_writer(overwrite_by_pkeys=['user_id', 'date']) as batch:
+        for (user_id, date_str), totals in days.items():
+            batch.put_item(Item={'user_id': user_id, 'date': date_str, 'rebuilt_at': rebuilt_at, **totals})
+        for user_id, date_str in stale:
+            batch.delete_item(Key={'user_id': user_id, 'date': date_str})
+    with stats_table.batch_writer(overwrite_by_pkeys=['user_id']) as batch:
+        for user_id, user_rollups in user_days.items():
+            # A fresh last_write_at retires /analytics results cached from the old rollups
+            batch.put_item(Item={
+                'user_id': user_id, 'rebuilt_at': rebuilt_at, 'last_write_at': rebuilt_at, **stats.from_rollups(user_rollups)
+            })
+    print(f"Wrote {len(days)} rollup days, deleted {len(stale)} stale ones, wrote stats for {len(user_days)} users")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--user-id', action='append', dest='user_ids', help='repeatable; default is every user')
+    parser.add_argument('--progress-table', default=PROGRESS_TABLE)
+    parser.add_argument('--summary-table', default=rollups.SUMMARY_TABLE)
+    parser.add_argument('--stats-table', default=stats.STATS_TABLE)
+    parser.add_argument('--region', default=None)
+    parser.add_argument('--endpoint-url', default=None, help='e.g. http://localhost:8001 for dynamodb-local')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    dynamodb = boto3.session.Session(region_name=args.region).resource('dynamodb', endpoint_url=args.endpoint_url)
+    rebuild(
+        dynamodb.Table(args.progress_table),
+        dynamodb.Table(args.summary_table),
+        dynamodb.Table(args.stats_table),
+        user_ids=args.user_ids,
+        dry_run=args.dry_run,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+"""Build each user's weekly workout and nutrition summary for the email outbox.
+
+Usage:
+    python scripts/weekly_summaries.py                          # last full week (Mon-Sun, UTC)
+    python scripts/weekly_summaries.py --week 2024-01-03        # the week containing that day
+    python scripts/weekly_summaries.py --outbox-table oldisgold-email-outbox
+    python scripts/weekly_summaries.py --endpoint-url http://localhost:8001 --dry-run
+
+oldisgold-progress is read once, by --segments parallel Scan workers (TotalSegments),
+filtered to the week's records and projected to the fields a summary needs. Pages are
+streamed in batches to a process pool (--workers) that folds them into per-user,
+per-day totals with rollups.aggregate; the main process merges the batches as they
+finish, then the pool renders a plain-text email for every user whose week changed.
+
+Summaries go to --outbox-dir (<week>/<user_id>.txt, the default) or to an outbox table
+keyed by user_id + week. The --checkpoint file remembers, per week, the totals so far
+and the created_at up to which records were read, so a rerun only scans in and
+renders records created since. Records deleted after a run stay counted until the
+week is rebuilt with --full. Records without created_at (written by the older
+handler) are only picked up by a first or --full run.
+
+A Scan is not a snapshot: a record stamped just before the run starts may land after
+its segment was read (a batch write stamps created_at before its backoff ends). So a
+run reads up to --margin-minutes before it started, never later, and leaves anything
+newer to the next run. Every record falls in exactly one run's (read_from, read_until]
+window, which keeps reruns from missing or double counting it.
+
+Locally, point --endpoint-url at the dynamodb-local service in docker-compose.yml.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda-package'))
+
+import batch_writes  # noqa: E402
+import db  # noqa: E402
+import metrics  # noqa: E402
+import projection  # noqa: E402
+import rollups  # noqa: E402
+
+PROGRESS_TABLE = 'oldisgold-progress'
+DEFAULT_CHECKPOINT = 'weekly_summaries_checkpoint.json'
+DEFAULT_OUTBOX_DIR = 'weekly-summaries'
+# Records per process-pool task: large enough to amortise pickling, small enough to stream
+BATCH_SIZE = 2000
+# How far behind the run's start it reads, see above. Comfortably longer than any write
+# takes from stamping created_at to landing, and than clock skew between hosts
+DEFAULT_MARGIN_MINUTES = 5
+SUMMARY_FIELDS = (
+    'user_id', 'date', 'record_type', 'type', 'calories', 'protein', 'carbs', 'fat',
+    'duration_minutes', 'duration', 'calories_burned'
+)
+
+
+def week_bounds(day):
+    """(Monday, Sunday) of the week containing day, as YYYY-MM-DD"""
+    monday = day - timedelta(days=day.weekday())
+    return monday.isoformat(), (monday + timedelta(days=6)).isoformat()
+
+
+def scan_segment(progress_table, segment, total_segments, week_start, week_end, since, until):
+    """Yield pages of one Scan segment's records for the week, created in (since, until]"""
+    from boto3.dynamodb.conditions import Attr
+
+    created = Attr('created_at').lte(until)
+    if since:
+        created = created & Attr('created_at').gt(since)
+    else:
+        created = created | Attr('created_at').not_exists()
+    scan_kwargs = projection.apply({
+        'Segment': segment,
+        'TotalSegments': total_segments,
+        'FilterExpression': Attr('date').between(week_start, week_end) & created,
+    }, SUMMARY_FIELDS)
+    while True:
+        page = progress_table.scan(**scan_kwargs)
+        yield page.get('Items', [])
+        if 'LastEvaluatedKey' not in page:
+            return
+        scan_kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+
+def fold(records):
+    """Process-pool task: {user_id: {date: totals}} for one batch of records"""
+    users = {}
+    for (user_id, date_str), totals in rollups.aggregate(records).items():
+        users.setdefault(user_id, {})[date_str] = totals
+    return users
+
+
+def merge(users, batch):
+    for user_id, days in batch.items():
+        user_days = users.setdefault(user_id, {})
+        for date_str, totals in days.items():
+            day = user_days.setdefault(date_str, dict.fromkeys(rollups.ROLLUP_FIELDS, 0))
+            for field, amount in totals.items():
+                day[field] += amount
+
+
+def plural(count, word):
+    return f"{count} {word}{'' if count == 1 else 's'}"
+
+
+def render(job):
+    """Process-pool task: (user_id, subject, body) for one user's week"""
+    user_id, week_start, days = job
+    totals = rollups.summarize(days.values())
+    workout_days = sorted(d for d, t in days.items() if t['workouts'] > 0)
+    meal_days = sorted(d for d, t in days.items() if t['meals'] > 0)
+    monday = datetime.strptime(week_start, '%Y-%m-%d')
+    week_label = f"{monday:%d %b} - {monday + timedelta(days=6):%d %b %Y}"
+
+    if totals['workouts']:
+        subject = f"Your week: {plural(totals['workouts'], 'workout')}, {plural(totals['minutes'], 'minute')}"
+    else:
+        subject = 'Your week in Old Is Gold'
+    lines = [f'Your week, {week_label}', '']
+    if totals['workouts']:
+        lines.append(
+            f"Workouts: {totals['workouts']} on {len(workout_days)} of 7 days, "
+            f"{plural(totals['minutes'], 'minute')}, {totals['calories_burned']} calories burned"
+        )
+    else:
+        lines.append('Workouts: none logged this week. A short walk is a great start.')
+    if meal_days:
+        lines.append(
+            f"Meals: {totals['meals']} logged on {plural(len(meal_days), 'day')}, "
+            f"about {round(totals['calories'] / len(meal_days))} calories a day "
+            f"(protein {totals['protein']}g, carbs {totals['carbs']}g, fat {totals['fat']}g in total)"
+        )
+    lines += ['', 'Day by day:']
+    for offset in range(7):
+        day = monday + timedelta(days=offset)
+        t = days.get(day.strftime('%Y-%m-%d'))
+        if t:
+            lines.append(f"  {day:%a %d %b}  {plural(t['workouts'], 'workout')}, {t['minutes']} min, {t['calories']} cal eaten")
+        else:
+            lines.append(f"  {day:%a %d %b}  -")
+    return user_id, subject, '\n'.join(lines) + '\n'
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return {'weeks': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, checkpoint):
+    # Write then rename, so an interrupted run never leaves a half-written checkpoint
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def write_outbox(outbox_dir, outbox_table, week_start, rendered):
+    created_at = datetime.utcnow().isoformat()
+    if outbox_table:
+        items = [
+            {'user_id': user_id, 'week': week_start, 'subject': subject, 'body': body, 'status': 'pending', 'created_at': created_at}
+            for user_id, subject, body in rendered
+        ]
+        failed = batch_writes.batch_put(db, outbox_table.name, items, ('user_id', 'week')) if items else set()
+        if failed:
+            raise RuntimeError(f'{len(failed)} outbox items could not be written, rerun to retry')
+        return
+    week_dir = os.path.join(outbox_dir, week_start)
+    os.makedirs(week_dir, exist_ok=True)
+    for user_id, subject, body in rendered:
+        with open(os.path.join(week_dir, f"{user_id.replace(os.sep, '_')}.txt"), 'w') as f:
+            f.write(f'Subject: {subject}\n\n{body}')
+
+
+def run(progress_table, week_start, week_end, checkpoint, outbox_dir=DEFAULT_OUTBOX_DIR, outbox_table=None,
+        segments=4, workers=None, full=False, dry_run=False, margin_minutes=DEFAULT_MARGIN_MINUTES):
+    """Scan, fold, render and write one week; updates checkpoint in place. Returns a stats dict"""
+    state = {} if full else checkpoint['weeks'].get(week_start, {})
+    since = state.get('read_until')
+    until = (datetime.utcnow() - timedelta(minutes=margin_minutes)).isoformat()
+    if since and until < since:
+        # A rerun within the margin: read nothing rather than move the window backwards
+        until = since
+    users = state.get('users', {})
+    changed = set()
+    scanned = 0
+
+    # spawn: the scan threads may hold locks that a forked worker would inherit
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) if workers != 0 else None
+    try:
+        def submit(batch):
+            if pool:
+                return pool.submit(fold, batch)
+            future = Future()
+            future.set_result(fold(batch))
+            return future
+
+        def read_segment(segment):
+            futures, batch, count = [], [], 0
+            for items in scan_segment(progress_table, segment, segments, week_start, week_end, since, until):
+                batch.extend(items)
+                count += len(items)
+                if len(batch) >= BATCH_SIZE:
+                    futures.append(submit(batch))
+                    batch = []
+            if batch:
+                futures.append(submit(batch))
+            return futures, count
+
+        with ThreadPoolExecutor(max_workers=segments) as scanners:
+            for scan in as_completed([scanners.submit(read_segment, s) for s in range(segments)]):
+                futures, count = scan.result()
+                scanned += count
+                for future in as_completed(futures):
+                    batch = future.result()
+                    merge(users, batch)
+                    changed.update(batch)
+
+        jobs = [(user_id, week_start, users[user_id]) for user_id in sorted(changed)]
+        if pool:
+            rendered = list(pool.map(render, jobs, chunksize=max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))))
+        else:
+            rendered = [render(job) for job in jobs]
+    finally:
+        if pool:
+            pool.shutdown()
+
+    if not dry_run:
+        write_outbox(outbox_dir, outbox_table, week_start, rendered)
+        checkpoint['weeks'][week_start] = {'read_until': until, 'users': users}
+    return {'records': scanned, 'users': len(users), 'rendered': len(rendered)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--week', help='any YYYY-MM-DD in the week (default: last full week)')
+    parser.add_argument('--segments', type=int, default=4, help='parallel Scan segments (default 4)')
+    parser.add_argument('--workers', type=int, default=None, help='summary processes, 0 to run inline (default: CPU count)')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    parser.add_argument('--full', action='store_true', help="ignore the week's checkpoint and rebuild it")
+    parser.add_argument('--margin-minutes', type=float, default=DEFAULT_MARGIN_MINUTES,
+                        help=f'read records created up to this long before the run started (default {DEFAULT_MARGIN_MINUTES})')
+    parser.add_argument('--outbox-dir', default=DEFAULT_OUTBOX_DIR)
+    parser.add_argument('--outbox-table', default=None, help='write to this table (user_id + week) instead of --outbox-dir')
+    parser.add_argument('--progress-table', default=PROGRESS_TABLE)
+    parser.add_argument('--region', default=None)
+    parser.add_argument('--endpoint-url', default=None, help='e.g. http://localhost:8001 for dynamodb-local')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    if args.region:
+        os.environ['AWS_REGION'] = args.region
+    if args.endpoint_url:
+        os.environ['DYNAMODB_ENDPOINT_URL'] = args.endpoint_url
+    if args.week:
+        day = datetime.strptime(args.week, '%Y-%m-%d').date()
+    else:
+        day = datetime.utcnow().date() - timedelta(days=7)
+    week_start, week_end = week_bounds(day)
+
+    checkpoint = load_checkpoint(args.checkpoint)
+    metrics.start()
+    result = run(
+        db.table(args.progress_table), week_start, week_end, checkpoint,
+        outbox_dir=args.outbox_dir,
+        outbox_table=db.table(args.outbox_table) if args.outbox_table else None,
+        segments=args.segments, workers=args.workers, full=args.full, dry_run=args.dry_run,
+        margin_minutes=args.margin_minutes,
+    )
+    capacity = metrics.snapshot()
+    print(
+        f"Week {week_start}: scanned in {result['records']} new records over {args.segments} segments "
+        f"({capacity['ConsumedRCU']:g} RCU), {'would render' if args.dry_run else 'rendered'} "
+        f"{result['rendered']} of {result['users']} users' summaries"
+    )
+    if not args.dry_run:
+        save_checkpoint(args.checkpoint, checkpoint)
+
+
+if __name__ == '__main__':
+    main()
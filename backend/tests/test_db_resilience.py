@@ -0,0 +1,222 @@
+"""db.py under throttling: Unavailable, 503 + Retry-After and the circuit breaker.
+
+A stub client stands in for DynamoDB and fails calls on demand, so nothing here needs
+AWS or moto. Run from backend/: python -m pytest tests
+"""
+
+import importlib.util
+import json
+import os
+import sys
+
+import pytest
+from botocore.exceptions import ClientError, ReadTimeoutError
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'lambda-package'))
+
+import breaker  # noqa: E402
+import db  # noqa: E402
+import lambda_function  # noqa: E402
+import metrics  # noqa: E402
+
+THRESHOLD = 3
+COOLDOWN_SECONDS = 10
+
+
+def load_legacy_handler():
+    spec = importlib.util.spec_from_file_location('legacy_lambda_function', os.path.join(BACKEND_DIR, 'lambda_function.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+legacy_lambda_function = load_legacy_handler()
+
+
+def client_error(code, status=400):
+    return ClientError({'Error': {'Code': code, 'Message': code}, 'ResponseMetadata': {'HTTPStatusCode': status}}, 'Query')
+
+
+THROTTLE = client_error('ProvisionedThroughputExceededException')
+READ_TIMEOUT = ReadTimeoutError(endpoint_url='https://dynamodb.us-east-1.amazonaws.com')
+VALIDATION = client_error('ValidationException')
+
+
+class StubClient:
+    """Low-level client whose get_item/query raise `error` when it is set"""
+
+    def __init__(self):
+        self.error = None
+        self.calls = 0
+        self.on_call = None
+
+    def _call(self, result):
+        self.calls += 1
+        if self.on_call:
+            self.on_call()
+        if self.error:
+            raise self.error
+        return result
+
+    def get_item(self, **params):
+        return self._call({})
+
+    def query(self, **params):
+        return self._call({'Items': [], 'Count': 0})
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def client(monkeypatch, clock):
+    stub = StubClient()
+    monkeypatch.setattr(db, '_client', stub)
+    monkeypatch.setattr(db, 'circuit', breaker.CircuitBreaker(THRESHOLD, COOLDOWN_SECONDS, clock=clock))
+    monkeypatch.setattr(metrics, 'enabled', False)
+    return stub
+
+
+def get_item():
+    return db.table('oldisgold-users').get_item(Key={'user_id': 'u1'})
+
+
+def event(method, path):
+    return {'httpMethod': method, 'path': path, 'headers': {}, 'queryStringParameters': None, 'body': None}
+
+
+@pytest.mark.parametrize('handler', [lambda_function.lambda_handler, legacy_lambda_function.lambda_handler])
+@pytest.mark.parametrize('error', [THROTTLE, READ_TIMEOUT])
+def test_unavailable_is_503_with_retry_after(client, handler, error):
+    client.error = error
+    result = handler(event('GET', '/nutrition/u1'), None)
+    assert result['statusCode'] == 503
+    assert int(result['headers']['Retry-After']) >= 1
+    assert 'unavailable' in json.loads(result['body'])['error']
+
+
+def test_unavailable_wraps_the_dynamodb_error(client):
+    client.error = THROTTLE
+    with pytest.raises(db.Unavailable) as raised:
+        get_item()
+    assert raised.value.__cause__ is THROTTLE
+    assert raised.value.retry_after == 1
+
+
+def test_breaker_opens_after_threshold_and_fails_fast(client):
+    client.error = THROTTLE
+    for _ in range(THRESHOLD):
+        with pytest.raises(db.Unavailable):
+            get_item()
+    assert client.calls == THRESHOLD
+
+    with pytest.raises(db.Unavailable) as raised:
+        get_item()
+    assert client.calls == THRESHOLD
+    assert raised.value.retry_after == COOLDOWN_SECONDS
+
+
+def test_open_breaker_is_503_without_calling_dynamodb(client):
+    client.error = THROTTLE
+    for _ in range(THRESHOLD):
+        lambda_function.lambda_handler(event('GET', '/nutrition/u1'), None)
+    client.error = None
+    result = lambda_function.lambda_handler(event('GET', '/nutrition/u1'), None)
+    assert result['statusCode'] == 503
+    assert result['headers']['Retry-After'] == str(COOLDOWN_SECONDS)
+    assert client.calls == THRESHOLD
+
+
+def test_one_trial_call_after_cooldown_then_closes(client, clock):
+    client.error = THROTTLE
+    for _ in range(THRESHOLD):
+        with pytest.raises(db.Unavailable):
+            get_item()
+    clock.now += COOLDOWN_SECONDS
+    client.error = None
+
+    # While the trial call is in flight every other call is still refused
+    refused = []
+
+    def concurrent_call():
+        client.on_call = None
+        with pytest.raises(db.Unavailable):
+            get_item()
+        refused.append(True)
+
+    client.on_call = concurrent_call
+    get_item()
+    assert refused == [True]
+    assert client.calls == THRESHOLD + 1
+
+    for _ in range(THRESHOLD):
+        get_item()
+    assert client.calls == 2 * THRESHOLD + 1
+
+
+def test_failed_trial_reopens_for_another_cooldown(client, clock):
+    client.error = THROTTLE
+    for _ in range(THRESHOLD):
+        with pytest.raises(db.Unavailable):
+            get_item()
+    clock.now += COOLDOWN_SECONDS
+    with pytest.raises(db.Unavailable):
+        get_item()
+    assert client.calls == THRESHOLD + 1
+
+    clock.now += COOLDOWN_SECONDS - 1
+    with pytest.raises(db.Unavailable) as raised:
+        get_item()
+    assert raised.value.retry_after == 1
+    assert client.calls == THRESHOLD + 1
+
+
+def test_other_client_errors_do_not_count(client):
+    client.error = VALIDATION
+    for _ in range(THRESHOLD * 2):
+        with pytest.raises(ClientError):
+            get_item()
+    assert client.calls == THRESHOLD * 2
+
+    # A success in between resets the count, so the breaker needs a full run of failures
+    client.error = THROTTLE
+    for _ in range(THRESHOLD - 1):
+        with pytest.raises(db.Unavailable):
+            get_item()
+    client.error = VALIDATION
+    with pytest.raises(ClientError):
+        get_item()
+    client.error = THROTTLE
+    for _ in range(THRESHOLD - 1):
+        with pytest.raises(db.Unavailable):
+            get_item()
+    assert client.calls == THRESHOLD * 2 + 2 * (THRESHOLD - 1) + 1
+
+
+def test_validation_error_is_still_500(client):
+    client.error = VALIDATION
+    result = lambda_function.lambda_handler(event('GET', '/nutrition/u1'), None)
+    assert result['statusCode'] == 500
+    assert 'Retry-After' not in result['headers']
+
+
+@pytest.mark.parametrize('handler', [lambda_function.lambda_handler, legacy_lambda_function.lambda_handler])
+@pytest.mark.parametrize('error', [THROTTLE, READ_TIMEOUT])
+def test_warmup_failure_is_logged_not_raised(client, handler, error, capsys):
+    client.error = error
+    assert handler({'warmup': True}, None) == {'warmed': False}
+    assert 'warm-up failed' in capsys.readouterr().out
+
+    client.error = None
+    assert handler({'source': 'aws.events'}, None) == {'warmed': True}
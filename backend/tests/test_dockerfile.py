@@ -0,0 +1,48 @@
+"""The FastAPI image copies a hand-picked set of lambda-package modules (backend/Dockerfile).
+
+Rebuild that layout in a temporary directory and import the storage backends from it
+in a fresh interpreter, so a shared module that starts importing a new one fails here
+instead of at container start.
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def copied_paths():
+    """(source, destination directory) for every COPY in the Dockerfile, relative to backend/"""
+    with open(os.path.join(BACKEND_DIR, 'Dockerfile')) as f:
+        for line in f:
+            match = re.match(r'COPY\s+(.+)\s+(\S+)\s*$', line)
+            if match:
+                for source in match.group(1).split():
+                    yield source, match.group(2)
+
+
+def build_image_tree(root):
+    for source, destination in copied_paths():
+        target = os.path.normpath(os.path.join(root, destination))
+        path = os.path.join(BACKEND_DIR, source)
+        if os.path.isdir(path):
+            shutil.copytree(path, target, dirs_exist_ok=True, ignore=shutil.ignore_patterns('__pycache__'))
+        else:
+            os.makedirs(target, exist_ok=True)
+            shutil.copy(path, target)
+
+
+@pytest.mark.parametrize('module', ['app.storage.dynamodb', 'app.storage.memory', 'app.storage.sqlite'])
+def test_storage_backends_import_from_the_image_layout(tmp_path, module):
+    build_image_tree(str(tmp_path))
+    # -E ignores PYTHONPATH, so only the copied files (and installed packages) are importable
+    result = subprocess.run(
+        [sys.executable, '-E', '-c', f'import {module}'],
+        cwd=str(tmp_path), capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,112 @@
+"""Meal/workout dates are validated before anything is written.
+
+A malformed date used to be stored and rolled up, after which stats and /analytics
+failed on it. A stub client records every DynamoDB call instead of making it.
+"""
+
+import importlib.util
+import json
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'lambda-package'))
+
+import db  # noqa: E402
+import lambda_function  # noqa: E402
+import metrics  # noqa: E402
+import rollups  # noqa: E402
+
+spec = importlib.util.spec_from_file_location('legacy_lambda_function', os.path.join(BACKEND_DIR, 'lambda_function.py'))
+legacy_lambda_function = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(legacy_lambda_function)
+
+BAD_DATES = ['01/05/2024', '2024-1-5', '2024-02-30', '2024-13-01', 20240105]
+
+
+class RecordingClient:
+    """Low-level client that succeeds at everything and remembers what it was asked"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, operation):
+        def call(**params):
+            self.calls.append((operation, params))
+            if operation == 'batch_write_item':
+                return {'UnprocessedItems': {}}
+            if operation == 'query':
+                return {'Items': [], 'Count': 0}
+            return {}
+        return call
+
+    def written(self, operation):
+        return [params for name, params in self.calls if name == operation]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    stub = RecordingClient()
+    monkeypatch.setattr(db, '_client', stub)
+    monkeypatch.setattr(metrics, 'enabled', False)
+    return stub
+
+
+def post(handler, path, body):
+    result = handler({'httpMethod': 'POST', 'path': path, 'headers': {}, 'body': json.dumps(body)}, None)
+    return result['statusCode'], json.loads(result['body'])
+
+
+@pytest.mark.parametrize('value', ['2024-01-05', '2024-02-29'])
+def test_check_date_accepts_real_days(value):
+    assert rollups.check_date(value) == value
+
+
+@pytest.mark.parametrize('value', BAD_DATES + [None, ''])
+def test_check_date_rejects_anything_else(value):
+    with pytest.raises(ValueError):
+        rollups.check_date(value)
+
+
+@pytest.mark.parametrize('handler', [lambda_function.lambda_handler, legacy_lambda_function.lambda_handler])
+@pytest.mark.parametrize('path', ['/nutrition', '/progress'])
+@pytest.mark.parametrize('bad_date', BAD_DATES)
+def test_single_record_with_bad_date_is_400_and_writes_nothing(client, handler, path, bad_date):
+    status, body = post(handler, path, {'user_id': 'u1', 'date': bad_date, 'calories': 300, 'duration_minutes': 20})
+    assert status == 400
+    assert 'YYYY-MM-DD' in body['error']
+    assert client.calls == []
+
+
+@pytest.mark.parametrize('handler', [lambda_function.lambda_handler, legacy_lambda_function.lambda_handler])
+def test_single_record_without_date_is_written_for_today(client, handler):
+    status, _ = post(handler, '/nutrition', {'user_id': 'u1', 'calories': 300})
+    assert status in (200, 201)
+    item = client.written('put_item')[0]['Item']
+    assert rollups.check_date(item['date']['S'])
+
+
+@pytest.mark.parametrize('path', ['/nutrition/batch', '/progress/batch'])
+def test_batch_record_with_bad_date_is_invalid_and_not_written(client, path):
+    records = [{'date': '2024-01-05', 'calories': 300}, {'date': '01/05/2024', 'calories': 400}]
+    status, body = post(lambda_function.lambda_handler, path, {'user_id': 'u1', 'records': records})
+    assert status == 207
+    assert [r['status'] for r in body['results']] == ['saved', 'invalid']
+    assert 'YYYY-MM-DD' in body['results'][1]['error']
+
+    (batch,) = client.written('batch_write_item')
+    items = [request['PutRequest']['Item'] for request in batch['RequestItems']['oldisgold-progress']]
+    assert [item['date']['S'] for item in items] == ['2024-01-05']
+    rollup_days = {params['Key']['date']['S'] for params in client.written('update_item') if 'date' in params['Key']}
+    assert rollup_days == {'2024-01-05'}
+
+
+def test_batch_of_only_bad_dates_writes_nothing(client):
+    records = [{'date': '2024-1-5'}, {'date': '2024-02-30'}]
+    status, body = post(lambda_function.lambda_handler, '/nutrition/batch', {'user_id': 'u1', 'records': records})
+    assert status == 207
+    assert body['saved'] == 0
+    assert client.written('batch_write_item') == []
+    assert client.written('update_item') == []
@@ -0,0 +1,79 @@
+"""A record that is written stays reported as saved when its rollup update fails.
+
+The rollup and stats updates come after the put, so a 5xx there used to make clients
+retry and store the record a second time. A stub client fails every UpdateItem.
+"""
+
+import importlib.util
+import json
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'lambda-package'))
+
+import db  # noqa: E402
+import lambda_function  # noqa: E402
+import metrics  # noqa: E402
+
+spec = importlib.util.spec_from_file_location('legacy_lambda_function', os.path.join(BACKEND_DIR, 'lambda_function.py'))
+legacy_lambda_function = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(legacy_lambda_function)
+
+
+class FailingUpdateClient:
+    """Low-level client whose writes succeed and whose update_item always raises"""
+
+    def __init__(self):
+        self.puts = []
+
+    def put_item(self, **params):
+        self.puts.append(params['Item'])
+        return {}
+
+    def delete_item(self, **params):
+        return {'Attributes': {'user_id': {'S': 'u1'}, 'progress_id': {'S': 'p1'}, 'date': {'S': '2024-01-05'}, 'type': {'S': 'meal'}}}
+
+    def update_item(self, **params):
+        raise RuntimeError('rollup table is gone')
+
+    def get_item(self, **params):
+        return {}
+
+    def query(self, **params):
+        return {'Items': [], 'Count': 0}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    stub = FailingUpdateClient()
+    monkeypatch.setattr(db, '_client', stub)
+    monkeypatch.setattr(metrics, 'enabled', False)
+    return stub
+
+
+def call(handler, method, path, body=None):
+    event = {'httpMethod': method, 'path': path, 'headers': {}, 'body': json.dumps(body) if body else None}
+    return handler(event, None)['statusCode']
+
+
+@pytest.mark.parametrize('handler, saved_status', [
+    (lambda_function.lambda_handler, 201),
+    (legacy_lambda_function.lambda_handler, 200),
+])
+@pytest.mark.parametrize('path', ['/nutrition', '/progress'])
+def test_saved_record_is_reported_saved(client, capsys, handler, saved_status, path):
+    assert call(handler, 'POST', path, {'user_id': 'u1', 'date': '2024-01-05', 'calories': 300}) == saved_status
+    assert len(client.puts) == 1
+    assert 'rollup update failed' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('handler, path', [
+    (lambda_function.lambda_handler, '/nutrition/u1/p1'),
+    (legacy_lambda_function.lambda_handler, '/progress/u1/p1'),
+])
+def test_deleted_record_is_reported_deleted(client, capsys, handler, path):
+    assert call(handler, 'DELETE', path) == 200
+    assert 'rollup update failed' in capsys.readouterr().out
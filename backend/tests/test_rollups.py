@@ -0,0 +1,38 @@
+"""Rollups rebuilt from raw records agree with what the writers applied.
+
+The FastAPI app's DynamoDB storage stores skipped workouts (completed false) as
+workout records without touching the rollup, so scripts/rebuild_rollups.py must not
+count them either.
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'lambda-package'))
+
+import rollups  # noqa: E402
+from app.storage.dynamodb import to_item  # noqa: E402
+
+
+def entry(entry_id, completed, duration=30):
+    return {'entry_id': entry_id, 'date': '2024-01-05T07:30:00', 'completed': completed, 'duration': duration}
+
+
+def test_skipped_workout_counts_for_nothing():
+    assert rollups.record_deltas(to_item('u1', entry('e1', False))) == {}
+
+
+def test_completed_workout_counts_once():
+    assert rollups.record_deltas(to_item('u1', entry('e1', True))) == {'workouts': 1, 'minutes': 30, 'calories_burned': 0}
+
+
+def test_workout_without_the_flag_is_completed():
+    assert rollups.record_deltas({'type': 'workout', 'duration': 20})['workouts'] == 1
+
+
+def test_rebuild_ignores_skipped_workouts():
+    items = [to_item('u1', entry('e1', True)), to_item('u1', entry('e2', False, 45))]
+    totals = rollups.aggregate(items)[('u1', '2024-01-05')]
+    assert (totals['workouts'], totals['minutes']) == (1, 30)
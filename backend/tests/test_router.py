@@ -0,0 +1,72 @@
+"""Route resolution in router.py, and the 405s both handlers build from it."""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'lambda-package'))
+
+import lambda_function  # noqa: E402
+from router import MethodNotAllowed, NotFound, Router  # noqa: E402
+
+spec = importlib.util.spec_from_file_location('legacy_lambda_function', os.path.join(BACKEND_DIR, 'lambda_function.py'))
+legacy_lambda_function = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(legacy_lambda_function)
+
+
+@pytest.fixture
+def router():
+    routes = Router()
+    for method, template in [
+        ('POST', '/nutrition/batch'),
+        ('GET', '/nutrition/{user_id}'),
+        ('DELETE', '/nutrition/{user_id}/{meal_id}'),
+    ]:
+        routes.add(method, template, template)
+    return routes
+
+
+def test_template_captures_path_params(router):
+    assert router.resolve('GET', '/nutrition/u%201') == ('/nutrition/{user_id}', {'user_id': 'u 1'}, '/nutrition/{user_id}')
+
+
+def test_static_path_wins_for_its_method(router):
+    assert router.resolve('POST', '/nutrition/batch') == ('/nutrition/batch', {}, '/nutrition/batch')
+
+
+@pytest.mark.parametrize('method', ['GET', 'PUT', 'DELETE'])
+def test_static_path_is_never_captured_as_a_param(router, method):
+    with pytest.raises(MethodNotAllowed) as raised:
+        router.resolve(method, '/nutrition/batch')
+    assert raised.value.allowed == ['POST']
+
+
+def test_template_method_mismatch_lists_template_methods(router):
+    with pytest.raises(MethodNotAllowed) as raised:
+        router.resolve('POST', '/nutrition/u1')
+    assert raised.value.allowed == ['GET']
+
+
+def test_unknown_path_is_not_found(router):
+    with pytest.raises(NotFound):
+        router.resolve('GET', '/nutrition/u1/m1/extra')
+
+
+def test_get_of_a_batch_route_is_405_with_allow():
+    result = lambda_function.lambda_handler({'httpMethod': 'GET', 'path': '/nutrition/batch', 'headers': {}}, None)
+    assert result['statusCode'] == 405
+    assert result['headers']['Allow'] == 'POST'
+
+
+@pytest.mark.parametrize('module', [lambda_function, legacy_lambda_function])
+def test_registered_static_routes_are_405_for_other_methods(module):
+    for path, methods in module.router._static.items():
+        for method in ('GET', 'POST', 'PUT', 'DELETE'):
+            if method in methods:
+                continue
+            result = module.lambda_handler({'httpMethod': method, 'path': path, 'headers': {}}, None)
+            assert result['statusCode'] == 405, (method, path)
+            assert result['headers']['Allow'] == ', '.join(sorted(methods))
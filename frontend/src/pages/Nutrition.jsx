@@ -76,6 +76,7 @@ function Nutrition() {
   const [step, setStep] = useState(1)
   const [pickedFood, setPickedFood] = useState(null)
   const [qty, setQty] = useState('')
+  const [suggestions, setSuggestions] = useState([])
   
   const userId = localStorage.getItem('userId')
   const userName = localStorage.getItem('userName') || 'Friend'
@@ -110,9 +111,21 @@ function Nutrition() {
   const dailyGoal = 2000
   const remaining = dailyGoal - todayStats.calories
 
-  const suggestions = step === 1 && searchText.trim().length > 0
-    ? Object.entries(FOOD_DATABASE).filter(([k]) => k.includes(searchText.toLowerCase())).slice(0, 5).map(([n, d]) => ({ name: n, ...d }))
-    : []
+  // Suggestions come from GET /foods/search (typo-tolerant, full food database); the
+  // short local list is the fallback when the API can't be reached
+  useEffect(() => {
+    const query = searchText.trim()
+    if (step !== 1 || !query) { setSuggestions([]); return }
+    const localMatches = () => Object.entries(FOOD_DATABASE).filter(([k]) => k.includes(query.toLowerCase())).slice(0, 5).map(([n, d]) => ({ name: n, ...d }))
+    const controller = new AbortController()
+    const timer = setTimeout(() => {
+      fetch(`${API_URL}/foods/search?q=${encodeURIComponent(query)}&limit=5`, { signal: controller.signal })
+        .then(r => r.ok ? r.json() : Promise.reject(new Error(`HTTP ${r.status}`)))
+        .then(data => setSuggestions(data.foods.map(f => ({ ...FOOD_DATABASE[f.name], ...f, defaultAmount: f.default_amount }))))
+        .catch(error => { if (error.name !== 'AbortError') setSuggestions(localMatches()) })
+    }, 150)
+    return () => { clearTimeout(timer); controller.abort() }
+  }, [searchText, step])
 
   const selectFood = (food) => {
     setPickedFood(food)
@@ -189,12 +202,12 @@ function Nutrition() {
               <div className="step-search">
                 <label>What did you eat?</label>
                 <input type="text" value={searchText} onChange={e => setSearchText(e.target.value)} placeholder="Type to search... egg, rice, chicken" className="form-input" autoComplete="off" />
-                {suggestions.length > 0 && <div className="suggestions-box">{suggestions.map((s, i) => <button key={i} className="sug-btn" onClick={() => selectFood(s)}><span className="sug-icon">{s.icon}</span><span className="sug-name">{s.name}</span><span className="sug-cal">{s.calories} cal/{s.unit}</span></button>)}</div>}
+                {suggestions.length > 0 && <div className="suggestions-box">{suggestions.map((s, i) => <button key={i} className="sug-btn" onClick={() => selectFood(s)}><span className="sug-icon">{s.icon || '🍽️'}</span><span className="sug-name">{s.name}</span><span className="sug-cal">{s.calories} cal/{s.unit}</span></button>)}</div>}
               </div>
             )}
             {step === 2 && pickedFood && (
               <div className="step-amount">
-                <div className="picked-header"><div className="picked-info"><span className="picked-icon">{pickedFood.icon}</span><span className="picked-name">{pickedFood.name}</span></div><button className="back-btn" onClick={goBackToSearch}>← Change</button></div>
+                <div className="picked-header"><div className="picked-info"><span className="picked-icon">{pickedFood.icon || '🍽️'}</span><span className="picked-name">{pickedFood.name}</span></div><button className="back-btn" onClick={goBackToSearch}>← Change</button></div>
                 <div className="qty-section"><label>How many {pickedFood.unit}s?</label><div className="qty-row"><input type="number" value={qty} onChange={e => setQty(e.target.value)} className="form-input qty-input" autoFocus /><span className="unit-pill">{pickedFood.unit}</span></div></div>
                 {nutrition && <div className="nut-grid"><div className="nut-box cal"><div className="nut-val">{nutrition.calories}</div><div className="nut-lbl">Calories</div></div><div className="nut-box pro"><div className="nut-val">{nutrition.protein}g</div><div className="nut-lbl">Protein</div></div><div className="nut-box carb"><div className="nut-val">{nutrition.carbs}g</div><div className="nut-lbl">Carbs</div></div><div className="nut-box fat"><div className="nut-val">{nutrition.fat}g</div><div className="nut-lbl">Fat</div></div></div>}
               </div>
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import { Link, useNavigate } from 'react-router-dom'
 import './Progress.css'
 
@@ -12,6 +12,8 @@ function Progress() {
   const navigate = useNavigate()
   const [progressData, setProgressData] = useState([])
   const [mealsData, setMealsData] = useState([])
+  const [cursors, setCursors] = useState({})
+  const loadingOlder = useRef({})
   const [loading, setLoading] = useState(true)
   const [selectedDate, setSelectedDate] = useState(new Date())
   const [showSettings, setShowSettings] = useState(false)
@@ -23,17 +25,39 @@ function Progress() {
 
   useEffect(() => {
     if (!userId) { navigate('/setup'); return }
-    Promise.all([
-      fetch(`${API_URL}/progress/${userId}`).then(r => r.ok ? r.json() : []),
-      fetch(`${API_URL}/nutrition/${userId}`).then(r => r.ok ? r.json() : [])
-    ]).then(([prog, meals]) => {
-      setProgressData(Array.isArray(prog) ? prog : [])
-      setMealsData(Array.isArray(meals) ? meals : [])
-    }).finally(() => setLoading(false))
+    // One request for profile, plan and the newest page of workouts + meals
+    fetch(`${API_URL}/dashboard/${userId}`)
+      .then(r => r.ok ? r.json() : {})
+      .then(data => {
+        setProgressData(data.workouts || [])
+        setMealsData(data.meals || [])
+        setCursors(data.next_cursors || {})
+      })
+      .finally(() => setLoading(false))
   }, [userId, navigate])
 
   const dateStr = getLocalDateString(selectedDate)
-  const dayWorkouts = progressData.filter(p => p.date === dateStr && p.type === 'workout')
+
+  // History comes newest-first; fetch older pages only when the user navigates past them
+  useEffect(() => {
+    const oldest = (items) => items.length ? items[items.length - 1].date : null
+    const loadOlder = (key, items, endpoint, field, setItems) => {
+      const cursor = cursors[key]
+      if (!cursor || loadingOlder.current[key] || !oldest(items) || dateStr >= oldest(items)) return
+      loadingOlder.current[key] = true
+      fetch(`${API_URL}/${endpoint}/${userId}?cursor=${cursor}`)
+        .then(r => r.ok ? r.json() : {})
+        .then(data => {
+          setItems(prev => [...prev, ...(data[field] || [])])
+          setCursors(prev => ({ ...prev, [key]: data.next_cursor }))
+        })
+        .finally(() => { loadingOlder.current[key] = false })
+    }
+    loadOlder('workouts', progressData, 'progress', 'progress', setProgressData)
+    loadOlder('meals', mealsData, 'nutrition', 'meals', setMealsData)
+  }, [dateStr, cursors, progressData, mealsData, userId])
+
+  const dayWorkouts = progressData.filter(p => p.date === dateStr)
   const dayMeals = mealsData.filter(m => m.date === dateStr)
 
   const totalCaloriesEaten = dayMeals.reduce((sum, m) => sum + (m.calories || 0), 0)
@@ -42,7 +66,7 @@ function Progress() {
   const totalCarbs = dayMeals.reduce((sum, m) => sum + (m.carbs || 0), 0)
   const totalFat = dayMeals.reduce((sum, m) => sum + (m.fat || 0), 0)
   const totalExercises = dayWorkouts.reduce((sum, w) => sum + (w.exercises_completed || 0), 0)
-  const totalMinutes = dayWorkouts.reduce((sum, w) => sum + (w.duration || 0), 0)
+  const totalMinutes = dayWorkouts.reduce((sum, w) => sum + (w.duration_minutes || w.duration || 0), 0)
   const netCalories = totalCaloriesEaten - totalCaloriesBurned
 
   const today = new Date()
@@ -209,7 +233,7 @@ function Progress() {
               <div className="meals-list">
                 {dayMeals.map((m, i) => (
                   <div key={i} className="meal-item">
-                    <span>{m.food || m.meal_type || 'Meal'}</span>
+                    <span>{m.food || m.food_name || m.meal_type || 'Meal'}</span>
                     <span className="meal-cal">{m.calories} cal</span>
                   </div>
                 ))}
@@ -151,27 +151,24 @@ function Workout() {
     setSaving(true)
     const localDate = getLocalDateString()
     
-    for (const m of meals) {
-      const payload = {
-        user_id: userId,
-        date: localDate,
-        meal_type: m.type,
-        food: m.food,
-        calories: m.calories,
-        protein: m.protein,
-        carbs: m.carbs,
-        fat: m.fat
-      }
-      
-      try {
-        await fetch(`${API_URL}/nutrition`, {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify(payload)
-        })
-      } catch (error) {
-        console.error('Error saving meal:', error)
-      }
+    const records = meals.map(m => ({
+      date: localDate,
+      meal_type: m.type,
+      food: m.food,
+      calories: m.calories,
+      protein: m.protein,
+      carbs: m.carbs,
+      fat: m.fat
+    }))
+    
+    try {
+      await fetch(`${API_URL}/nutrition/batch`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ user_id: userId, records })
+      })
+    } catch (error) {
+      console.error('Error saving meals:', error)
     }
     
     setSaving(false)